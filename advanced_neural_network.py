@@ -4,34 +4,37 @@ Trains on external MIDI files and generates high-quality compositions
 """
 import os
 import numpy as np
-from typing import List, Tuple, Optional, Dict, TYPE_CHECKING
+from typing import List, Tuple, Optional, Dict, Sequence, TYPE_CHECKING
 from pathlib import Path
 import pickle
 import json
+from dataclasses import replace
+
+from instrumentation import timed
+from lazy_imports import LazyModule, module_available
+from training_perf import PerfProfile, apply_profile, print_batch_probes, print_profile, throughput_callback, tune_batch_size
+from training_config import TrainingConfig
+from augmentation import AugmentConfig, training_dataset
+from event_tokens import TokenCorpus, Vocabulary, decode_tokens, encode_notes, vocabulary_path, window_dataset
+from sharded_dataset import DEFAULT_SHARD_NOTES, ShardedDataset, export_dataset
+from training_checkpoints import TrainingCheckpoint, checkpoint_dir_for, load_for_fine_tuning, read_state
+from training_telemetry import TelemetryConfig, telemetry_callback
+from model_registry import model_path_for, write_manifest
 
 if TYPE_CHECKING:
     from tensorflow.keras.models import Model
 
-try:
-    import tensorflow as tf
-    from tensorflow.keras.models import Sequential, Model
-    from tensorflow.keras.layers import (
-        LSTM, Dense, Dropout, Bidirectional, Attention,
-        Input, Concatenate, Embedding, RepeatVector
-    )
-    from tensorflow.keras.optimizers import Adam
-    from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
-    TF_AVAILABLE = True
-except ImportError:
-    TF_AVAILABLE = False
-    Model = None
+# TensorFlow and mido are imported on first use: importing this module (as the
+# composer, CLI and web server do) must not pay for them
+tf = LazyModule('tensorflow')
+mido = LazyModule('mido')
+
+TF_AVAILABLE = module_available('tensorflow')
+if not TF_AVAILABLE:
     print("Warning: TensorFlow not available. Install with: pip install tensorflow")
 
-try:
-    import mido
-    MIDO_AVAILABLE = True
-except ImportError:
-    MIDO_AVAILABLE = False
+MIDO_AVAILABLE = module_available('mido')
+if not MIDO_AVAILABLE:
     print("Warning: mido not available. Install with: pip install mido")
 
 
@@ -44,8 +47,8 @@ class MIDIDataProcessor:
         self.velocity_range = (0, 127)
         self.duration_range = (0.25, 4.0)
     
-    def extract_notes_from_midi(self, midi_file: str) -> List[Dict]:
-        """Extract note events from MIDI file"""
+    def extract_notes_from_midi(self, midi_file: str, in_beats: bool = False) -> List[Dict]:
+        """Extract note events from MIDI file (times and durations in ticks, or beats if in_beats)"""
         if not MIDO_AVAILABLE:
             return []
         
@@ -72,6 +75,11 @@ class MIDIDataProcessor:
                                 note['duration'] = current_time - note['time']
                                 break
             
+            if in_beats:
+                for note in notes:
+                    note['time'] /= mid.ticks_per_beat
+                    note['duration'] /= mid.ticks_per_beat
+            
             return notes
         except Exception as e:
             print(f"Error processing {midi_file}: {e}")
@@ -83,7 +91,20 @@ class MIDIDataProcessor:
         velocity_norm = note['velocity'] / self.velocity_range[1]
         duration_norm = min(note['duration'], self.duration_range[1]) / self.duration_range[1]
         
-        return np.array([pitch_norm, velocity_norm, duration_norm])
+        return np.array([pitch_norm, velocity_norm, duration_norm], dtype=np.float32)
+    
+    def normalize_notes(self, notes: List[Dict]) -> np.ndarray:
+        """normalize_note for a whole file at once: (len(notes), 3) float32"""
+        if not notes:
+            return np.empty((0, 3), dtype=np.float32)
+        pitch = np.fromiter((n['pitch'] for n in notes), dtype=np.float64, count=len(notes))
+        velocity = np.fromiter((n['velocity'] for n in notes), dtype=np.float64, count=len(notes))
+        duration = np.fromiter((n['duration'] for n in notes), dtype=np.float64, count=len(notes))
+        return np.stack([
+            (pitch - self.note_range[0]) / (self.note_range[1] - self.note_range[0]),
+            velocity / self.velocity_range[1],
+            np.minimum(duration, self.duration_range[1]) / self.duration_range[1],
+        ], axis=1).astype(np.float32)
     
     def create_sequences(self, notes: List[Dict], seq_length: int = None) -> Tuple[np.ndarray, np.ndarray]:
         """Create sequences for training"""
@@ -91,7 +112,7 @@ class MIDIDataProcessor:
             seq_length = self.max_sequence_length
         
         if len(notes) < seq_length + 1:
-            return np.array([]), np.array([])
+            return np.array([], dtype=np.float32), np.array([], dtype=np.float32)
         
         X, y = [], []
         
@@ -102,15 +123,23 @@ class MIDIDataProcessor:
             X.append(sequence)
             y.append(target)
         
-        return np.array(X), np.array(y)
+        # float32 end to end: the model computes in float32, so avoid a cast per batch
+        return np.array(X, dtype=np.float32), np.array(y, dtype=np.float32)
+    
+    @staticmethod
+    def list_midi_files(directory: str) -> List[Path]:
+        """MIDI files under directory, sorted so the corpus (and the validation split) is stable across runs"""
+        return sorted(list(Path(directory).glob('**/*.mid')) + list(Path(directory).glob('**/*.midi')))
     
     def process_midi_directory(self, directory: str) -> Tuple[np.ndarray, np.ndarray]:
         """Process all MIDI files in directory"""
-        X_all, y_all = [], []
-        
-        midi_files = list(Path(directory).glob('**/*.mid')) + list(Path(directory).glob('**/*.midi'))
-        
+        midi_files = self.list_midi_files(directory)
         print(f"Found {len(midi_files)} MIDI files")
+        return self.process_midi_files(midi_files)
+    
+    def process_midi_files(self, midi_files: List[Path]) -> Tuple[np.ndarray, np.ndarray]:
+        """Process a list of MIDI files (e.g. one worker's shard of the corpus)"""
+        X_all, y_all = [], []
         
         for midi_file in midi_files:
             print(f"Processing {midi_file.name}...")
@@ -127,56 +156,148 @@ class MIDIDataProcessor:
             y_combined = np.vstack(y_all)
             return X_combined, y_combined
         
-        return np.array([]), np.array([])
+        return np.array([], dtype=np.float32), np.array([], dtype=np.float32)
+    
+    def export_dataset(self, directory: str, output: str, encoding: str = 'float',
+                       shard_notes: int = DEFAULT_SHARD_NOTES) -> Dict:
+        """Write a directory's notes as a sharded, memory-mappable dataset (see sharded_dataset)"""
+        midi_files = self.list_midi_files(directory)
+        print(f"Found {len(midi_files)} MIDI files")
+        return export_dataset(midi_files, output, encoding, self.max_sequence_length, shard_notes, processor=self)
 
 
 class AdvancedNeuralComposer:
     """Advanced neural network for music composition"""
     
-    def __init__(self, seq_length: int = 100, model_name: str = "composer_model"):
+    def __init__(self, seq_length: int = 100, model_name: str = "composer_model",
+                 encoding: str = 'float', vocabulary: Optional[Vocabulary] = None, units: int = 256):
+        """
+        Args:
+            encoding: 'float' (normalized pitch/velocity/duration, regression) or
+                      'tokens' (event tokens, see event_tokens; categorical outputs)
+            units: Width of the first LSTM layer; later layers use half
+        """
         self.seq_length = seq_length
+        self.units = units
         self.model_name = model_name
+        self.encoding = encoding
+        self.vocabulary = vocabulary or (Vocabulary() if encoding == 'tokens' else None)
         self.model = None
         self.is_trained = False
         self.training_history = None
         self.scaler_params = None
     
-    def build_model(self, input_shape: Tuple[int, int]) -> 'Model':
-        """Build advanced LSTM model with attention"""
+    def build_model(self, input_shape: Tuple[int, int], jit_compile: bool = False) -> 'Model':
+        """Build advanced LSTM model with attention (jit_compile: compile train/predict steps with XLA)"""
+        layers = tf.keras.layers
         
         # Input layer
-        inputs = Input(shape=input_shape)
+        inputs = layers.Input(shape=input_shape)
         
         # Bidirectional LSTM layers
-        x = Bidirectional(LSTM(256, return_sequences=True, dropout=0.2))(inputs)
-        x = Bidirectional(LSTM(128, return_sequences=True, dropout=0.2))(x)
+        units = self.units
+        x = layers.Bidirectional(layers.LSTM(units, return_sequences=True, dropout=0.2))(inputs)
+        x = layers.Bidirectional(layers.LSTM(units // 2, return_sequences=True, dropout=0.2))(x)
         
         # Attention mechanism
-        attention = Attention()([x, x])
-        x = Concatenate()([x, attention])
+        attention = layers.Attention()([x, x])
+        x = layers.Concatenate()([x, attention])
         
         # Dense layers
-        x = Dense(256, activation='relu')(x)
-        x = Dropout(0.3)(x)
-        x = Dense(128, activation='relu')(x)
-        x = Dropout(0.2)(x)
+        x = layers.Dense(units, activation='relu')(x)
+        x = layers.Dropout(0.3)(x)
+        x = layers.Dense(units // 2, activation='relu')(x)
+        x = layers.Dropout(0.2)(x)
         
-        # Output layer (3 features: pitch, velocity, duration)
-        outputs = Dense(3, activation='sigmoid')(x[:, -1, :])
+        # Output layer (3 features: pitch, velocity, duration); kept in float32 under mixed precision
+        outputs = layers.Dense(3, activation='sigmoid', dtype='float32')(x[:, -1, :])
         
-        model = Model(inputs=inputs, outputs=outputs)
+        model = tf.keras.models.Model(inputs=inputs, outputs=outputs)
         model.compile(
-            optimizer=Adam(learning_rate=0.001),
+            optimizer=tf.keras.optimizers.Adam(learning_rate=0.001),
             loss='mse',
-            metrics=['mae']
+            metrics=['mae'],
+            jit_compile=jit_compile
         )
         
         self.model = model
         return model
     
+    def build_token_model(self, jit_compile: bool = False) -> 'Model':
+        """Token variant: embedding input, same recurrent body, one softmax head per note attribute"""
+        layers = tf.keras.layers
+        vocabulary = self.vocabulary
+        
+        inputs = layers.Input(shape=(self.seq_length,), dtype='int32')
+        units = self.units
+        x = layers.Embedding(vocabulary.size, units // 2)(inputs)
+        
+        x = layers.Bidirectional(layers.LSTM(units, return_sequences=True, dropout=0.2))(x)
+        x = layers.Bidirectional(layers.LSTM(units // 2, return_sequences=True, dropout=0.2))(x)
+        attention = layers.Attention()([x, x])
+        x = layers.Concatenate()([x, attention])
+        x = layers.Dense(units, activation='relu')(x[:, -1, :])
+        x = layers.Dropout(0.3)(x)
+        
+        outputs = {
+            'pitch': layers.Dense(vocabulary.pitch_bins, activation='softmax', dtype='float32', name='pitch')(x),
+            'velocity': layers.Dense(vocabulary.velocity_bins, activation='softmax', dtype='float32', name='velocity')(x),
+            'duration': layers.Dense(vocabulary.duration_bins, activation='softmax', dtype='float32', name='duration')(x),
+        }
+        
+        model = tf.keras.models.Model(inputs=inputs, outputs=outputs)
+        model.compile(
+            optimizer=tf.keras.optimizers.Adam(learning_rate=0.001),
+            loss={name: 'sparse_categorical_crossentropy' for name in outputs},
+            metrics={name: 'sparse_categorical_accuracy' for name in outputs},
+            jit_compile=jit_compile
+        )
+        
+        self.model = model
+        return model
+    
+    def _training_callbacks(self, train_count: int, input_shape: Tuple[int, ...], epochs: int,
+                            checkpoint_dir: Optional[str], checkpoint_every: int, resume: bool):
+        """Callbacks and initial epoch for fit(); initial epoch is None if a checkpoint already covers `epochs`"""
+        early_stop = tf.keras.callbacks.EarlyStopping(monitor='val_loss', patience=10, restore_best_weights=True)
+        reduce_lr = tf.keras.callbacks.ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=5, min_lr=0.00001)
+        callbacks = [early_stop, reduce_lr, throughput_callback(train_count)]
+        
+        initial_epoch = 0
+        if checkpoint_dir:
+            checkpoint = TrainingCheckpoint(self.model, checkpoint_dir)
+            if resume:
+                initial_epoch = checkpoint.restore()
+                if initial_epoch >= epochs:
+                    print(f"Checkpoint already covers {initial_epoch} epochs (target {epochs})")
+                    return callbacks, None
+                if initial_epoch:
+                    print(f"Resuming from epoch {initial_epoch} ({checkpoint_dir})")
+            if checkpoint_every > 0:
+                callbacks.append(checkpoint.callback(checkpoint_every, input_shape, epochs))
+        return callbacks, initial_epoch
+    
+    def _telemetry_callback(self, telemetry: TelemetryConfig, train_count: int, batch_size: int, probe_dataset=None):
+        print(f"Telemetry: {telemetry.path}")
+        return telemetry_callback(telemetry, train_count, batch_size, probe_dataset,
+                                  run={'model': self.model_name, 'encoding': self.encoding, 'seq_length': self.seq_length})
+    
     def train(self, X: np.ndarray, y: np.ndarray, epochs: int = 100, 
-              batch_size: int = 32, validation_split: float = 0.2):
-        """Train the model"""
+              batch_size: int = 32, validation_split: float = 0.2,
+              perf: Optional[PerfProfile] = None, checkpoint_dir: Optional[str] = None,
+              checkpoint_every: int = 1, resume: bool = False,
+              augment: Optional[AugmentConfig] = None,
+              telemetry: Optional[TelemetryConfig] = None):
+        """
+        Train the model.
+        
+        Args:
+            perf: Settings for a model built here (apply_profile() must already have run)
+            checkpoint_dir: Save weights and optimizer state here every `checkpoint_every` epochs
+            resume: Continue from the latest checkpoint in checkpoint_dir
+            augment: Transpose / scale the training batches on the fly (validation data is untouched)
+            telemetry: Record per-epoch / per-batch measurements to a JSONL file (see training_telemetry)
+        """
         
         if not TF_AVAILABLE:
             print("TensorFlow not available")
@@ -186,31 +307,201 @@ class AdvancedNeuralComposer:
             print("No training data")
             return
         
+        X = np.asarray(X, dtype=np.float32)
+        y = np.asarray(y, dtype=np.float32)
+        
         print(f"Training data shape: {X.shape}")
         print(f"Target data shape: {y.shape}")
         
         # Build model if not exists
         if self.model is None:
-            self.build_model(X.shape[1:])
+            self.build_model(X.shape[1:], jit_compile=perf.jit_compile if perf else False)
         
-        # Callbacks
-        early_stop = EarlyStopping(monitor='val_loss', patience=10, restore_best_weights=True)
-        reduce_lr = ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=5, min_lr=0.00001)
+        # Same split as Keras' validation_split: the last fraction validates
+        train_count = len(X) - int(len(X) * validation_split)
+        callbacks, initial_epoch = self._training_callbacks(
+            train_count, X.shape[1:], epochs, checkpoint_dir, checkpoint_every, resume)
+        if initial_epoch is None:
+            self.is_trained = True
+            return
+        
+        if augment:
+            steps_per_epoch = -(-train_count // batch_size)
+            data = {
+                'x': training_dataset(X[:train_count], y[:train_count], batch_size, augment,
+                                      start_step=initial_epoch * steps_per_epoch),
+                'steps_per_epoch': steps_per_epoch,
+                'validation_data': (X[train_count:], y[train_count:]) if train_count < len(X) else None,
+            }
+        else:
+            data = {'x': X, 'y': y, 'batch_size': batch_size, 'validation_split': validation_split}
+        
+        if telemetry:
+            # Arrays in memory have no input pipeline worth probing
+            probe = data['x'] if augment else None
+            callbacks.append(self._telemetry_callback(telemetry, train_count, batch_size, probe))
         
         # Train
         print("Starting training...")
         self.training_history = self.model.fit(
-            X, y,
             epochs=epochs,
-            batch_size=batch_size,
-            validation_split=validation_split,
-            callbacks=[early_stop, reduce_lr],
+            initial_epoch=initial_epoch,
+            callbacks=callbacks,
+            verbose=1,
+            **data
+        )
+        
+        self.is_trained = True
+        print("Training complete!")
+    
+    def train_tokens(self, corpus: TokenCorpus, epochs: int = 100, batch_size: int = 32,
+                     validation_split: float = 0.2, perf: Optional[PerfProfile] = None,
+                     checkpoint_dir: Optional[str] = None, checkpoint_every: int = 1,
+                     resume: bool = False, seed: int = 0, telemetry: Optional[TelemetryConfig] = None):
+        """Train the token variant; windows are gathered from the corpus per batch"""
+        
+        if not TF_AVAILABLE:
+            print("TensorFlow not available")
+            return
+        
+        starts = corpus.window_starts(self.seq_length)
+        if len(starts) == 0:
+            print("No training data")
+            return
+        
+        print(f"Training windows: {len(starts)} x {self.seq_length} tokens ({corpus.vocabulary.size} token vocabulary)")
+        
+        self.vocabulary = corpus.vocabulary
+        if self.model is None:
+            self.build_token_model(jit_compile=perf.jit_compile if perf else False)
+        
+        train_count = len(starts) - int(len(starts) * validation_split)
+        callbacks, initial_epoch = self._training_callbacks(
+            train_count, (self.seq_length,), epochs, checkpoint_dir, checkpoint_every, resume)
+        if initial_epoch is None:
+            self.is_trained = True
+            return
+        
+        validation = None
+        if train_count < len(starts):
+            validation = window_dataset(corpus, starts[train_count:], self.seq_length, batch_size,
+                                        shuffle=False, repeat=False)
+        
+        training = window_dataset(corpus, starts[:train_count], self.seq_length, batch_size, seed=seed)
+        if telemetry:
+            callbacks.append(self._telemetry_callback(telemetry, train_count, batch_size, training))
+        
+        print("Starting training...")
+        self.training_history = self.model.fit(
+            training,
+            steps_per_epoch=-(-train_count // batch_size),
+            validation_data=validation,
+            epochs=epochs,
+            initial_epoch=initial_epoch,
+            callbacks=callbacks,
+            verbose=1
+        )
+        
+        self.is_trained = True
+        print("Training complete!")
+    
+    def train_dataset(self, dataset: ShardedDataset, epochs: int = 100, batch_size: int = 32,
+                      validation_split: float = 0.2, perf: Optional[PerfProfile] = None,
+                      checkpoint_dir: Optional[str] = None, checkpoint_every: int = 1,
+                      resume: bool = False, seed: int = 0, telemetry: Optional[TelemetryConfig] = None):
+        """Train from a sharded dataset, reading shuffled batches of windows as they are needed"""
+        
+        if not TF_AVAILABLE:
+            print("TensorFlow not available")
+            return
+        
+        if len(dataset) == 0:
+            print("No training data")
+            return
+        
+        print(f"Training windows: {len(dataset)} x {dataset.input_shape} ({dataset.encoding} encoding, "
+              f"{len(dataset.shards)} shard(s))")
+        
+        self.seq_length = dataset.seq_length
+        self.encoding = dataset.encoding
+        self.vocabulary = dataset.vocabulary
+        if self.model is None:
+            jit_compile = perf.jit_compile if perf else False
+            if self.encoding == 'tokens':
+                self.build_token_model(jit_compile=jit_compile)
+            else:
+                self.build_model(dataset.input_shape, jit_compile=jit_compile)
+        
+        train_indices, validation_indices = dataset.split(validation_split)
+        callbacks, initial_epoch = self._training_callbacks(
+            len(train_indices), dataset.input_shape, epochs, checkpoint_dir, checkpoint_every, resume)
+        if initial_epoch is None:
+            self.is_trained = True
+            return
+        
+        validation = None
+        if len(validation_indices):
+            validation = dataset.tf_dataset(validation_indices, batch_size, shuffle=False, repeat=False)
+        
+        training = dataset.tf_dataset(train_indices, batch_size, seed=seed)
+        if telemetry:
+            callbacks.append(self._telemetry_callback(telemetry, len(train_indices), batch_size, training))
+        
+        print("Starting training...")
+        self.training_history = self.model.fit(
+            training,
+            steps_per_epoch=-(-len(train_indices) // batch_size),
+            validation_data=validation,
+            epochs=epochs,
+            initial_epoch=initial_epoch,
+            callbacks=callbacks,
             verbose=1
         )
         
         self.is_trained = True
         print("Training complete!")
     
+    def sample_next_bins(self, windows: np.ndarray, temperature: float = 1.0,
+                         rng: Optional[np.random.Generator] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Sample (pitch, velocity, duration) bins for the note following each token window"""
+        rng = rng or np.random.default_rng()
+        probabilities = self.model.predict(np.asarray(windows, dtype=np.int32), verbose=0)
+        
+        bins = []
+        for name in ('pitch', 'velocity', 'duration'):
+            logits = np.log(np.maximum(probabilities[name], 1e-9)) / max(temperature, 1e-6)
+            p = np.exp(logits - logits.max(axis=1, keepdims=True))
+            p /= p.sum(axis=1, keepdims=True)
+            # Inverse-CDF sampling, one draw per row
+            bins.append((p.cumsum(axis=1) < rng.random((len(p), 1))).sum(axis=1).clip(0, p.shape[1] - 1))
+        return tuple(bins)
+    
+    @timed('neural.generate_tokens')
+    def generate_tokens(self, seed_tokens: Sequence[int], length: int = 100, temperature: float = 1.0,
+                        rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """Continue a token sequence by sampling discrete notes"""
+        if not self.is_trained or self.model is None:
+            return np.asarray(seed_tokens, dtype=np.uint16)
+        
+        rng = rng or np.random.default_rng()
+        generated = list(np.asarray(seed_tokens, dtype=np.int64)[-self.seq_length:])
+        generated = [generated[0]] * (self.seq_length - len(generated)) + generated  # Left-pad short seeds
+        for _ in range(length):
+            window = np.asarray(generated[-self.seq_length:])[None, :]
+            pitch, velocity, duration = self.sample_next_bins(window, temperature, rng)
+            generated.append(int(self.vocabulary.pack(pitch, velocity, duration)[0]))
+        return np.asarray(generated, dtype=np.uint16)
+    
+    def predict_next_note(self, context: List[Dict]) -> Dict:
+        """Most likely next note after context (token models)"""
+        tokens = encode_notes(context, self.vocabulary).astype(np.int64)
+        window = np.concatenate([np.full(max(0, self.seq_length - len(tokens)), tokens[0]), tokens])[-self.seq_length:]
+        probabilities = self.model.predict(window[None, :].astype(np.int32), verbose=0)
+        pitch, velocity, duration = self.vocabulary.bins_to_values(
+            *(np.argmax(probabilities[name], axis=1) for name in ('pitch', 'velocity', 'duration')))
+        return {'pitch': int(pitch[0]), 'velocity': int(velocity[0]), 'duration': float(duration[0])}
+    
+    @timed('neural.generate_sequence')
     def generate_sequence(self, seed_sequence: np.ndarray, length: int = 100) -> np.ndarray:
         """Generate a sequence of notes"""
         
@@ -221,7 +512,7 @@ class AdvancedNeuralComposer:
         
         for _ in range(length):
             # Get last sequence
-            current_seq = np.array(generated[-self.seq_length:]).reshape(1, self.seq_length, 3)
+            current_seq = np.array(generated[-self.seq_length:], dtype=np.float32).reshape(1, self.seq_length, 3)
             
             # Predict next note
             next_note = self.model.predict(current_seq, verbose=0)[0]
@@ -235,9 +526,17 @@ class AdvancedNeuralComposer:
             filepath = f"{self.model_name}.h5"
         
         if self.model:
-            self.model.save(filepath)
+            if self.encoding == 'tokens':
+                self.vocabulary.save(vocabulary_path(filepath))
+            # Write beside the target and rename, so a watching model registry never reads a partial file
+            directory, name = os.path.split(filepath)
+            stem, ext = os.path.splitext(name)
+            tmp_path = os.path.join(directory, f".{stem}.{os.getpid()}.tmp{ext}")
+            self.model.save(tmp_path)
+            os.replace(tmp_path, filepath)
             print(f"Model saved to {filepath}")
     
+    @timed('neural.load_model')
     def load_model(self, filepath: str = None):
         """Load trained model"""
         if filepath is None:
@@ -246,6 +545,12 @@ class AdvancedNeuralComposer:
         if os.path.exists(filepath):
             self.model = tf.keras.models.load_model(filepath)
             self.is_trained = True
+            self.seq_length = self.model.input_shape[1]
+            # Token models carry their vocabulary alongside
+            vocab_file = vocabulary_path(filepath)
+            if os.path.exists(vocab_file):
+                self.encoding = 'tokens'
+                self.vocabulary = Vocabulary.load(vocab_file)
             print(f"Model loaded from {filepath}")
         else:
             print(f"Model file not found: {filepath}")
@@ -270,12 +575,18 @@ class EnhancedComposer:
             'duration': max(0.25, duration)
         }
     
+    @timed('neural.generate_composition')
     def generate_composition(self, seed_notes: List[Dict], length: int = 100) -> List[Dict]:
         """Generate composition using neural network"""
         
         if not self.neural_model or not self.neural_model.is_trained:
             return seed_notes
         
+        if self.neural_model.encoding == 'tokens':
+            vocabulary = self.neural_model.vocabulary
+            tokens = self.neural_model.generate_tokens(encode_notes(seed_notes, vocabulary), length)
+            return decode_tokens(tokens, vocabulary)
+        
         # Normalize seed
         processor = MIDIDataProcessor()
         seed_normalized = np.array([processor.normalize_note(n) for n in seed_notes])
@@ -288,6 +599,7 @@ class EnhancedComposer:
         
         return composition
     
+    @timed('neural.enhance_melody')
     def enhance_melody(self, melody: List[Dict]) -> List[Dict]:
         """Enhance melody using neural network"""
         
@@ -309,10 +621,16 @@ class EnhancedComposer:
                     
                     # Predict next
                     if self.neural_model.model:
-                        prediction = self.neural_model.model.predict(
-                            context_normalized.reshape(1, -1, 3), 
-                            verbose=0
-                        )[0]
+                        if self.neural_model.encoding == 'tokens':
+                            # Token models predict a discrete note; express it in the blend's units
+                            predicted = self.neural_model.predict_next_note(context)
+                            prediction = np.array([predicted['pitch'] / 127, predicted['velocity'] / 127,
+                                                   predicted['duration'] / 4.0])
+                        else:
+                            prediction = self.neural_model.model.predict(
+                                context_normalized.reshape(1, -1, 3), 
+                                verbose=0
+                            )[0]
                         
                         # Blend with original
                         blend_factor = 0.3
@@ -335,34 +653,212 @@ class EnhancedComposer:
         return enhanced
 
 
-def train_neural_composer(midi_directory: str, epochs: int = 100) -> AdvancedNeuralComposer:
-    """Train neural composer on MIDI directory"""
+def train_neural_composer(midi_directory: str, epochs: int = 100,
+                          perf: Optional[PerfProfile] = None, model_name: str = "composer_model",
+                          checkpoint_every: int = 1, resume: bool = False,
+                          init_from: Optional[str] = None,
+                          augment: Optional[AugmentConfig] = None,
+                          encoding: str = 'float',
+                          telemetry: Optional[TelemetryConfig] = None,
+                          config: Optional[TrainingConfig] = None) -> AdvancedNeuralComposer:
+    """
+    Train neural composer on MIDI directory and save it to models/<model_name>.h5.
+    
+    Args:
+        perf: CPU performance profile (see training_perf)
+        model_name: Names the saved model and the checkpoint directory (checkpoints/<model_name>)
+        checkpoint_every: Epochs between checkpoints (0 disables checkpointing)
+        resume: Continue from the latest checkpoint
+        init_from: Saved model (.h5) to fine-tune instead of starting from random weights
+        augment: On-the-fly augmentation of training batches (see augmentation)
+        encoding: 'float' or 'tokens' (event-token model, see event_tokens)
+        telemetry: Training measurements to record as JSONL (see training_telemetry)
+        config: Batch size, validation split, sequence length, model width, seed (see training_config)
+    """
     
     if not TF_AVAILABLE:
         print("TensorFlow not available")
         return None
     
+    if encoding == 'tokens' and (init_from or augment):
+        raise ValueError("--init-from and --augment are not supported with the token encoding")
+    
+    config = config or TrainingConfig()
+    if perf:
+        print_profile(apply_profile(perf))
+    tf.keras.utils.set_random_seed(config.seed)
+    
     print(f"Training neural composer on {midi_directory}...")
     
+    if encoding == 'tokens':
+        return train_token_composer(midi_directory, epochs, perf, model_name, checkpoint_every, resume,
+                                    telemetry, config)
+    
     # Process MIDI files
-    processor = MIDIDataProcessor()
+    processor = MIDIDataProcessor(max_sequence_length=config.seq_length)
     X, y = processor.process_midi_directory(midi_directory)
     
     if len(X) == 0:
         print("No training data found")
         return None
     
+    checkpoint_dir = checkpoint_dir_for(model_name)
+    if resume:
+        check_resume_state(checkpoint_dir, X.shape[1:])
+    
     # Create and train model
-    composer = AdvancedNeuralComposer()
-    composer.build_model(X.shape[1:])
-    composer.train(X, y, epochs=epochs)
+    jit_compile = perf.jit_compile if perf else False
+    composer = AdvancedNeuralComposer(seq_length=config.seq_length, model_name=model_name, units=config.units)
+    if config.auto_batch:
+        train_count = len(X) - int(len(X) * config.validation_split)
+        config = auto_batch_size(composer, config, perf, lambda batch_size: (
+            tf.data.Dataset.from_tensor_slices((X[:train_count], y[:train_count])).repeat().batch(batch_size)))
+    if init_from:
+        print(f"Fine-tuning {init_from}")
+        composer.model = load_for_fine_tuning(init_from, X.shape[1:], jit_compile=jit_compile)
+    else:
+        composer.build_model(X.shape[1:], jit_compile=jit_compile)
+    composer.train(X, y, epochs=epochs, batch_size=config.batch_size, validation_split=config.validation_split,
+                   perf=perf, checkpoint_dir=checkpoint_dir if checkpoint_every > 0 or resume else None,
+                   checkpoint_every=checkpoint_every, resume=resume, augment=augment, telemetry=telemetry)
+    
+    save_trained(composer, midi_directory, config)
+    return composer
+
+
+def train_token_composer(midi_directory: str, epochs: int = 100, perf: Optional[PerfProfile] = None,
+                         model_name: str = "composer_model", checkpoint_every: int = 1,
+                         resume: bool = False, telemetry: Optional[TelemetryConfig] = None,
+                         config: Optional[TrainingConfig] = None) -> AdvancedNeuralComposer:
+    """Tokenize a MIDI directory and train the token variant (perf and the seed must already be applied)"""
+    from event_tokens import build_corpus, footprint, print_footprint
+    
+    config = config or TrainingConfig()
+    processor = MIDIDataProcessor(max_sequence_length=config.seq_length)
+    midi_files = processor.list_midi_files(midi_directory)
+    print(f"Found {len(midi_files)} MIDI files")
+    corpus = build_corpus(midi_files, processor=processor)
+    
+    composer = AdvancedNeuralComposer(seq_length=config.seq_length, model_name=model_name, encoding='tokens',
+                                      vocabulary=corpus.vocabulary, units=config.units)
+    starts = corpus.window_starts(composer.seq_length)
+    if len(starts) == 0:
+        print("No training data found")
+        return None
+    print_footprint(footprint(corpus, composer.seq_length))
+    
+    checkpoint_dir = checkpoint_dir_for(model_name)
+    if resume:
+        check_resume_state(checkpoint_dir, (composer.seq_length,))
+    
+    if config.auto_batch:
+        train_starts = starts[:len(starts) - int(len(starts) * config.validation_split)]
+        config = auto_batch_size(composer, config, perf, lambda batch_size: window_dataset(
+            corpus, train_starts, composer.seq_length, batch_size, seed=config.seed))
     
-    # Save model
-    composer.save_model()
+    composer.build_token_model(jit_compile=perf.jit_compile if perf else False)
+    composer.train_tokens(corpus, epochs=epochs, batch_size=config.batch_size,
+                          validation_split=config.validation_split, perf=perf,
+                          checkpoint_dir=checkpoint_dir if checkpoint_every > 0 or resume else None,
+                          checkpoint_every=checkpoint_every, resume=resume, seed=config.seed, telemetry=telemetry)
     
+    save_trained(composer, midi_directory, config)
     return composer
 
 
+def train_from_dataset(path: str, epochs: int = 100, perf: Optional[PerfProfile] = None,
+                       model_name: str = "composer_model", checkpoint_every: int = 1,
+                       resume: bool = False, in_memory: bool = False,
+                       telemetry: Optional[TelemetryConfig] = None,
+                       config: Optional[TrainingConfig] = None) -> AdvancedNeuralComposer:
+    """
+    Train on a sharded dataset written by MIDIDataProcessor.export_dataset and save
+    to models/<model_name>.h5. The sequence length is the one the dataset was exported with.
+    
+    Args:
+        in_memory: Load the shards into RAM instead of memory-mapping them
+    """
+    
+    if not TF_AVAILABLE:
+        print("TensorFlow not available")
+        return None
+    
+    config = config or TrainingConfig()
+    if perf:
+        print_profile(apply_profile(perf))
+    tf.keras.utils.set_random_seed(config.seed)
+    
+    dataset = ShardedDataset(path, in_memory=in_memory)
+    print(f"Training neural composer on {path} ({'in memory' if in_memory else 'memory-mapped'})...")
+    if config.seq_length != dataset.seq_length:
+        print(f"Using the dataset's sequence length ({dataset.seq_length}) instead of {config.seq_length}")
+        config = replace(config, seq_length=dataset.seq_length)
+    
+    checkpoint_dir = checkpoint_dir_for(model_name)
+    if resume:
+        check_resume_state(checkpoint_dir, dataset.input_shape)
+    
+    composer = AdvancedNeuralComposer(seq_length=dataset.seq_length, model_name=model_name,
+                                      encoding=dataset.encoding, vocabulary=dataset.vocabulary, units=config.units)
+    if config.auto_batch:
+        train_indices, _ = dataset.split(config.validation_split)
+        config = auto_batch_size(composer, config, perf, lambda batch_size: dataset.tf_dataset(
+            train_indices, batch_size, seed=config.seed))
+    
+    composer.train_dataset(dataset, epochs=epochs, batch_size=config.batch_size,
+                           validation_split=config.validation_split, perf=perf,
+                           checkpoint_dir=checkpoint_dir if checkpoint_every > 0 or resume else None,
+                           checkpoint_every=checkpoint_every, resume=resume, seed=config.seed, telemetry=telemetry)
+    if not composer.is_trained:
+        return None
+    
+    save_trained(composer, path, config)
+    return composer
+
+
+def auto_batch_size(composer: AdvancedNeuralComposer, config: TrainingConfig, perf: Optional[PerfProfile],
+                    dataset_for) -> TrainingConfig:
+    """
+    Probe batch sizes on fresh models of the composer's architecture (see
+    training_perf.tune_batch_size); returns config with the fastest that fits
+    config.ram_budget_mb. The probes' weights are discarded.
+    """
+    jit_compile = perf.jit_compile if perf else False
+    if composer.encoding == 'tokens':
+        build = lambda: composer.build_token_model(jit_compile=jit_compile)
+    else:
+        build = lambda: composer.build_model((composer.seq_length, 3), jit_compile=jit_compile)
+    
+    budget = config.ram_budget_mb * 1024 * 1024 if config.ram_budget_mb else None
+    best, results = tune_batch_size(build, dataset_for, ram_budget=budget)
+    composer.model = None
+    print_batch_probes(results, best, config.ram_budget_mb)
+    if best is None:
+        print(f"No probed batch size fits the RAM budget, keeping {config.batch_size}")
+        return config
+    tf.keras.utils.set_random_seed(config.seed)
+    return replace(config, batch_size=best)
+
+
+def save_trained(composer: AdvancedNeuralComposer, corpus: str, config: TrainingConfig) -> str:
+    """Save to models/<model_name>.h5 with a manifest recording the corpus and config; returns the path"""
+    model_path = model_path_for(composer.model_name)
+    os.makedirs(os.path.dirname(model_path) or '.', exist_ok=True)
+    composer.save_model(model_path)
+    write_manifest(model_path, composer.encoding, composer.seq_length, corpus=corpus, training=config.to_dict())
+    return model_path
+
+
+def check_resume_state(checkpoint_dir: str, input_shape: Tuple[int, ...]):
+    """Raise ValueError if the checkpoint was trained on differently shaped inputs"""
+    state = read_state(checkpoint_dir)
+    if state is None:
+        print(f"No checkpoint in {checkpoint_dir}, starting from epoch 0")
+    elif tuple(state['input_shape']) != tuple(input_shape):
+        raise ValueError(f"Checkpoint in {checkpoint_dir} was trained on shape {tuple(state['input_shape'])}, "
+                         f"corpus has {tuple(input_shape)}")
+
+
 if __name__ == "__main__":
     # Example usage
     print("Advanced Neural Network Composer")
@@ -6,6 +6,17 @@ class ComposerApp {
         this.categories = {};
         this.selectedGenre = null;
         this.currentCategory = 'all';
+        this.searchLimit = 100;
+        this.searchTimer = null;
+        // 'stream': MIDI bytes come back in the generate response
+        // 'file': the server writes to output/ and we download it with a second request
+        this.deliveryMode = 'stream';
+        this.downloadUrl = null;
+        // Live preview (Server-Sent Events + Web Audio)
+        this.previewSource = null;
+        this.audioContext = null;
+        this.previewStart = 0;
+        this.previewVoices = [];
         
         this.init();
     }
@@ -35,6 +46,10 @@ class ComposerApp {
         document.getElementById('searchInput').addEventListener('keypress', (e) => {
             if (e.key === 'Enter') this.search();
         });
+        document.getElementById('searchInput').addEventListener('input', () => {
+            clearTimeout(this.searchTimer);
+            this.searchTimer = setTimeout(() => this.search(), 120);
+        });
         
         // Category tabs
         document.querySelectorAll('.tab-btn').forEach(btn => {
@@ -55,6 +70,15 @@ class ComposerApp {
         // Generate button
         document.getElementById('generateBtn').addEventListener('click', () => this.generate());
         
+        // Live preview
+        document.getElementById('previewBtn').addEventListener('click', () => {
+            if (this.previewSource) {
+                this.stopPreview();
+            } else {
+                this.startPreview();
+            }
+        });
+        
         // Neural network training
         document.getElementById('trainNeuralBtn').addEventListener('click', () => this.trainNeural());
         
@@ -200,7 +224,7 @@ class ComposerApp {
         }
         
         try {
-            const response = await fetch(`/api/search?q=${encodeURIComponent(query)}`);
+            const response = await fetch(`/api/search?q=${encodeURIComponent(query)}&limit=${this.searchLimit}`);
             const results = await response.json();
             this.renderGenres(results);
         } catch (error) {
@@ -217,6 +241,7 @@ class ComposerApp {
         const bars = parseInt(document.getElementById('barsInput').value);
         const seed = document.getElementById('seedInput').value || null;
         const useNeural = document.getElementById('useNeuralCheckbox').checked;
+        const archive = document.getElementById('archiveCheckbox').checked;
         
         const generateBtn = document.getElementById('generateBtn');
         const progressContainer = document.getElementById('progressContainer');
@@ -235,13 +260,14 @@ class ComposerApp {
                 ...(seed && { seed })
             });
             
-            const response = await fetch(`/api/generate?${params}`);
-            const result = await response.json();
+            const result = this.deliveryMode === 'stream'
+                ? await this.generateStreamed(params, archive)
+                : await this.generateFile(params);
             
             if (result.success) {
                 // Show download link
                 const downloadLink = document.getElementById('downloadLink');
-                downloadLink.href = `/output/${result.filename}`;
+                downloadLink.href = result.href;
                 downloadLink.download = result.filename;
                 downloadContainer.style.display = 'block';
                 
@@ -259,6 +285,155 @@ class ComposerApp {
         }
     }
     
+    async generateStreamed(params, archive) {
+        // Single round trip: the response body is the MIDI file itself
+        params.set('stream', 'true');
+        if (archive) params.set('archive', 'true');
+        
+        const response = await fetch(`/api/generate?${params}`);
+        if (!response.ok) {
+            throw new Error(`${response.status} ${response.statusText}`);
+        }
+        
+        const blob = await response.blob();
+        const filename = this.parseFilename(response.headers.get('Content-Disposition'))
+            || `${params.get('genre')}.mid`;
+        
+        if (this.downloadUrl) URL.revokeObjectURL(this.downloadUrl);
+        this.downloadUrl = URL.createObjectURL(blob);
+        
+        return { success: true, href: this.downloadUrl, filename };
+    }
+    
+    async generateFile(params) {
+        // Server writes the file, then the link downloads it with a second request
+        const response = await fetch(`/api/generate?${params}`);
+        const result = await response.json();
+        
+        return {
+            success: result.success,
+            href: result.url || `/output/${result.filename}`,
+            filename: result.filename
+        };
+    }
+    
+    startPreview() {
+        if (!this.selectedGenre) {
+            this.showError('Por favor selecciona un género');
+            return;
+        }
+        
+        const bars = parseInt(document.getElementById('barsInput').value);
+        const seed = document.getElementById('seedInput').value || null;
+        const useNeural = document.getElementById('useNeuralCheckbox').checked;
+        const params = new URLSearchParams({
+            genre: this.selectedGenre,
+            bars: bars,
+            neural: useNeural,
+            ...(seed && { seed })
+        });
+        
+        // The AudioContext must be created from the click handler
+        if (!this.audioContext) {
+            this.audioContext = new (window.AudioContext || window.webkitAudioContext)();
+        }
+        this.audioContext.resume();
+        
+        const source = new EventSource(`/api/stream?${params}`);
+        this.previewSource = source;
+        document.getElementById('previewBtn').textContent = '⏹ Detener';
+        
+        source.addEventListener('meta', (e) => {
+            const meta = JSON.parse(e.data);
+            // Small scheduling margin so the first bar is never late
+            this.previewStart = this.audioContext.currentTime + 0.05;
+            document.getElementById('tempoDisplay').textContent = `${meta.tempo} BPM`;
+            document.getElementById('timeSignatureDisplay').textContent =
+                `${meta.time_signature[0]}/${meta.time_signature[1]}`;
+        });
+        
+        source.addEventListener('bar', (e) => {
+            const bar = JSON.parse(e.data);
+            bar.notes.forEach(([track, pitch, velocity, start, duration]) => {
+                this.schedulePreviewNote(track, pitch, velocity, this.previewStart + start, duration);
+            });
+        });
+        
+        source.addEventListener('end', () => {
+            // Close before the server disconnects, otherwise EventSource reconnects
+            source.close();
+            this.previewSource = null;
+            document.getElementById('previewBtn').textContent = '🔊 Escuchar en vivo';
+        });
+        
+        source.onerror = () => {
+            if (this.previewSource === source) {
+                this.stopPreview();
+            }
+        };
+    }
+    
+    stopPreview() {
+        if (this.previewSource) {
+            this.previewSource.close();
+            this.previewSource = null;
+        }
+        const now = this.audioContext ? this.audioContext.currentTime : 0;
+        this.previewVoices.forEach(voice => {
+            try { voice.stop(now); } catch (error) { /* already stopped */ }
+        });
+        this.previewVoices = [];
+        document.getElementById('previewBtn').textContent = '🔊 Escuchar en vivo';
+    }
+    
+    schedulePreviewNote(track, pitch, velocity, when, duration) {
+        const ctx = this.audioContext;
+        const gain = ctx.createGain();
+        const level = Math.max(0, Math.min(127, velocity)) / 127 * 0.15;
+        gain.connect(ctx.destination);
+        
+        let voice;
+        if (track === 'drums') {
+            // Short noise burst, pitched kicks
+            const length = Math.floor(ctx.sampleRate * 0.08);
+            const buffer = ctx.createBuffer(1, length, ctx.sampleRate);
+            const samples = buffer.getChannelData(0);
+            for (let i = 0; i < length; i++) {
+                samples[i] = (Math.random() * 2 - 1) * (1 - i / length);
+            }
+            voice = ctx.createBufferSource();
+            voice.buffer = buffer;
+            if (pitch === 36) voice.playbackRate.value = 0.25;
+            gain.gain.setValueAtTime(level, when);
+            voice.connect(gain);
+            voice.start(when);
+            voice.stop(when + 0.1);
+        } else {
+            voice = ctx.createOscillator();
+            voice.type = { melody: 'triangle', chords: 'sine', bass: 'square' }[track] || 'sine';
+            voice.frequency.value = 440 * Math.pow(2, (pitch - 69) / 12);
+            const end = when + Math.max(0.05, duration);
+            gain.gain.setValueAtTime(0, when);
+            gain.gain.linearRampToValueAtTime(track === 'bass' ? level * 0.5 : level, when + 0.01);
+            gain.gain.linearRampToValueAtTime(0, end);
+            voice.connect(gain);
+            voice.start(when);
+            voice.stop(end + 0.02);
+        }
+        
+        this.previewVoices.push(voice);
+        voice.onended = () => {
+            const index = this.previewVoices.indexOf(voice);
+            if (index >= 0) this.previewVoices.splice(index, 1);
+        };
+    }
+    
+    parseFilename(disposition) {
+        if (!disposition) return null;
+        const match = disposition.match(/filename="?([^";]+)"?/);
+        return match ? match[1] : null;
+    }
+    
     async checkModelStatus() {
         try {
             const response = await fetch('/api/model-status');
@@ -0,0 +1,469 @@
+"""
+Declarative Arrangement Engine
+Describes a multi-section piece as data (sections, which tracks play in each
+one and how their dynamics evolve) and renders every (section, track) pair
+independently on a process pool before merging them into one MIDI file.
+
+Arrangements are plain dicts/JSON:
+    {
+        "name": "...", "tempo": 72, "time_signature": [4, 4], "seed": 42,
+        "tracks": [{"name": "Piano", "channel": 0, "program": 0}, ...],
+        "sections": [{"name": "intro", "bars": 16}, ...],
+        "parts": [
+            {"track": "Piano", "section": "intro",
+             "dynamics": {"gain": [1.0, 0.4]},
+             "layers": [{"renderer": "piano_arpeggio", "velocity": [40, 55]}, ...]},
+            ...
+        ]
+    }
+Layer keys other than renderer/every/offset/bars/dynamics are passed to the
+renderer as options. "bars" limits a layer to [start, end) within its section.
+"""
+import os
+import sys
+import json
+import time
+import multiprocessing
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from instrumentation import profiled
+
+import numpy as np
+
+try:
+    from midiutil import MIDIFile
+    MIDIUTIL_AVAILABLE = True
+except ImportError:
+    MIDIUTIL_AVAILABLE = False
+
+# Fade curve shapes: map progress t in [0, 1) onto interpolation weight
+FADE_CURVES: Dict[str, Callable[[float], float]] = {
+    'linear': lambda t: t,
+    'ease_in': lambda t: t * t,
+    'ease_out': lambda t: 1.0 - (1.0 - t) ** 2,
+    'smooth': lambda t: t * t * (3.0 - 2.0 * t),
+    'step': lambda t: 0.0 if t < 0.5 else 1.0,
+}
+
+# GM drum map
+KICK = 36
+SNARE = 38
+HIHAT_CLOSED = 42
+HIHAT_OPEN = 46
+RIDE = 51
+
+LAYER_KEYS = ('renderer', 'every', 'offset', 'bars', 'dynamics')
+
+
+@dataclass
+class Dynamics:
+    """Velocity shaping over a span: velocity * gain(t) + boost(t), clamped."""
+    curve: str = 'linear'
+    gain: Tuple[float, float] = (1.0, 1.0)
+    boost: Tuple[float, float] = (0.0, 0.0)
+    min_velocity: int = 1
+    max_velocity: int = 127
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> 'Dynamics':
+        data = data or {}
+        if data.get('curve', 'linear') not in FADE_CURVES:
+            raise ValueError(f"Unknown fade curve: {data['curve']}")
+        return cls(
+            curve=data.get('curve', 'linear'),
+            gain=tuple(data.get('gain', (1.0, 1.0))),
+            boost=tuple(data.get('boost', (0.0, 0.0))),
+            min_velocity=int(data.get('min', 1)),
+            max_velocity=int(data.get('max', 127)),
+        )
+
+    def apply(self, velocity: float, t: float) -> int:
+        w = FADE_CURVES[self.curve](t)
+        gain = self.gain[0] + (self.gain[1] - self.gain[0]) * w
+        boost = self.boost[0] + (self.boost[1] - self.boost[0]) * w
+        return int(max(self.min_velocity, min(self.max_velocity, velocity * gain + boost)))
+
+
+@dataclass
+class LayerSpec:
+    """One renderer applied to a range of bars within a section."""
+    renderer: str
+    options: Dict = field(default_factory=dict)
+    every: int = 1
+    offset: int = 0
+    bars: Optional[Tuple[int, int]] = None
+    dynamics: Dynamics = field(default_factory=Dynamics)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'LayerSpec':
+        if data['renderer'] not in RENDERERS:
+            raise ValueError(f"Unknown renderer: {data['renderer']}")
+        return cls(
+            renderer=data['renderer'],
+            options={k: v for k, v in data.items() if k not in LAYER_KEYS},
+            every=int(data.get('every', 1)),
+            offset=int(data.get('offset', 0)),
+            bars=tuple(data['bars']) if data.get('bars') else None,
+            dynamics=Dynamics.from_dict(data.get('dynamics')),
+        )
+
+
+@dataclass
+class PartSpec:
+    """What one track plays during one section."""
+    track: str
+    section: str
+    layers: List[LayerSpec]
+    dynamics: Dynamics = field(default_factory=Dynamics)
+
+
+@dataclass
+class SectionSpec:
+    name: str
+    bars: int
+
+
+@dataclass
+class TrackSpec:
+    name: str
+    channel: int
+    program: Optional[int] = None
+
+
+@dataclass
+class Arrangement:
+    """A complete piece: global settings, tracks, section table and parts."""
+    name: str
+    tempo: int
+    time_signature: Tuple[int, int]
+    tracks: List[TrackSpec]
+    sections: List[SectionSpec]
+    parts: List[PartSpec]
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Arrangement':
+        tracks = [TrackSpec(t['name'], int(t['channel']), t.get('program')) for t in data['tracks']]
+        sections = [SectionSpec(s['name'], int(s['bars'])) for s in data['sections']]
+        track_names = {t.name for t in tracks}
+        section_names = {s.name for s in sections}
+
+        parts = []
+        for part in data['parts']:
+            if part['track'] not in track_names:
+                raise ValueError(f"Part refers to unknown track: {part['track']}")
+            if part['section'] not in section_names:
+                raise ValueError(f"Part refers to unknown section: {part['section']}")
+            parts.append(PartSpec(
+                track=part['track'],
+                section=part['section'],
+                layers=[LayerSpec.from_dict(layer) for layer in part['layers']],
+                dynamics=Dynamics.from_dict(part.get('dynamics')),
+            ))
+
+        return cls(
+            name=data.get('name', 'Untitled'),
+            tempo=int(data.get('tempo', 120)),
+            time_signature=tuple(data.get('time_signature', (4, 4))),
+            tracks=tracks,
+            sections=sections,
+            parts=parts,
+            seed=data.get('seed'),
+        )
+
+    @property
+    def total_bars(self) -> int:
+        return sum(s.bars for s in self.sections)
+
+    def section_starts(self) -> Dict[str, int]:
+        starts, bar = {}, 0
+        for section in self.sections:
+            starts[section.name] = bar
+            bar += section.bars
+        return starts
+
+    def track_index(self, name: str) -> int:
+        return next(i for i, t in enumerate(self.tracks) if t.name == name)
+
+    def section_index(self, name: str) -> int:
+        return next(i for i, s in enumerate(self.sections) if s.name == name)
+
+
+def load_arrangement(path: str) -> Arrangement:
+    """Load an arrangement from a JSON file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return Arrangement.from_dict(json.load(f))
+
+
+# ---------------------------------------------------------------------------
+# Renderers: (ensemble, context, options) -> [(beat_in_bar, pitch, velocity, duration)]
+# ---------------------------------------------------------------------------
+
+@dataclass
+class BarContext:
+    section: str
+    bar: int        # Absolute bar
+    local_bar: int  # Bar within the section
+    beats_per_bar: int
+
+
+RENDERERS: Dict[str, Callable] = {}
+
+
+def renderer(name: str):
+    """Register a bar renderer under a name usable in arrangement data."""
+    def register(func):
+        RENDERERS[name] = func
+        return func
+    return register
+
+
+class Ensemble:
+    """The A Dawn generators, built once per worker process."""
+
+    def __init__(self, neural_weights: Optional[List[np.ndarray]] = None):
+        from piano_composer import PianoComposer
+        from bass_generator import BassLineGenerator
+        from rhythm_generator import DrumPatternGenerator
+        self.piano = PianoComposer(neural_weights=neural_weights)
+        self.bass = BassLineGenerator()
+        self.drums = DrumPatternGenerator()
+
+
+def _chord(ensemble: Ensemble, ctx: BarContext, options: Dict) -> str:
+    progression = ensemble.piano.PROGRESSIONS[options.get('progression', ctx.section)]
+    return progression[ctx.local_bar % len(progression)]
+
+
+@renderer('piano_arpeggio')
+def render_piano_arpeggio(ensemble, ctx, options):
+    velocity = tuple(options.get('velocity', (50, 70)))
+    transpose = options.get('transpose', -12)
+    arp = ensemble.piano.generate_arpeggio(_chord(ensemble, ctx, options), ctx.beats_per_bar, velocity)
+    return [(beat, note + transpose, vel, dur) for beat, note, vel, dur in arp]
+
+
+@renderer('piano_melody')
+def render_piano_melody(ensemble, ctx, options):
+    phrase_bars = options.get('phrase_bars', 1)
+    return ensemble.piano.generate_melody(phrase_bars, options.get('base_note', 72))
+
+
+@renderer('piano_chord_hits')
+def render_piano_chord_hits(ensemble, ctx, options):
+    return ensemble.piano.generate_chord_hits(_chord(ensemble, ctx, options), options.get('beat', 0),
+                                              options.get('velocity', 75))
+
+
+@renderer('bass_pattern')
+def render_bass_pattern(ensemble, ctx, options):
+    roots = ensemble.bass.CHORD_ROOTS[options.get('roots', ctx.section)]
+    return ensemble.bass.generate_bass_pattern(roots[ctx.local_bar % len(roots)], ctx.beats_per_bar)
+
+
+def _drum_hits(hits, pitch, duration):
+    return [(beat, pitch, vel, duration) for beat, vel in hits]
+
+
+@renderer('drum_kick')
+def render_drum_kick(ensemble, ctx, options):
+    return _drum_hits(ensemble.drums.generate_kick_pattern(1), options.get('pitch', KICK),
+                      options.get('duration', 0.5))
+
+
+@renderer('drum_snare')
+def render_drum_snare(ensemble, ctx, options):
+    return _drum_hits(ensemble.drums.generate_snare_pattern(1), options.get('pitch', SNARE),
+                      options.get('duration', 0.25))
+
+
+@renderer('drum_hihat')
+def render_drum_hihat(ensemble, ctx, options):
+    return _drum_hits(ensemble.drums.generate_hihat_pattern(1), options.get('pitch', HIHAT_CLOSED),
+                      options.get('duration', 0.25))
+
+
+@renderer('hit')
+def render_hit(ensemble, ctx, options):
+    """A single fixed note, e.g. a ride or crash accent."""
+    return [(options.get('beat', 0), options.get('pitch', RIDE), options.get('velocity', 60),
+             options.get('duration', 1.0))]
+
+
+# ---------------------------------------------------------------------------
+# Engine
+# ---------------------------------------------------------------------------
+
+_ENSEMBLE: Optional[Ensemble] = None
+
+
+def _get_ensemble() -> Ensemble:
+    global _ENSEMBLE
+    if _ENSEMBLE is None:
+        _ENSEMBLE = Ensemble()
+    return _ENSEMBLE
+
+
+def _init_ensemble(neural_weights: Optional[List[np.ndarray]]):
+    """Build this process's ensemble around the shared neural weights (pool initializer)."""
+    global _ENSEMBLE
+    _ENSEMBLE = Ensemble(neural_weights)
+
+
+def train_neural_weights(seed: Optional[int]) -> Optional[List[np.ndarray]]:
+    """
+    Train the piano's melody network once, seeded, and return its weights for
+    every worker; None without TensorFlow (the piano then uses its rule-based
+    fallback, which draws from the per-part seeded RNG).
+    """
+    from neural_melody import NeuralMelodyGenerator, TF_AVAILABLE, tf
+    from piano_composer import PianoComposer
+    if not TF_AVAILABLE:
+        return None
+    seed = 0 if seed is None else seed
+    np.random.seed(seed)
+    tf.keras.utils.set_random_seed(seed)
+    generator = NeuralMelodyGenerator()
+    generator.train(epochs=PianoComposer.NEURAL_EPOCHS, verbose=0)
+    return generator.get_weights()
+
+
+def task_seed(seed: Optional[int], section_index: int, track_index: int) -> int:
+    """Independent, order-free seed for one (section, track) pair."""
+    entropy = [section_index, track_index] if seed is None else [seed, section_index, track_index]
+    return int(np.random.SeedSequence(entropy).generate_state(1)[0])
+
+
+def render_part(arrangement: Arrangement, part_index: int, seed: int) -> Dict:
+    """
+    Render one (section, track) part.
+    Returns {'part', 'events': [(pitch, start_beat, duration, velocity)], 'elapsed'}.
+    """
+    start_time = time.perf_counter()
+    part = arrangement.parts[part_index]
+    ensemble = _get_ensemble()
+    np.random.seed(seed)  # The A Dawn generators draw from the global RNG
+
+    beats_per_bar = arrangement.time_signature[0]
+    section_start = arrangement.section_starts()[part.section]
+    section_bars = arrangement.sections[arrangement.section_index(part.section)].bars
+
+    events = []
+    for layer in part.layers:
+        first, last = layer.bars or (0, section_bars)
+        last = min(last, section_bars)
+        span = max(1, last - first)
+        render = RENDERERS[layer.renderer]
+
+        for local_bar in range(first, last):
+            if (local_bar - first - layer.offset) % layer.every:
+                continue
+            ctx = BarContext(part.section, section_start + local_bar, local_bar, beats_per_bar)
+            layer_t = (local_bar - first) / span
+            part_t = local_bar / section_bars
+            for beat, pitch, velocity, duration in render(ensemble, ctx, layer.options):
+                velocity = part.dynamics.apply(layer.dynamics.apply(velocity, layer_t), part_t)
+                events.append((int(pitch), ctx.bar * beats_per_bar + float(beat), float(duration), velocity))
+
+    return {'part': part_index, 'events': events, 'elapsed': time.perf_counter() - start_time}
+
+
+def render_arrangement(arrangement: Arrangement, workers: int = None, seed: int = None) -> Dict:
+    """
+    Render every part, in parallel when workers != 1.
+
+    Each part gets its own seed derived from (seed, section, track), so the
+    result does not depend on worker count or completion order. The piano's
+    melody network is trained once here and its weights shipped to every
+    worker, instead of each worker training its own.
+
+    Returns: {'tracks': {track_name: [events]}, 'timings': {(section, track): seconds}, ...}
+    """
+    seed = arrangement.seed if seed is None else seed
+    seeds = [task_seed(seed, arrangement.section_index(p.section), arrangement.track_index(p.track))
+             for p in arrangement.parts]
+    workers = workers or min(len(arrangement.parts), os.cpu_count() or 1)
+
+    start = time.perf_counter()
+    weights = train_neural_weights(seed)
+    if workers == 1:
+        _init_ensemble(weights)
+        results = [render_part(arrangement, i, s) for i, s in enumerate(seeds)]
+    else:
+        # TensorFlow's runtime is already running here once the network is trained:
+        # start the workers fresh instead of forking it
+        context = multiprocessing.get_context('spawn') if weights is not None else None
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_ensemble, initargs=(weights,)) as pool:
+            futures = [pool.submit(render_part, arrangement, i, s) for i, s in enumerate(seeds)]
+            results = [future.result() for future in futures]
+
+    tracks = {t.name: [] for t in arrangement.tracks}
+    timings = {}
+    for result in results:
+        part = arrangement.parts[result['part']]
+        tracks[part.track].extend(result['events'])
+        timings[(part.section, part.track)] = result['elapsed']
+    for events in tracks.values():
+        events.sort(key=lambda e: (e[1], e[0], e[2], e[3]))
+
+    return {
+        'tracks': tracks,
+        'timings': timings,
+        'workers': workers,
+        'elapsed': time.perf_counter() - start,
+    }
+
+
+def write_arrangement(arrangement: Arrangement, output_file: str, workers: int = None,
+                      seed: int = None) -> Dict:
+    """Render an arrangement and write it as a multitrack MIDI file. Returns the render summary."""
+    if not MIDIUTIL_AVAILABLE:
+        raise ImportError("midiutil is required. Install with: pip install midiutil")
+
+    rendered = render_arrangement(arrangement, workers, seed)
+
+    midi = MIDIFile(len(arrangement.tracks), deinterleave=False)
+    numerator, denominator = arrangement.time_signature
+    midi.addTempo(0, 0, arrangement.tempo)
+    midi.addTimeSignature(0, 0, numerator, int(np.log2(denominator)), 24, 8)
+
+    for index, track in enumerate(arrangement.tracks):
+        midi.addTrackName(index, 0, track.name)
+        if track.program is not None:
+            midi.addProgramChange(index, track.channel, 0, track.program)
+        for pitch, start, duration, velocity in rendered['tracks'][track.name]:
+            midi.addNote(index, track.channel, pitch, start, duration, velocity)
+
+    with open(output_file, 'wb') as f:
+        midi.writeFile(f)
+    return rendered
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render a declarative arrangement (JSON) to MIDI")
+    parser.add_argument("arrangement", help="Arrangement JSON file")
+    parser.add_argument("-o", "--output", help="Output filename (default: <arrangement>.mid)")
+    parser.add_argument("-w", "--workers", type=int, help="Worker processes (default: one per part, up to CPU count)")
+    parser.add_argument("-s", "--seed", type=int, help="Override the arrangement seed")
+    parser.add_argument("--profile", nargs="?", const="arrangement.prof", metavar="FILE",
+                        help="Profile the run with cProfile and write pstats output (default: arrangement.prof); "
+                             "worker processes are not profiled, use -w 1 to include rendering")
+    args = parser.parse_args()
+
+    arrangement = load_arrangement(args.arrangement)
+    output = args.output or os.path.splitext(os.path.basename(args.arrangement))[0] + '.mid'
+    with profiled(args.profile):
+        summary = write_arrangement(arrangement, output, args.workers, args.seed)
+    print(f"✓ {arrangement.name}: {arrangement.total_bars} bars, {len(arrangement.parts)} parts "
+          f"on {summary['workers']} workers in {summary['elapsed']:.2f}s -> {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Training Data Augmentation
+Random transposition, velocity scaling and duration stretching applied per
+batch to normalized (pitch, velocity, duration) sequences as they stream
+into training, instead of storing transposed copies of the corpus.
+
+Each batch draws from its own generator seeded with (seed, step), so an
+augmented run is reproducible regardless of prefetching or parallel maps.
+"""
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+
+from lazy_imports import LazyModule
+
+tf = LazyModule('tensorflow')
+
+# Feature layout and scaling used by MIDIDataProcessor.normalize_note
+PITCH, VELOCITY, DURATION = 0, 1, 2
+NOTE_RANGE = (21, 108)
+
+
+@dataclass
+class AugmentConfig:
+    """Augmentation ranges. Zero disables a transform."""
+    pitch_shift: int = 6             # Max transposition in semitones (either direction)
+    velocity_scale: float = 0.15     # Velocities scaled by a factor in [1 - v, 1 + v]
+    duration_stretch: float = 0.1    # Durations scaled by a factor in [1 - d, 1 + d]
+    seed: int = 0
+
+
+def batch_rng(seed: int, step: int) -> np.random.Generator:
+    return np.random.default_rng([seed, step])
+
+
+def augment_batch(X: np.ndarray, y: np.ndarray, rng: np.random.Generator, config: AugmentConfig,
+                  note_range: Tuple[int, int] = NOTE_RANGE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Augment one batch. X is (batch, seq_length, 3), y is (batch, 3); one set of
+    factors is drawn per sequence and applied to its inputs and target alike.
+    Transpositions are limited per sequence so every note stays within note_range.
+    """
+    X = X.astype(np.float32, copy=True)
+    y = y.astype(np.float32, copy=True)
+    batch = len(X)
+    span = note_range[1] - note_range[0]
+
+    if config.pitch_shift:
+        # Room to move each sequence up and down, in semitones
+        lowest = np.minimum(X[:, :, PITCH].min(axis=1), y[:, PITCH])
+        highest = np.maximum(X[:, :, PITCH].max(axis=1), y[:, PITCH])
+        down = np.clip(np.floor(lowest * span + 1e-6), 0, config.pitch_shift)
+        up = np.clip(np.floor((1.0 - highest) * span + 1e-6), 0, config.pitch_shift)
+        # Uniform integer in [-down, up]
+        shift = np.minimum(np.floor(rng.random(batch) * (up + down + 1)) - down, up)
+        shift = (shift / span).astype(np.float32)
+        X[:, :, PITCH] += shift[:, None]
+        y[:, PITCH] += shift
+
+    if config.velocity_scale:
+        factor = rng.uniform(1 - config.velocity_scale, 1 + config.velocity_scale, batch).astype(np.float32)
+        X[:, :, VELOCITY] = np.clip(X[:, :, VELOCITY] * factor[:, None], 0.0, 1.0)
+        y[:, VELOCITY] = np.clip(y[:, VELOCITY] * factor, 0.0, 1.0)
+
+    if config.duration_stretch:
+        factor = rng.uniform(1 - config.duration_stretch, 1 + config.duration_stretch, batch).astype(np.float32)
+        X[:, :, DURATION] = np.clip(X[:, :, DURATION] * factor[:, None], 0.0, 1.0)
+        y[:, DURATION] = np.clip(y[:, DURATION] * factor, 0.0, 1.0)
+
+    return X, y
+
+
+def augment_dataset(dataset, config: AugmentConfig, start_step: int = 0):
+    """
+    Apply augment_batch to a batched tf.data.Dataset of (X, y). The dataset should
+    repeat (with steps_per_epoch set in fit) so step numbers, and therefore the
+    random draws, keep advancing across epochs; start_step continues the count
+    when resuming.
+    """
+    def augment(step, X, y):
+        return augment_batch(X, y, batch_rng(config.seed, int(step)), config)
+
+    def apply(step, batch):
+        X, y = batch
+        X_aug, y_aug = tf.numpy_function(augment, [step, X, y], [tf.float32, tf.float32])
+        X_aug.set_shape(X.shape)
+        y_aug.set_shape(y.shape)
+        return X_aug, y_aug
+
+    return dataset.enumerate(start=start_step).map(apply, num_parallel_calls=tf.data.AUTOTUNE, deterministic=True)
+
+
+def training_dataset(X: np.ndarray, y: np.ndarray, batch_size: int, config: AugmentConfig, start_step: int = 0):
+    """Shuffled, repeating, augmented dataset over the training arrays (no copies of the corpus)."""
+    dataset = (tf.data.Dataset.from_tensor_slices((X, y))
+               .shuffle(len(X), seed=config.seed)
+               .repeat()
+               .batch(batch_size))
+    return augment_dataset(dataset, config, start_step).prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,259 @@
+"""
+Vectorized Bass Engine
+Table-driven bass lines: each style is a rhythm template plus interval
+distributions, sampled for every bar at once into a note array instead of
+note-by-note loops with several RNG calls per note.
+
+Two kinds of templates:
+  - BassStyle: fixed onsets per bar (GenreComposer bass styles)
+  - FreeRhythmStyle: durations drawn from a distribution until the bar is full
+    (the A Dawn BassLineGenerator)
+"""
+import time
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+from note_array import NOTE_DTYPE, make_notes
+
+
+@dataclass(frozen=True)
+class BassStyle:
+    """Fixed rhythm template with per-onset interval choices (above the bar's root)."""
+    onsets: Optional[Tuple[float, ...]] = None  # Beats within the bar; None = every `step` beats
+    step: float = 1.0
+    duration: Optional[float] = None            # None = whole bar
+    intervals: Tuple[Tuple[int, ...], ...] = ((0,),)  # Choices per onset slot; the last entry repeats
+    approach: bool = False                      # Last onset leads a semitone into the next bar's root
+
+    def onsets_for(self, beats_per_bar: int) -> np.ndarray:
+        if self.onsets is not None:
+            return np.asarray(self.onsets, dtype=np.float64)
+        return np.arange(0, beats_per_bar, self.step, dtype=np.float64)
+
+
+@dataclass(frozen=True)
+class FreeRhythmStyle:
+    """Durations and intervals drawn from distributions until each bar is full."""
+    durations: Tuple[float, ...]
+    duration_probs: Tuple[float, ...]
+    intervals: Tuple[int, ...]
+    interval_probs: Tuple[float, ...]
+    velocity: Tuple[int, int] = (60, 85)  # [low, high)
+
+
+# GenreComposer bass styles
+BASS_STYLES: Dict[str, BassStyle] = {
+    'walking': BassStyle(step=1.0, duration=1.0, intervals=((0,), (0, 5, 7, 12)), approach=True),
+    'root_fifth': BassStyle(onsets=(0, 2), duration=2.0, intervals=((0,), (7,))),
+    '808': BassStyle(onsets=(0,), duration=None),
+    'tumbao': BassStyle(onsets=(0, 0.5, 2.5, 3), duration=0.5, intervals=((0,), (7,), (0,), (7,))),
+    'default': BassStyle(step=2.0, duration=2.0),
+}
+
+# Genre bass_style values -> template
+STYLE_ALIASES = {
+    'walking': 'walking', 'walking_swing': 'walking', 'blues_walking': 'walking',
+    'root_fifth': 'root_fifth', 'root_power': 'root_fifth',
+    '808_bass': '808', 'trap': '808', 'drill_bass': '808',
+    'tumbao': 'tumbao', 'salsa_bass': 'tumbao',
+}
+
+# BassLineGenerator: root 70% of the time, otherwise root/5th/octave up/down;
+# quarter notes 70% of the time, otherwise eighth, dotted quarter or half
+DAWN_STYLE = FreeRhythmStyle(
+    durations=(1.0, 0.5, 1.5, 2.0),
+    duration_probs=(0.7, 0.1, 0.1, 0.1),
+    intervals=(0, 7, 12, -12),
+    interval_probs=(0.775, 0.075, 0.075, 0.075),
+)
+
+
+def style_for(bass_style: str) -> BassStyle:
+    """Template for a genre's bass_style."""
+    return BASS_STYLES[STYLE_ALIASES.get(bass_style, 'default')]
+
+
+def _integers(rng, low, high, size):
+    """Uniform ints in [low, high) from a Generator or the legacy np.random API."""
+    if hasattr(rng, 'integers'):
+        return rng.integers(low, high, size=size)
+    return rng.randint(low, high, size=size)
+
+
+def root_timeline(chord_roots: Sequence[int], first_bar: int, bars: int) -> np.ndarray:
+    """Roots for bars [first_bar, first_bar + bars], cycling through chord_roots (one extra bar for approaches)."""
+    roots = np.asarray(chord_roots, dtype=np.int64)
+    return roots[np.arange(first_bar, first_bar + bars + 1) % len(roots)]
+
+
+def render_style(style: BassStyle, rng, roots: np.ndarray, beats_per_bar: int,
+                 velocity: Tuple[int, int], first_bar: int = 0) -> np.ndarray:
+    """
+    Sample a fixed-onset style for len(roots) - 1 bars.
+
+    Args:
+        roots: Root per bar plus the root of the bar after the last (see root_timeline)
+        velocity: [low, high] velocity range (inclusive)
+        first_bar: Absolute index of the first bar (positions notes in time)
+    """
+    bars = len(roots) - 1
+    onsets = style.onsets_for(beats_per_bar)
+    slots = len(onsets)
+    if bars <= 0 or slots == 0:
+        return np.empty(0, dtype=NOTE_DTYPE)
+
+    bar_index = np.repeat(np.arange(bars), slots)
+    slot_index = np.tile(np.arange(slots), bars)
+
+    # Interval choices are sampled per slot, vectorized across bars
+    intervals = np.zeros((bars, slots), dtype=np.int64)
+    for slot in range(slots):
+        choices = np.asarray(style.intervals[min(slot, len(style.intervals) - 1)])
+        if len(choices) == 1:
+            intervals[:, slot] = choices[0]
+        else:
+            intervals[:, slot] = choices[_integers(rng, 0, len(choices), bars)]
+    pitch = roots[bar_index] + intervals.ravel()
+
+    # Approach tones: a semitone above or below the next bar's root
+    if style.approach and slots > 1:
+        last = slot_index == slots - 1
+        pitch[last] = roots[bar_index[last] + 1] + np.where(_integers(rng, 0, 2, bars) == 0, -1, 1)
+
+    velocities = _integers(rng, velocity[0], velocity[1] + 1, bars * slots)
+    start = (first_bar + bar_index) * beats_per_bar + onsets[slot_index]
+    duration = style.duration if style.duration is not None else float(beats_per_bar)
+    return make_notes(pitch, velocities, start, duration)
+
+
+def render_free_rhythm(style: FreeRhythmStyle, rng, roots: Sequence[int], beats: float = 4) -> np.ndarray:
+    """Sample a free-rhythm style for one bar per root; starts are relative to the first bar."""
+    roots = np.asarray(roots, dtype=np.int64)
+    bars = len(roots)
+    max_notes = int(np.ceil(beats / min(style.durations)))
+    if bars == 0:
+        return np.empty(0, dtype=NOTE_DTYPE)
+
+    durations = rng.choice(np.asarray(style.durations), size=(bars, max_notes), p=style.duration_probs)
+    intervals = rng.choice(np.asarray(style.intervals), size=(bars, max_notes), p=style.interval_probs)
+    velocities = _integers(rng, style.velocity[0], style.velocity[1], (bars, max_notes))
+
+    offsets = np.cumsum(durations, axis=1) - durations
+    keep = offsets < beats
+    bar_index = np.broadcast_to(np.arange(bars)[:, None], keep.shape)[keep]
+
+    return make_notes(
+        roots[bar_index] + intervals[keep],
+        velocities[keep],
+        bar_index * beats + offsets[keep],
+        np.minimum(durations[keep], beats - offsets[keep]),
+    )
+
+
+def render_walk(rng, root: int, target: int, beats: float = 4) -> np.ndarray:
+    """Eighth-note walk from root toward target, staying within 5 semitones of the pair."""
+    steps = int(beats * 2)
+    direction = 1 if target > root else -1
+    moves = np.where(rng.random(steps) < 0.7, direction * rng.choice(np.array([1, 2]), size=steps), 0)
+    # Moves all share one sign, so clipping the running sum equals clipping at each step
+    line = np.clip(root + np.cumsum(moves), min(root, target) - 5, max(root, target) + 5)
+    velocities = 65 + _integers(rng, -10, 10, steps)
+    return make_notes(line, velocities, np.arange(steps) * 0.5, 0.5)
+
+
+# ---------------------------------------------------------------------------
+# Reference loops (the previous per-note implementations) for benchmarking
+# ---------------------------------------------------------------------------
+
+def reference_style(style: BassStyle, rng, chord_roots: Sequence[int], bars: int,
+                    beats_per_bar: int, velocity: Tuple[int, int]) -> list:
+    notes = []
+    onsets = style.onsets_for(beats_per_bar)
+    for bar in range(bars):
+        root = chord_roots[bar % len(chord_roots)]
+        for slot, beat in enumerate(onsets):
+            if style.approach and slot == len(onsets) - 1 and slot > 0:
+                pitch = chord_roots[(bar + 1) % len(chord_roots)] + rng.choice([-1, 1])
+            else:
+                pitch = root + rng.choice(style.intervals[min(slot, len(style.intervals) - 1)])
+            duration = style.duration if style.duration is not None else beats_per_bar
+            notes.append((pitch, rng.integers(velocity[0], velocity[1] + 1), bar * beats_per_bar + beat, duration))
+    return notes
+
+
+def reference_free_rhythm(rng, roots: Sequence[int], beats: float = 4) -> list:
+    events = []
+    for bar, root in enumerate(roots):
+        current_beat = 0.0
+        while current_beat < beats:
+            interval = rng.choice([0, 7, 12, -12]) if rng.random() < 0.3 else 0
+            velocity = rng.integers(60, 85)
+            duration = 1.0 if rng.random() < 0.7 else rng.choice([0.5, 1.5, 2.0])
+            events.append((bar * beats + current_beat, root + interval, velocity, min(duration, beats - current_beat)))
+            current_beat += duration
+    return events
+
+
+def _summary(pitch, velocity, duration, bars) -> Dict[str, float]:
+    return {
+        'notes_per_bar': round(len(pitch) / bars, 3),
+        'mean_pitch': round(float(np.mean(pitch)), 2),
+        'mean_velocity': round(float(np.mean(velocity)), 2),
+        'mean_duration': round(float(np.mean(duration)), 3),
+    }
+
+
+def benchmark(bars: int = 20000, seed: int = 0) -> Dict[str, Dict]:
+    """Time the vectorized engine against the per-note loops and compare output statistics."""
+    results = {}
+    chord_roots = [48, 53, 55, 48]
+
+    for name, style in BASS_STYLES.items():
+        rng = np.random.default_rng(seed)
+        start = time.perf_counter()
+        ref = reference_style(style, rng, chord_roots, bars, 4, (70, 100))
+        ref_time = time.perf_counter() - start
+
+        rng = np.random.default_rng(seed)
+        start = time.perf_counter()
+        vec = render_style(style, rng, root_timeline(chord_roots, 0, bars), 4, (70, 100))
+        vec_time = time.perf_counter() - start
+
+        ref_arr = np.array([(p, v, d) for p, v, _, d in ref], dtype=np.float64)
+        results[name] = {
+            'reference_s': round(ref_time, 4),
+            'vectorized_s': round(vec_time, 4),
+            'speedup': round(ref_time / vec_time, 1) if vec_time > 0 else float('inf'),
+            'reference': _summary(ref_arr[:, 0], ref_arr[:, 1], ref_arr[:, 2], bars),
+            'vectorized': _summary(vec['pitch'], vec['velocity'], vec['duration'], bars),
+        }
+
+    roots = root_timeline(chord_roots, 0, bars)[:-1]
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    ref = reference_free_rhythm(rng, roots)
+    ref_time = time.perf_counter() - start
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    vec = render_free_rhythm(DAWN_STYLE, rng, roots)
+    vec_time = time.perf_counter() - start
+    ref_arr = np.array([(p, v, d) for _, p, v, d in ref], dtype=np.float64)
+    results['dawn_free_rhythm'] = {
+        'reference_s': round(ref_time, 4),
+        'vectorized_s': round(vec_time, 4),
+        'speedup': round(ref_time / vec_time, 1) if vec_time > 0 else float('inf'),
+        'reference': _summary(ref_arr[:, 0], ref_arr[:, 1], ref_arr[:, 2], bars),
+        'vectorized': _summary(vec['pitch'], vec['velocity'], vec['duration'], bars),
+    }
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+    bars = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"Bass engine benchmark ({bars} bars)")
+    for name, result in benchmark(bars).items():
+        print(f"\n{name}: {result['reference_s']:.3f}s -> {result['vectorized_s']:.4f}s ({result['speedup']}x)")
+        print(f"  reference:  {result['reference']}")
+        print(f"  vectorized: {result['vectorized']}")
@@ -3,8 +3,12 @@ Bass Line Generator Module
 Creates warm, fluid bass lines with algorithmic improvisation.
 """
 import numpy as np
+from dataclasses import replace
 from typing import List, Tuple
 
+from bass_engine import DAWN_STYLE, render_free_rhythm, render_walk
+from note_array import to_events
+
 class BassLineGenerator:
     """Generates harmonic bass lines with algorithmic variations."""
     
@@ -20,70 +24,24 @@ class BassLineGenerator:
         if seed:
             np.random.seed(seed)
         self.variation_probability = 0.3
+        
+        # Probability of leaving the root is spread evenly over root/5th/octave up/down
+        p = self.variation_probability / 4
+        self.style = replace(DAWN_STYLE, interval_probs=(1 - self.variation_probability + p, p, p, p))
     
     def generate_bass_pattern(self, root: int, beats: int = 4) -> List[Tuple[float, int, int, float]]:
         """
         Generate bass pattern for one chord.
         Returns: List of (beat_position, note, velocity, duration)
         """
-        events = []
-        current_beat = 0.0
-        
-        while current_beat < beats:
-            # Decide note (root, fifth, or octave)
-            if np.random.random() < self.variation_probability:
-                interval = np.random.choice([0, 7, 12, -12])  # Root, 5th, octave up/down
-            else:
-                interval = 0
-            
-            note = root + interval
-            velocity = np.random.randint(60, 85)
-            
-            # Rhythmic variation
-            if np.random.random() < 0.7:
-                duration = 1.0  # Quarter note
-            else:
-                duration = np.random.choice([0.5, 1.5, 2.0])
-            
-            events.append((current_beat, note, velocity, min(duration, beats - current_beat)))
-            current_beat += duration
-        
-        return events
+        return to_events(render_free_rhythm(self.style, np.random, [root], beats))
     
     def generate_section(self, section: str, bars: int = 4) -> List[Tuple[float, int, int, float]]:
         """Generate bass line for a section."""
         roots = self.CHORD_ROOTS.get(section, self.CHORD_ROOTS['intro'])
-        events = []
-        
-        for bar in range(bars):
-            root = roots[bar % len(roots)]
-            pattern = self.generate_bass_pattern(root, 4)
-            
-            for beat, note, vel, dur in pattern:
-                events.append((bar * 4 + beat, note, vel, dur))
-        
-        return events
+        bar_roots = [roots[bar % len(roots)] for bar in range(bars)]
+        return to_events(render_free_rhythm(self.style, np.random, bar_roots, 4))
     
     def generate_walking_bass(self, root: int, target: int, beats: int = 4) -> List[Tuple[float, int, int, float]]:
         """Generate walking bass line between two chord roots."""
-        events = []
-        steps = int(beats * 2)  # Eighth notes
-        
-        # Calculate chromatic/diatonic walk
-        direction = 1 if target > root else -1
-        current_note = root
-        
-        for i in range(steps):
-            beat = i * 0.5
-            velocity = 65 + np.random.randint(-10, 10)
-            
-            # Walk toward target with some randomness
-            if np.random.random() < 0.7:
-                step = direction * np.random.choice([1, 2])
-            else:
-                step = 0
-            
-            current_note = np.clip(current_note + step, min(root, target) - 5, max(root, target) + 5)
-            events.append((beat, int(current_note), velocity, 0.5))
-        
-        return events
+        return to_events(render_walk(np.random, root, target, beats))
@@ -0,0 +1,253 @@
+"""
+Batch MIDI Generation
+Renders a manifest of jobs (JSONL, one job per line) across a process pool
+and collects the results into a directory or a zip archive.
+
+Manifest line format:
+    {"genre": "trap", "bars": 32, "seed": 7, "name": "trap_7.mid"}
+Only "genre" is required; jobs without a seed get one drawn from an
+independent per-job RNG stream derived from the batch seed. A "name" must
+be a plain file name ending in .mid (no directories), unique in the batch,
+and a "seed" a non-negative integer.
+"""
+import os
+import sys
+import json
+import time
+import zipfile
+from dataclasses import dataclass, asdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterable, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+
+@dataclass
+class BatchJob:
+    """A single render request in a batch manifest."""
+    genre: str
+    bars: int = 32
+    seed: Optional[int] = None
+    name: Optional[str] = None
+
+    def filename(self) -> str:
+        if self.name:
+            return self.name
+        return f"{self.genre}_{self.bars}bars_seed{self.seed}.mid"
+
+
+def check_name(name: str) -> str:
+    """Return name if it is a plain .mid file name; raise ValueError for paths or other files."""
+    if (not isinstance(name, str) or not name.lower().endswith('.mid')
+            or '/' in name or '\\' in name or '\0' in name
+            or name.startswith('.') or os.path.isabs(name)
+            or os.path.basename(name) != name):
+        raise ValueError(f"name must be a plain file name ending in .mid: {name!r}")
+    return name
+
+
+def check_seed(seed) -> Optional[int]:
+    """Return seed if it is None or a non-negative int; raise ValueError otherwise."""
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int) or seed < 0):
+        raise ValueError(f"seed must be a non-negative integer: {seed!r}")
+    return seed
+
+
+def check_filenames(jobs: List[BatchJob]):
+    """Raise ValueError if two jobs would write the same file (call after assign_seeds)."""
+    seen = {}
+    for index, job in enumerate(jobs):
+        name = check_name(job.filename())
+        if name in seen:
+            raise ValueError(f"Jobs {seen[name] + 1} and {index + 1} both write {name}")
+        seen[name] = index
+
+
+def parse_manifest(lines: Iterable[str]) -> List[BatchJob]:
+    """Parse JSONL manifest lines into jobs. Blank lines and '#' comments are skipped."""
+    jobs = []
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            data = json.loads(line)
+            name = data.get('name')
+            jobs.append(BatchJob(
+                genre=str(data['genre']),
+                bars=int(data.get('bars', 32)),
+                seed=check_seed(data.get('seed')),
+                name=check_name(name) if name is not None else None,
+            ))
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"Invalid manifest line {line_no}: {e}")
+    names = [job.name for job in jobs if job.name]
+    if len(set(names)) != len(names):
+        duplicate = next(name for name in names if names.count(name) > 1)
+        raise ValueError(f"Duplicate name in manifest: {duplicate}")
+    return jobs
+
+
+def load_manifest(path: str) -> List[BatchJob]:
+    """Load a JSONL job manifest from disk."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_manifest(f)
+
+
+def assign_seeds(jobs: List[BatchJob], batch_seed: Optional[int] = None) -> List[BatchJob]:
+    """Give unseeded jobs a seed from their own spawned RNG stream (reproducible per batch seed)."""
+    streams = np.random.SeedSequence(batch_seed).spawn(len(jobs))
+    for job, stream in zip(jobs, streams):
+        if job.seed is None:
+            job.seed = int(stream.generate_state(1)[0])
+    return jobs
+
+
+def _render_job(index: int, job: Dict) -> Dict:
+    """Worker entry point: render one job, never raising."""
+    start = time.perf_counter()
+    try:
+        from generate_any_genre import render_midi_bytes
+        data = render_midi_bytes(job['genre'], job['bars'], job['seed'])
+        return {'index': index, 'ok': True, 'data': data,
+                'elapsed': time.perf_counter() - start}
+    except Exception as e:
+        return {'index': index, 'ok': False, 'error': f"{type(e).__name__}: {e}",
+                'elapsed': time.perf_counter() - start}
+
+
+class _ResultSink:
+    """Writes finished renders into a directory or a zip archive."""
+
+    def __init__(self, output: str):
+        self.output = output
+        self.zip = None
+        if output.endswith('.zip'):
+            os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+            self.zip = zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED)
+        else:
+            os.makedirs(output, exist_ok=True)
+
+    def write(self, name: str, data: bytes):
+        check_name(name)
+        if self.zip is not None:
+            self.zip.writestr(name, data)
+        else:
+            with open(os.path.join(self.output, name), 'wb') as f:
+                f.write(data)
+
+    def close(self):
+        if self.zip is not None:
+            self.zip.close()
+
+
+def run_batch(jobs: List[BatchJob], output: str, workers: int = None,
+              batch_seed: int = None,
+              progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Render all jobs across a process pool. If a worker process dies, the pool
+    is broken for every job still pending: those jobs are split in half and
+    each half retried in a fresh pool, until a job that breaks a pool on its
+    own is reported failed. Only the jobs that kill their worker fail.
+
+    Args:
+        jobs: Jobs to render
+        output: Output directory, or a path ending in .zip
+        workers: Number of worker processes (default: CPU count)
+        batch_seed: Seed for the per-job RNG streams of unseeded jobs
+        progress: Called with a status record after each job finishes
+
+    Returns: Summary with counts, failures and throughput (files/sec)
+
+    Raises: ValueError if a job name is not a plain .mid file name or two jobs share one
+    """
+    assign_seeds(jobs, batch_seed)
+    check_filenames(jobs)
+    workers = workers or os.cpu_count() or 1
+
+    sink = _ResultSink(output)
+    failures = []
+    completed = 0
+    restarts = 0
+    groups = [list(range(len(jobs)))]
+    start = time.perf_counter()
+
+    def finish(index: int, result: Dict):
+        nonlocal completed
+        job = jobs[index]
+        completed += 1
+        record = {
+            'index': index,
+            'name': job.filename(),
+            'ok': result['ok'],
+            'elapsed': round(result['elapsed'], 4),
+            'completed': completed,
+            'total': len(jobs),
+        }
+        if result['ok']:
+            sink.write(job.filename(), result['data'])
+        else:
+            record['error'] = result['error']
+            failures.append(record)
+
+        if progress:
+            progress(record)
+
+    try:
+        while groups:
+            group = groups.pop(0)
+            broken = []
+            with ProcessPoolExecutor(max_workers=min(workers, len(group))) as pool:
+                futures = {pool.submit(_render_job, i, asdict(jobs[i])): i for i in group}
+                for future in as_completed(futures):
+                    index = futures[future]
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        # A worker died: this and every other unfinished job lost its pool
+                        broken.append(index)
+                        continue
+                    except Exception as e:
+                        result = {'index': index, 'ok': False, 'error': f"{type(e).__name__}: {e}", 'elapsed': 0.0}
+                    finish(index, result)
+
+            if not broken:
+                continue
+            restarts += 1
+            broken.sort()
+            if len(group) == 1:
+                # It broke a pool it had to itself: this job kills its worker
+                finish(broken[0], {'index': broken[0], 'ok': False, 'elapsed': 0.0,
+                                   'error': "worker process died"})
+            else:
+                # Bisect the lost jobs so the culprit ends up alone in a pool
+                half = (len(broken) + 1) // 2
+                groups.extend(part for part in (broken[:half], broken[half:]) if part)
+    finally:
+        sink.close()
+
+    elapsed = time.perf_counter() - start
+    succeeded = len(jobs) - len(failures)
+    return {
+        'output': output,
+        'jobs': len(jobs),
+        'succeeded': succeeded,
+        'failed': len(failures),
+        'failures': failures,
+        'workers': workers,
+        'pool_restarts': restarts,
+        'elapsed': round(elapsed, 3),
+        'files_per_sec': round(succeeded / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+
+
+def print_progress(record: Dict):
+    """Default CLI progress printer."""
+    status = '✓' if record['ok'] else '✗'
+    line = f"  [{record['completed']}/{record['total']}] {status} {record['name']} ({record['elapsed']:.2f}s)"
+    if not record['ok']:
+        line += f" - {record['error']}"
+    print(line, flush=True)
@@ -0,0 +1,484 @@
+"""
+Performance Benchmarks
+Reproducible timing harness for the generation and training pipeline:
+composition, MIDI writing, corpus ingestion, sequence building, neural
+inference, web endpoint latency, and process startup time and memory. Results are stored as JSON and can be
+compared against a baseline to catch regressions.
+
+Usage:
+    python benchmark.py                         # Run everything, write benchmark_results.json
+    python benchmark.py -k compose --quick      # Subset, fewer repeats
+    python benchmark.py --baseline base.json    # Compare (exit code 1 on regression)
+    python benchmark.py --list
+"""
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import statistics
+import subprocess
+import contextlib
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from instrumentation import profiled
+
+RESULTS_VERSION = 1
+DEFAULT_THRESHOLD = 0.10  # Fractional slowdown of the median that counts as a regression
+
+BENCH_GENRES = ['trap', 'bebop', 'salsa', 'heavy_metal', 'house']
+BENCH_BARS = [16, 256]
+
+
+class SkipBenchmark(Exception):
+    """Raised by a setup function when a case cannot run here (missing dependency)."""
+
+
+@dataclass
+class Case:
+    """One benchmark: setup() returns the zero-argument callable that gets timed."""
+    name: str
+    setup: Callable[[], Callable[[], object]]
+    group: str
+    repeat: int = 7
+    number: int = 1
+    teardown: Optional[Callable[[], None]] = None
+    params: Dict = field(default_factory=dict)
+
+
+CASES: List[Case] = []
+
+
+def register(name: str, group: str, repeat: int = 7, number: int = 1, teardown=None, **params):
+    """Register a setup function as a benchmark case."""
+    def decorator(setup):
+        CASES.append(Case(name, setup, group, repeat, number, teardown, params))
+        return setup
+    return decorator
+
+
+def measure(func: Callable[[], object], repeat: int, number: int) -> Dict[str, float]:
+    """Time func (after one warm-up call) and summarize seconds per call."""
+    func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+
+    samples.sort()
+    q1, q3 = np.percentile(samples, [25, 75])
+    return {
+        'min': samples[0],
+        'median': statistics.median(samples),
+        'mean': statistics.fmean(samples),
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'iqr': float(q3 - q1),
+        'repeat': repeat,
+        'number': number,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Composition
+# ---------------------------------------------------------------------------
+
+def _composer_case(method: str, genre: str, bars: int):
+    def setup():
+        from universal_composer import GenreComposer
+        composer = GenreComposer(genre, seed=0)
+        return lambda: getattr(composer, method)(bars)
+    return setup
+
+
+for _genre in BENCH_GENRES:
+    for _bars in BENCH_BARS:
+        for _method in ('generate_melody', 'generate_chords', 'generate_bass_line', 'generate_drum_pattern'):
+            register(f"compose.{_method}[{_genre}-{_bars}]", 'compose',
+                     genre=_genre, bars=_bars)(_composer_case(_method, _genre, _bars))
+
+
+@register("compose.compose_all[trap-256]", 'compose', genre='trap', bars=256)
+def bench_compose_all():
+    from universal_composer import GenreComposer
+    composer = GenreComposer('trap', seed=0)
+    return lambda: composer.compose_all(256, executor='thread')
+
+
+# ---------------------------------------------------------------------------
+# MIDI writing
+# ---------------------------------------------------------------------------
+
+def _render_case(bars: int):
+    def setup():
+        from generate_any_genre import render_midi_bytes, MIDIUTIL_AVAILABLE
+        if not MIDIUTIL_AVAILABLE:
+            raise SkipBenchmark("midiutil not installed")
+        return lambda: render_midi_bytes('trap', bars, 0)
+    return setup
+
+
+for _bars in (32, 256):
+    register(f"midi.render_midi_bytes[trap-{_bars}]", 'midi', bars=_bars)(_render_case(_bars))
+
+
+@register("midi.stream_composition[trap-1024]", 'midi', repeat=5, bars=1024)
+def bench_stream_composition():
+    from universal_composer import GenreComposer
+    from midi_writer import stream_composition
+
+    def run():
+        stream_composition(GenreComposer('trap', seed=0), 1024, io.BytesIO())
+    return run
+
+
+# ---------------------------------------------------------------------------
+# Training data
+# ---------------------------------------------------------------------------
+
+_CORPUS_DIRS: List[str] = []
+
+
+def synthetic_corpus(files: int = 8, bars: int = 32) -> str:
+    """Write a reproducible corpus of rendered MIDI files into a temporary directory."""
+    from generate_any_genre import render_midi_bytes
+    directory = tempfile.mkdtemp(prefix='bench_corpus_')
+    _CORPUS_DIRS.append(directory)
+    for i in range(files):
+        genre = BENCH_GENRES[i % len(BENCH_GENRES)]
+        with open(os.path.join(directory, f"{genre}_{i}.mid"), 'wb') as f:
+            f.write(render_midi_bytes(genre, bars, i))
+    return directory
+
+
+def remove_corpora():
+    while _CORPUS_DIRS:
+        shutil.rmtree(_CORPUS_DIRS.pop(), ignore_errors=True)
+
+
+def synthetic_notes(count: int, seed: int = 0) -> List[Dict]:
+    rng = np.random.default_rng(seed)
+    return [{'pitch': int(p), 'velocity': int(v), 'time': i * 240, 'duration': float(d)}
+            for i, (p, v, d) in enumerate(zip(rng.integers(36, 96, count), rng.integers(40, 120, count),
+                                              rng.choice([0.25, 0.5, 1.0, 2.0], count)))]
+
+
+def _require_processor():
+    try:
+        from advanced_neural_network import MIDIDataProcessor, MIDO_AVAILABLE
+    except ImportError as e:
+        raise SkipBenchmark(str(e))
+    if not MIDO_AVAILABLE:
+        raise SkipBenchmark("mido not installed")
+    return MIDIDataProcessor
+
+
+@register("data.process_midi_directory[8x32]", 'data', repeat=5, teardown=remove_corpora, files=8, bars=32)
+def bench_process_directory():
+    MIDIDataProcessor = _require_processor()
+    directory = synthetic_corpus(8, 32)
+    processor = MIDIDataProcessor(max_sequence_length=50)
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            processor.process_midi_directory(directory)
+    return run
+
+
+@register("data.extract_notes_from_midi[256]", 'data', teardown=remove_corpora, bars=256)
+def bench_extract_notes():
+    MIDIDataProcessor = _require_processor()
+    directory = synthetic_corpus(1, 256)
+    path = os.path.join(directory, os.listdir(directory)[0])
+    processor = MIDIDataProcessor()
+    return lambda: processor.extract_notes_from_midi(path)
+
+
+@register("data.create_sequences[1000x100]", 'data', repeat=5, notes=1000, seq_length=100)
+def bench_create_sequences():
+    MIDIDataProcessor = _require_processor()
+    processor = MIDIDataProcessor()
+    notes = synthetic_notes(1000)
+    return lambda: processor.create_sequences(notes, 100)
+
+
+@register("data.sharded_random_windows[64x100]", 'data', teardown=remove_corpora,
+          notes=200_000, shard_notes=65_536, batch_size=64, batches=50)
+def bench_sharded_random_windows():
+    from advanced_neural_network import MIDIDataProcessor
+    from sharded_dataset import DatasetWriter, ShardedDataset
+    directory = tempfile.mkdtemp(prefix='bench_dataset_')
+    _CORPUS_DIRS.append(directory)
+    processor = MIDIDataProcessor()
+    writer = DatasetWriter(directory, seq_length=100, shard_notes=65_536)
+    for i in range(20):
+        writer.add(processor.normalize_notes(synthetic_notes(10_000, seed=i)))
+    writer.close()
+    dataset = ShardedDataset(directory)
+    batches = np.random.default_rng(0).integers(0, len(dataset), (50, 64))
+
+    def run():
+        for indices in batches:
+            dataset.gather(indices)
+    return run
+
+
+# ---------------------------------------------------------------------------
+# Neural inference
+# ---------------------------------------------------------------------------
+
+@register("neural.predict_per_note[seq100]", 'neural', repeat=5, number=10, seq_length=100)
+def bench_neural_inference():
+    try:
+        from advanced_neural_network import AdvancedNeuralComposer, TF_AVAILABLE
+    except ImportError as e:
+        raise SkipBenchmark(str(e))
+    if not TF_AVAILABLE:
+        raise SkipBenchmark("TensorFlow not installed")
+
+    # Untrained weights: inference cost does not depend on training
+    composer = AdvancedNeuralComposer(seq_length=100)
+    composer.build_model((100, 3))
+    window = np.random.default_rng(0).random((1, 100, 3)).astype(np.float32)
+    return lambda: composer.model.predict(window, verbose=0)
+
+
+# ---------------------------------------------------------------------------
+# Web endpoints
+# ---------------------------------------------------------------------------
+
+_SERVER = {}
+
+
+def _server_url() -> str:
+    """Start the web server once on an ephemeral port, in a background thread."""
+    if 'url' not in _SERVER:
+        import threading
+        from http.server import ThreadingHTTPServer
+        import web_server
+
+        web_server.get_search_index()
+        web_server.build_catalogue_cache()
+        httpd = ThreadingHTTPServer(('127.0.0.1', 0), web_server.ComposerHandler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        _SERVER['httpd'] = httpd
+        _SERVER['url'] = f"http://127.0.0.1:{httpd.server_address[1]}"
+    return _SERVER['url']
+
+
+def stop_server():
+    httpd = _SERVER.pop('httpd', None)
+    if httpd:
+        httpd.shutdown()
+        httpd.server_close()
+    _SERVER.clear()
+
+
+def _endpoint_case(path: str):
+    def setup():
+        import urllib.request
+        url = _server_url() + path
+
+        def run():
+            with urllib.request.urlopen(url) as response:
+                response.read()
+        return run
+    return setup
+
+
+for _path in ('/api/genres', '/api/search?q=rock', '/api/genre-info?id=trap',
+              '/api/generate?genre=trap&bars=16&stream=true'):
+    register(f"web.GET {_path}", 'web', repeat=15, path=_path)(_endpoint_case(_path))
+
+
+# ---------------------------------------------------------------------------
+# Startup (fresh interpreter per run: import time and peak RSS)
+# ---------------------------------------------------------------------------
+
+def run_child(args: List[str]) -> Optional[int]:
+    """
+    Run a Python child process in the repo directory and return its peak RSS in KB
+    (None where os.wait4 is unavailable, e.g. Windows).
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.Popen([sys.executable, *args], cwd=here,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not hasattr(os, 'wait4'):
+        returncode, max_rss = proc.wait(), None
+    else:
+        _, status, usage = os.wait4(proc.pid, 0)
+        returncode = proc.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss is in KB on Linux, bytes on macOS
+        max_rss = usage.ru_maxrss // 1024 if sys.platform == 'darwin' else usage.ru_maxrss
+    if returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} exited with {returncode}")
+    return max_rss
+
+
+def _startup_case(args: List[str]):
+    def setup():
+        def run():
+            max_rss = run_child(args)
+            if max_rss is not None:
+                run.metrics['max_rss_kb'] = max(run.metrics.get('max_rss_kb', 0), max_rss)
+        run.metrics = {}
+        return run
+    return setup
+
+
+STARTUP_COMMANDS = {
+    'import numpy': ['-c', 'import numpy'],
+    'import universal_composer': ['-c', 'import universal_composer'],
+    'import advanced_neural_network': ['-c', 'import advanced_neural_network'],
+    'import web_server': ['-c', 'import web_server'],
+    'generate_any_genre.py --list': ['generate_any_genre.py', '--list'],
+}
+
+for _label, _args in STARTUP_COMMANDS.items():
+    register(f"startup.{_label}", 'startup', repeat=5)(_startup_case(_args))
+
+
+# ---------------------------------------------------------------------------
+# Running, storing and comparing
+# ---------------------------------------------------------------------------
+
+def environment() -> Dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def select(pattern: Optional[str] = None) -> List[Case]:
+    return [case for case in CASES if not pattern or pattern in case.name]
+
+
+def run_benchmarks(cases: List[Case], quick: bool = False, progress: bool = True) -> Dict:
+    """Run cases and return the results document."""
+    results = {}
+    for case in cases:
+        repeat = max(3, case.repeat // 2) if quick else case.repeat
+        try:
+            func = case.setup()
+            stats = measure(func, repeat, case.number)
+            # Cases may report extra measurements (e.g. peak memory) alongside the timings
+            metrics = getattr(func, 'metrics', {})
+            results[case.name] = {'group': case.group, 'params': case.params, **stats, **metrics}
+            if progress:
+                extra = f"  {metrics['max_rss_kb'] / 1024:8.1f} MB" if 'max_rss_kb' in metrics else ''
+                print(f"  {case.name:<58} {stats['median'] * 1000:10.3f} ms{extra}")
+        except SkipBenchmark as e:
+            results[case.name] = {'group': case.group, 'params': case.params, 'skipped': str(e)}
+            if progress:
+                print(f"  {case.name:<58} {'skipped':>10}  ({e})")
+        finally:
+            if case.teardown:
+                case.teardown()
+    stop_server()
+    return {'version': RESULTS_VERSION, 'environment': environment(), 'results': results}
+
+
+def save_results(document: Dict, path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+
+
+def load_results(path: str) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(current: Dict, baseline: Dict, threshold: float = DEFAULT_THRESHOLD) -> Dict[str, List]:
+    """
+    Compare medians case by case.
+    Returns {'regressions': [...], 'improvements': [...], 'unchanged': [...]} with
+    (name, baseline_seconds, current_seconds, ratio) tuples.
+    """
+    report = {'regressions': [], 'improvements': [], 'unchanged': []}
+    for name, result in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if not base or 'median' not in base or 'median' not in result:
+            continue
+        ratio = result['median'] / base['median'] if base['median'] > 0 else float('inf')
+        entry = (name, base['median'], result['median'], ratio)
+        if ratio > 1 + threshold:
+            report['regressions'].append(entry)
+        elif ratio < 1 - threshold:
+            report['improvements'].append(entry)
+        else:
+            report['unchanged'].append(entry)
+    return report
+
+
+def print_comparison(report: Dict[str, List], threshold: float):
+    print(f"\nComparison against baseline (threshold {threshold:.0%}):")
+    for label in ('regressions', 'improvements'):
+        entries = report[label]
+        print(f"  {label.capitalize()}: {len(entries)}")
+        for name, base, current, ratio in sorted(entries, key=lambda e: -abs(np.log(e[3]))):
+            print(f"    {name:<56} {base * 1000:9.3f} -> {current * 1000:9.3f} ms ({ratio:.2f}x)")
+    print(f"  Unchanged: {len(report['unchanged'])}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the performance benchmarks")
+    parser.add_argument("-k", "--filter", help="Only run cases whose name contains this text")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="Results file (JSON)")
+    parser.add_argument("--baseline", help="Baseline results to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Slowdown ratio counted as a regression (default: 0.10)")
+    parser.add_argument("--quick", action="store_true", help="Fewer repeats")
+    parser.add_argument("--list", action="store_true", help="List cases and exit")
+    parser.add_argument("--profile", nargs="?", const="benchmark.prof", metavar="FILE",
+                        help="Profile the run with cProfile and write pstats output (default: benchmark.prof); "
+                             "timings then include the profiler's overhead")
+    args = parser.parse_args()
+
+    with profiled(args.profile):
+        return run_cli(args)
+
+
+def run_cli(args) -> int:
+    """Run the parsed command line; returns the exit code."""
+    cases = select(args.filter)
+    if args.list:
+        for case in cases:
+            print(f"{case.group:<8} {case.name}")
+        return 0
+
+    print(f"Running {len(cases)} benchmarks...")
+    document = run_benchmarks(cases, quick=args.quick)
+    save_results(document, args.output)
+    print(f"\n✓ Results written to {args.output}")
+
+    if args.baseline:
+        report = compare(document, load_results(args.baseline), args.threshold)
+        print_comparison(report, args.threshold)
+        if report['regressions']:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
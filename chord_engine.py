@@ -0,0 +1,113 @@
+"""
+Chord Engine
+Voicing tables per (root, scale, complexity), derived once and cached:
+diatonic progressions built by stacking thirds on the scale, voiced with
+inversions chosen for smooth voice leading. A vectorized renderer tiles a
+table over any number of bars into a note array.
+"""
+import numpy as np
+from functools import lru_cache
+from itertools import permutations
+from typing import Tuple
+
+from note_array import NOTE_DTYPE, make_notes
+
+# Progressions as (scale degree, chord tones), one chord per bar
+PROGRESSION_DEGREES = {
+    'simple': ((0, 3), (3, 3), (4, 3), (0, 3)),    # I-IV-V-I
+    'medium': ((0, 3), (5, 3), (3, 3), (4, 3)),    # I-vi-IV-V
+    'complex': ((0, 4), (3, 4), (4, 4), (0, 4)),   # Seventh chords
+}
+
+# Major-key voicings used when a scale has no seven-note third stacking
+# (pentatonic, blues, whole tone, chromatic, ...)
+CHROMATIC_PROGRESSIONS = {
+    'simple': ((0, 4, 7), (5, 9, 12), (7, 11, 14), (0, 4, 7)),
+    'medium': ((0, 4, 7), (9, 12, 16), (5, 9, 12), (7, 11, 14)),
+    'complex': ((0, 4, 7, 11), (5, 9, 12, 16), (7, 11, 14, 17), (0, 4, 7, 10)),
+}
+
+VOICING_RANGE = 7  # Lowest voice stays within this many semitones of the root
+
+
+def complexity_tier(chord_complexity: float) -> str:
+    if chord_complexity < 0.3:
+        return 'simple'
+    elif chord_complexity < 0.6:
+        return 'medium'
+    return 'complex'
+
+
+@lru_cache(maxsize=None)
+def progression_for(scale_intervals: Tuple[int, ...], tier: str) -> Tuple[Tuple[int, ...], ...]:
+    """Root-position chords (intervals above the key root) for a scale and complexity tier."""
+    if len(scale_intervals) != 7:
+        return CHROMATIC_PROGRESSIONS[tier]
+
+    chords = []
+    for degree, tones in PROGRESSION_DEGREES[tier]:
+        chord = []
+        for i in range(tones):
+            step = degree + 2 * i
+            chord.append(scale_intervals[step % 7] + 12 * (step // 7))
+        chords.append(tuple(chord))
+    return tuple(chords)
+
+
+def _inversions(chord: Tuple[int, ...], root: int):
+    """All inversions of an absolute chord, in octaves that keep the bass near the root."""
+    notes = sorted(chord)
+    for k in range(len(notes)):
+        inverted = notes[k:] + [n + 12 for n in notes[:k]]
+        for shift in (-24, -12, 0, 12):
+            voicing = tuple(n + shift for n in inverted)
+            if abs(voicing[0] - root) <= VOICING_RANGE:
+                yield voicing
+
+
+def _movement(a: Tuple[int, ...], b: Tuple[int, ...]) -> int:
+    """Total semitones moved between two voicings, pairing voices as closely as possible."""
+    if len(a) == len(b):
+        return sum(abs(x - y) for x, y in zip(a, b))
+    short, long_ = (a, b) if len(a) < len(b) else (b, a)
+    return min(sum(abs(x - y) for x, y in zip(short, combo)) for combo in permutations(long_, len(short)))
+
+
+@lru_cache(maxsize=None)
+def voicings_for(root: int, scale_intervals: Tuple[int, ...], tier: str) -> Tuple[Tuple[int, ...], ...]:
+    """
+    Voice-led absolute voicings for the progression: the first chord in root
+    position, each following chord in the inversion that moves the voices least.
+    """
+    progression = progression_for(scale_intervals, tier)
+    voicings = [tuple(root + i for i in progression[0])]
+    for chord in progression[1:]:
+        absolute = tuple(root + i for i in chord)
+        voicings.append(min(_inversions(absolute, root), key=lambda v: (_movement(voicings[-1], v), v)))
+    return tuple(voicings)
+
+
+def render_chords(voicings: Tuple[Tuple[int, ...], ...], rng, first_bar: int, bars: int,
+                  beats_per_bar: int, velocity: Tuple[int, int], softer: int = 10) -> np.ndarray:
+    """
+    Tile a voicing table over bars [first_bar, first_bar + bars), one chord per bar,
+    as a note array in bar order. Velocities are drawn from [low, high] minus `softer`.
+    """
+    if bars <= 0:
+        return np.empty(0, dtype=NOTE_DTYPE)
+
+    # Pad the table to a rectangle so bars can be gathered with one fancy index
+    width = max(len(v) for v in voicings)
+    table = np.full((len(voicings), width), -1, dtype=np.int64)
+    for i, voicing in enumerate(voicings):
+        table[i, :len(voicing)] = voicing
+
+    bar_numbers = np.arange(first_bar, first_bar + bars)
+    grid = table[bar_numbers % len(voicings)]
+    mask = grid >= 0
+    pitch = grid[mask]
+    start = np.broadcast_to((bar_numbers * beats_per_bar)[:, None], grid.shape)[mask]
+
+    low, high = velocity
+    velocities = rng.integers(low, high + 1, size=len(pitch)) - softer
+    return make_notes(pitch, velocities, start.astype(np.float64), float(beats_per_bar))
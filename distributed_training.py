@@ -0,0 +1,375 @@
+"""
+Distributed Training
+Data-parallel training of AdvancedNeuralComposer across worker processes
+with tf.distribute.MultiWorkerMirroredStrategy. Each worker parses only its
+shard of the corpus (every N-th MIDI file) and gradients are all-reduced
+every step, so the workers train one shared model.
+
+Usage:
+    python train_neural.py --workers 4                       # 4 local workers
+    python train_neural.py --cluster h1:23456,h1:23457,h2:23456,h2:23457 --worker-index 0,1
+                                                             # On h1 (run the same with 2,3 on h2)
+    python distributed_training.py scaling --workers 1,2,4 -e 3   # Scaling efficiency report
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import shutil
+import tempfile
+import subprocess
+from dataclasses import asdict, replace
+from typing import Dict, List, Optional, Sequence
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from augmentation import AugmentConfig, augment_dataset
+from training_perf import PerfProfile, available_cpus, cpu_profile
+
+SCRIPT = os.path.abspath(__file__)
+POLL_SECONDS = 0.5
+STOP_TIMEOUT_SECONDS = 10.0
+
+
+def free_ports(count: int) -> List[int]:
+    """Ports the OS reports as free right now (bound and released together so they differ)."""
+    sockets = []
+    try:
+        for _ in range(count):
+            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            s.bind(('localhost', 0))
+            sockets.append(s)
+        return [s.getsockname()[1] for s in sockets]
+    finally:
+        for s in sockets:
+            s.close()
+
+
+def local_cluster(workers: int) -> List[str]:
+    return [f"localhost:{port}" for port in free_ports(workers)]
+
+
+def tf_config(cluster: Sequence[str], index: int) -> str:
+    """TF_CONFIG for worker `index` of the cluster (worker 0 is the chief)."""
+    return json.dumps({'cluster': {'worker': list(cluster)}, 'task': {'type': 'worker', 'index': index}})
+
+
+def shard(items: Sequence, index: int, count: int) -> list:
+    """Every count-th item starting at index."""
+    return list(items[index::count])
+
+
+def global_sum(strategy, value: float) -> float:
+    """Sum of value across every worker of the strategy's cluster."""
+    from advanced_neural_network import tf
+    total = strategy.reduce(
+        tf.distribute.ReduceOp.SUM,
+        strategy.experimental_distribute_values_from_function(lambda ctx: tf.constant(float(value))),
+        axis=None,
+    )
+    return float(total.numpy())
+
+
+# ---------------------------------------------------------------------------
+# Worker
+# ---------------------------------------------------------------------------
+
+def run_worker(args) -> Dict:
+    """Train as one worker of the cluster in TF_CONFIG; returns this worker's throughput."""
+    from advanced_neural_network import AdvancedNeuralComposer, MIDIDataProcessor, tf
+    from training_perf import apply_profile, throughput_callback
+
+    config = json.loads(os.environ['TF_CONFIG'])
+    index = config['task']['index']
+    num_workers = len(config['cluster']['worker'])
+    is_chief = index == 0
+
+    # Thread pools must be configured before the strategy initializes the runtime. Without
+    # --perf, workers keep single-process numerics (float32, no XLA) and only size their
+    # thread pools so workers sharing a host do not oversubscribe its CPUs
+    if args.perf:
+        perf = cpu_profile(args.threads, jit_compile=not args.no_jit, mixed_precision=args.mixed_precision)
+    else:
+        perf = PerfProfile(intra_op_threads=args.threads or 0, inter_op_threads=min(2, args.threads or 2))
+    apply_profile(perf)
+    strategy = tf.distribute.MultiWorkerMirroredStrategy()
+    tf.keras.utils.set_random_seed(args.seed)
+
+    processor = MIDIDataProcessor(max_sequence_length=args.seq_length)
+    files = processor.list_midi_files(args.directory)
+    X, y = processor.process_midi_files(shard(files, index, num_workers))
+    if len(X) == 0:
+        # A shard of only very short files yields no sequences; every worker must still step
+        print(f"Worker {index}: shard has no sequences, using the full corpus")
+        X, y = processor.process_midi_files(files)
+
+    # Same split as single-process training: the last fraction of each shard validates.
+    # Validation runs only if every worker has some, or the others would wait for it
+    train_count = len(X) - int(len(X) * args.validation_split)
+    validate = global_sum(strategy, 1 if train_count < len(X) else 0) == num_workers
+    if args.validation_split > 0 and not validate:
+        print(f"Worker {index}: a shard is too small to hold out validation data, training without it")
+        train_count = len(X)
+
+    # Workers' shards differ in size: agree on steps per epoch from the global sample
+    # count, and repeat each shard so no worker runs out mid-epoch
+    global_batch = args.batch_size * strategy.num_replicas_in_sync
+    steps_per_epoch = max(1, int(global_sum(strategy, train_count)) // global_batch)
+
+    options = tf.data.Options()
+    options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.OFF
+    dataset = (tf.data.Dataset.from_tensor_slices((X[:train_count], y[:train_count]))
+               .shuffle(train_count, seed=args.seed + index)
+               .repeat()
+               .batch(global_batch))
+    if args.augment:
+        # Offset the seed per worker so shards don't share augmentation draws
+        config = AugmentConfig(**json.loads(args.augment))
+        dataset = augment_dataset(dataset, replace(config, seed=config.seed + index))
+    dataset = dataset.prefetch(tf.data.AUTOTUNE).with_options(options)
+
+    validation = {}
+    if validate:
+        validation_steps = -(-int(global_sum(strategy, len(X) - train_count)) // global_batch)
+        validation = {
+            'validation_data': (tf.data.Dataset.from_tensor_slices((X[train_count:], y[train_count:]))
+                                .repeat()
+                                .batch(global_batch)
+                                .with_options(options)),
+            'validation_steps': validation_steps,
+        }
+
+    composer = AdvancedNeuralComposer(seq_length=args.seq_length, model_name=args.model,
+                                      units=args.units)
+    with strategy.scope():
+        composer.build_model(X.shape[1:], jit_compile=perf.jit_compile)
+
+    # Each worker consumes global_batch / num_workers samples per step
+    throughput = throughput_callback(steps_per_epoch * global_batch // num_workers)
+    reduce_lr = tf.keras.callbacks.ReduceLROnPlateau(monitor='val_loss' if validate else 'loss',
+                                                     factor=0.5, patience=5, min_lr=0.00001)
+    composer.model.fit(dataset, epochs=args.epochs, steps_per_epoch=steps_per_epoch,
+                       callbacks=[reduce_lr, throughput], verbose=1 if is_chief else 0, **validation)
+    composer.is_trained = True
+
+    # Saving can run collective ops, so every worker must save; variables are mirrored and
+    # only the chief's file is kept, the others write to a temporary directory
+    if args.output:
+        if is_chief:
+            os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+            composer.save_model(args.output)
+        else:
+            scratch = tempfile.mkdtemp(prefix=f'composer_worker{index}_')
+            try:
+                composer.save_model(os.path.join(scratch, os.path.basename(args.output)))
+            finally:
+                shutil.rmtree(scratch, ignore_errors=True)
+
+    return {
+        'index': index,
+        'workers': num_workers,
+        'local_samples': len(X),
+        'validation_samples': len(X) - train_count,
+        'validated': validate,
+        'steps_per_epoch': steps_per_epoch,
+        'epochs': throughput.epochs,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Launcher
+# ---------------------------------------------------------------------------
+
+def launch(directory: str, epochs: int, batch_size: int = 32, model_name: str = 'composer_model',
+           output: Optional[str] = None, cluster: Optional[List[str]] = None,
+           indices: Optional[List[int]] = None, workers: int = 2, threads: Optional[int] = None,
+           perf: bool = False, no_jit: bool = False, mixed_precision: str = 'auto',
+           augment: Optional[AugmentConfig] = None, seq_length: int = 100, units: int = 256,
+           seed: int = 0, validation_split: float = 0.2) -> Optional[Dict]:
+    """
+    Start worker processes on this host and wait for them. If one fails, the
+    others (which would block in their next collective) are stopped.
+
+    Args:
+        cluster: host:port of every worker in the cluster (default: `workers` local ports)
+        indices: Which workers of the cluster run here (default: all)
+        threads: Intra-op threads per worker (default: this host's CPUs split across its workers)
+        perf: Apply the CPU performance profile (XLA, bf16 per mixed_precision) in every worker;
+              off, workers train with the same numerics as single-process training
+        augment: On-the-fly augmentation of each worker's batches
+        seq_length, units, seed: Window length, model width and seed of every worker
+        validation_split: Fraction of each worker's shard held out for validation
+
+    Returns: Aggregate throughput for the workers run here, or None if any failed
+    """
+    cluster = cluster or local_cluster(workers)
+    indices = indices if indices is not None else list(range(len(cluster)))
+    threads = threads or max(1, available_cpus() // len(indices))
+
+    results_dir = tempfile.mkdtemp(prefix='composer_workers_')
+    processes = []
+    for index in indices:
+        command = [sys.executable, SCRIPT, 'worker',
+                   '-d', directory, '-e', str(epochs), '-b', str(batch_size), '-m', model_name,
+                   '--threads', str(threads), '--mixed-precision', mixed_precision,
+                   '--seq-length', str(seq_length), '--units', str(units), '--seed', str(seed),
+                   '--validation-split', str(validation_split),
+                   '--result', os.path.join(results_dir, f"worker_{index}.json")]
+        if output:
+            command += ['--output', output]
+        if perf:
+            command.append('--perf')
+        if no_jit:
+            command.append('--no-jit')
+        if augment:
+            command += ['--augment', json.dumps(asdict(augment))]
+        env = dict(os.environ, TF_CONFIG=tf_config(cluster, index))
+
+        # The chief's output goes to the console, the others' to log files
+        if index == 0:
+            processes.append((index, subprocess.Popen(command, env=env), None))
+        else:
+            log = open(os.path.join(results_dir, f"worker_{index}.log"), 'w')
+            processes.append((index, subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT), log))
+
+    print(f"Launched {len(processes)} worker(s) of {len(cluster)} ({threads} threads each), logs in {results_dir}")
+
+    failed = wait_all(processes)
+    if failed:
+        print(f"❌ Worker(s) {', '.join(map(str, failed))} failed, stopped the others; see {results_dir}")
+        return None
+
+    results = []
+    for index in indices:
+        with open(os.path.join(results_dir, f"worker_{index}.json"), 'r', encoding='utf-8') as f:
+            results.append(json.load(f))
+    return aggregate(results)
+
+
+def wait_all(processes) -> List[int]:
+    """
+    Wait for every (index, process, log) to exit, polling them together; on the
+    first failure (or Ctrl+C) terminate the rest. Returns the indices that failed.
+    """
+    failed = []
+    try:
+        running = list(processes)
+        while running and not failed:
+            time.sleep(POLL_SECONDS)
+            for entry in list(running):
+                code = entry[1].poll()
+                if code is not None:
+                    running.remove(entry)
+                    if code != 0:
+                        failed.append(entry[0])
+    finally:
+        for _, process, _ in processes:
+            if process.poll() is None:
+                process.terminate()
+        for _, process, log in processes:
+            try:
+                process.wait(timeout=STOP_TIMEOUT_SECONDS)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+            if log:
+                log.close()
+    return failed
+
+
+def aggregate(results: List[Dict]) -> Dict:
+    """Combined samples/sec, skipping the first epoch (graph tracing / XLA compilation) when possible."""
+    def steady(epochs):
+        return epochs[1:] if len(epochs) > 1 else epochs
+
+    rates = [sum(e['samples_per_sec'] for e in steady(r['epochs'])) / len(steady(r['epochs']))
+             for r in results if r['epochs']]
+    epoch_seconds = [e['seconds'] for e in steady(results[0]['epochs'])] if results and results[0]['epochs'] else []
+    return {
+        'workers': len(results),
+        'validated': all(r.get('validated', False) for r in results),
+        'samples_per_sec': sum(rates),
+        'epoch_seconds': sum(epoch_seconds) / len(epoch_seconds) if epoch_seconds else 0.0,
+    }
+
+
+def scaling_report(directory: str, worker_counts: List[int], epochs: int, batch_size: int = 32,
+                   threads: Optional[int] = None, no_jit: bool = False) -> List[Dict]:
+    """
+    Train with each local worker count and report throughput and scaling efficiency
+    (throughput relative to the smallest count times the worker ratio).
+    """
+    rows = []
+    for count in worker_counts:
+        print(f"\n--- {count} worker(s) ---")
+        result = launch(directory, epochs, batch_size, cluster=local_cluster(count), threads=threads,
+                        perf=True, no_jit=no_jit, mixed_precision='off', validation_split=0.0)
+        if result is None:
+            break
+        rows.append(result)
+
+    if rows:
+        base = rows[0]
+        print(f"\n{'Workers':>8} {'Samples/sec':>14} {'Speedup':>9} {'Efficiency':>11}")
+        for row in rows:
+            speedup = row['samples_per_sec'] / base['samples_per_sec'] if base['samples_per_sec'] else 0.0
+            row['speedup'] = speedup
+            row['efficiency'] = speedup / (row['workers'] / base['workers'])
+            print(f"{row['workers']:>8} {row['samples_per_sec']:>14,.0f} {speedup:>8.2f}x {row['efficiency']:>10.0%}")
+    return rows
+
+
+def parse_indices(value: str) -> List[int]:
+    return [int(i) for i in value.split(',') if i.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Data-parallel neural composer training")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    worker = sub.add_parser('worker', help='Run one worker (TF_CONFIG must be set; started by the launcher)')
+    worker.add_argument('-d', '--directory', default='training_data')
+    worker.add_argument('-e', '--epochs', type=int, default=50)
+    worker.add_argument('-b', '--batch-size', type=int, default=32, help='Batch size per worker')
+    worker.add_argument('-m', '--model', default='composer_model')
+    worker.add_argument('--output', help='Where the chief saves the trained model')
+    worker.add_argument('--threads', type=int)
+    worker.add_argument('--perf', action='store_true', help='Apply the CPU performance profile')
+    worker.add_argument('--no-jit', action='store_true')
+    worker.add_argument('--mixed-precision', choices=['auto', 'on', 'off'], default='auto')
+    worker.add_argument('--augment', help='AugmentConfig as JSON')
+    worker.add_argument('--seq-length', type=int, default=100)
+    worker.add_argument('--units', type=int, default=256)
+    worker.add_argument('--seed', type=int, default=0)
+    worker.add_argument('-v', '--validation-split', type=float, default=0.2)
+    worker.add_argument('--result', help='Write this worker\'s throughput (JSON) here')
+
+    scaling = sub.add_parser('scaling', help='Measure scaling efficiency across local worker counts')
+    scaling.add_argument('-d', '--directory', default='training_data')
+    scaling.add_argument('-e', '--epochs', type=int, default=3)
+    scaling.add_argument('-b', '--batch-size', type=int, default=32, help='Batch size per worker')
+    scaling.add_argument('--workers', type=parse_indices, default=[1, 2, 4], help='Comma-separated counts (default: 1,2,4)')
+    scaling.add_argument('--threads', type=int, help='Intra-op threads per worker')
+    scaling.add_argument('--no-jit', action='store_true')
+    scaling.add_argument('-o', '--output', help='Write the report (JSON) here')
+
+    args = parser.parse_args()
+
+    if args.command == 'worker':
+        result = run_worker(args)
+        if args.result:
+            with open(args.result, 'w', encoding='utf-8') as f:
+                json.dump(result, f)
+        return 0
+
+    rows = scaling_report(args.directory, args.workers, args.epochs, args.batch_size, args.threads, args.no_jit)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+    return 0 if len(rows) == len(args.workers) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
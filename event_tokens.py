@@ -0,0 +1,259 @@
+"""
+Event Tokens
+Compact integer encoding of notes for corpora and models: pitch, velocity and
+duration are quantized into bins and packed into one uint16 token per note,
+described by a vocabulary file. A corpus is the concatenated token stream of
+its files plus file offsets; training windows are gathered per batch instead
+of being materialized, so a 100-note window costs nothing until it is used.
+
+Usage:
+    python event_tokens.py build -d training_data -o corpus.npz   # Writes corpus.npz + corpus.vocab.json
+    python event_tokens.py info corpus.npz
+"""
+import os
+import sys
+import json
+import argparse
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from lazy_imports import LazyModule
+
+tf = LazyModule('tensorflow')
+
+TOKEN_DTYPE = np.uint16
+
+
+@dataclass(frozen=True)
+class Vocabulary:
+    """Quantization bins; token = (pitch_bin * velocity_bins + velocity_bin) * duration_bins + duration_bin."""
+    pitch_range: Tuple[int, int] = (21, 108)   # Inclusive, piano range
+    velocity_bins: int = 8                     # Equal-width bins over 0-127
+    durations: Tuple[float, ...] = (0.125, 0.25, 0.375, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 4.0, 6.0, 8.0)  # Beats
+
+    def __post_init__(self):
+        if self.size > np.iinfo(TOKEN_DTYPE).max + 1:
+            raise ValueError(f"Vocabulary of {self.size} tokens does not fit in {np.dtype(TOKEN_DTYPE).name}")
+
+    @property
+    def pitch_bins(self) -> int:
+        return self.pitch_range[1] - self.pitch_range[0] + 1
+
+    @property
+    def duration_bins(self) -> int:
+        return len(self.durations)
+
+    @property
+    def size(self) -> int:
+        return self.pitch_bins * self.velocity_bins * self.duration_bins
+
+    def quantize(self, pitch, velocity, duration) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Bin indices for pitch (clipped to range), velocity and duration (nearest bin in log scale)."""
+        pitch_bin = np.clip(np.asarray(pitch) - self.pitch_range[0], 0, self.pitch_bins - 1)
+        velocity_bin = np.clip(np.asarray(velocity) * self.velocity_bins // 128, 0, self.velocity_bins - 1)
+        log_durations = np.log(self.durations)
+        edges = (log_durations[1:] + log_durations[:-1]) / 2
+        duration_bin = np.searchsorted(edges, np.log(np.maximum(np.asarray(duration, dtype=np.float64), 1e-6)))
+        return pitch_bin.astype(np.int64), velocity_bin.astype(np.int64), duration_bin.astype(np.int64)
+
+    def encode(self, pitch, velocity, duration) -> np.ndarray:
+        pitch_bin, velocity_bin, duration_bin = self.quantize(pitch, velocity, duration)
+        return self.pack(pitch_bin, velocity_bin, duration_bin)
+
+    def pack(self, pitch_bin, velocity_bin, duration_bin) -> np.ndarray:
+        tokens = (np.asarray(pitch_bin) * self.velocity_bins + velocity_bin) * self.duration_bins + duration_bin
+        return tokens.astype(TOKEN_DTYPE)
+
+    def unpack(self, tokens) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Bin indices (pitch, velocity, duration) of tokens."""
+        tokens = np.asarray(tokens, dtype=np.int64)
+        rest, duration_bin = np.divmod(tokens, self.duration_bins)
+        pitch_bin, velocity_bin = np.divmod(rest, self.velocity_bins)
+        return pitch_bin, velocity_bin, duration_bin
+
+    def decode(self, tokens) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """MIDI pitch, velocity (bin center) and duration in beats."""
+        return self.bins_to_values(*self.unpack(tokens))
+
+    def bins_to_values(self, pitch_bin, velocity_bin, duration_bin) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        width = 128 / self.velocity_bins
+        pitch = np.asarray(pitch_bin) + self.pitch_range[0]
+        velocity = (np.asarray(velocity_bin) * width + width / 2).astype(np.int64)
+        duration = np.asarray(self.durations)[np.asarray(duration_bin)]
+        return pitch, velocity, duration
+
+    def to_dict(self) -> Dict:
+        return {'pitch_range': list(self.pitch_range), 'velocity_bins': self.velocity_bins,
+                'durations': list(self.durations), 'size': self.size}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Vocabulary':
+        return cls(tuple(data['pitch_range']), data['velocity_bins'], tuple(data['durations']))
+
+    def save(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> 'Vocabulary':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def vocabulary_path(path: str) -> str:
+    """Vocabulary file stored next to a corpus or model: corpus.npz -> corpus.vocab.json"""
+    return os.path.splitext(path)[0] + '.vocab.json'
+
+
+@dataclass
+class TokenCorpus:
+    """Token stream of several files; file i spans tokens[offsets[i]:offsets[i + 1]]."""
+    tokens: np.ndarray
+    offsets: np.ndarray
+    vocabulary: Vocabulary = field(default_factory=Vocabulary)
+
+    @property
+    def files(self) -> int:
+        return len(self.offsets) - 1
+
+    def window_starts(self, seq_length: int) -> np.ndarray:
+        """Start of every window of seq_length tokens followed by a target, never crossing files."""
+        starts = [np.arange(begin, end - seq_length, dtype=np.int64)
+                  for begin, end in zip(self.offsets[:-1], self.offsets[1:]) if end - begin > seq_length]
+        return np.concatenate(starts) if starts else np.empty(0, dtype=np.int64)
+
+    def windows(self, starts: np.ndarray, seq_length: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Gather input windows (len(starts), seq_length) and target tokens for some window starts."""
+        index = starts[:, None] + np.arange(seq_length)
+        return self.tokens[index], self.tokens[starts + seq_length]
+
+    def save(self, path: str):
+        """Compressed .npz plus <name>.vocab.json"""
+        np.savez_compressed(path, tokens=self.tokens, offsets=self.offsets)
+        self.vocabulary.save(vocabulary_path(path))
+
+    @classmethod
+    def load(cls, path: str) -> 'TokenCorpus':
+        with np.load(path) as data:
+            tokens, offsets = data['tokens'], data['offsets']
+        vocab_file = vocabulary_path(path)
+        vocabulary = Vocabulary.load(vocab_file) if os.path.exists(vocab_file) else Vocabulary()
+        return cls(tokens, offsets, vocabulary)
+
+
+def encode_notes(notes: List[Dict], vocabulary: Vocabulary) -> np.ndarray:
+    """Tokens for note dicts with durations in beats, in the given order."""
+    if not notes:
+        return np.empty(0, dtype=TOKEN_DTYPE)
+    pitch = np.fromiter((n['pitch'] for n in notes), dtype=np.int64, count=len(notes))
+    velocity = np.fromiter((n['velocity'] for n in notes), dtype=np.int64, count=len(notes))
+    duration = np.fromiter((n['duration'] for n in notes), dtype=np.float64, count=len(notes))
+    return vocabulary.encode(pitch, velocity, duration)
+
+
+def decode_tokens(tokens: Sequence[int], vocabulary: Vocabulary) -> List[Dict]:
+    pitch, velocity, duration = vocabulary.decode(tokens)
+    return [{'pitch': int(p), 'velocity': int(v), 'duration': float(d)}
+            for p, v, d in zip(pitch, velocity, duration)]
+
+
+def build_corpus(midi_files: Sequence, vocabulary: Optional[Vocabulary] = None, processor=None) -> TokenCorpus:
+    """Tokenize MIDI files into one corpus."""
+    if processor is None:
+        from advanced_neural_network import MIDIDataProcessor
+        processor = MIDIDataProcessor()
+    vocabulary = vocabulary or Vocabulary()
+
+    streams = []
+    for midi_file in midi_files:
+        notes = processor.extract_notes_from_midi(str(midi_file), in_beats=True)
+        if notes:
+            streams.append(encode_notes(notes, vocabulary))
+
+    offsets = np.zeros(len(streams) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(s) for s in streams])
+    tokens = np.concatenate(streams) if streams else np.empty(0, dtype=TOKEN_DTYPE)
+    return TokenCorpus(tokens, offsets, vocabulary)
+
+
+def window_dataset(corpus: TokenCorpus, starts: np.ndarray, seq_length: int, batch_size: int,
+                   shuffle: bool = True, seed: int = 0, repeat: bool = True):
+    """
+    tf.data pipeline of (tokens[batch, seq_length], {'pitch', 'velocity', 'duration'} targets),
+    gathering each batch's windows from the token stream.
+    """
+    vocabulary = corpus.vocabulary
+    tokens = tf.constant(corpus.tokens.astype(np.int32))
+    offsets = tf.range(seq_length, dtype=tf.int64)
+
+    def gather(batch_starts):
+        windows = tf.gather(tokens, batch_starts[:, None] + offsets)
+        target = tf.gather(tokens, batch_starts + seq_length)
+        rest, duration = target // vocabulary.duration_bins, target % vocabulary.duration_bins
+        pitch, velocity = rest // vocabulary.velocity_bins, rest % vocabulary.velocity_bins
+        return windows, {'pitch': pitch, 'velocity': velocity, 'duration': duration}
+
+    dataset = tf.data.Dataset.from_tensor_slices(starts)
+    if shuffle:
+        dataset = dataset.shuffle(len(starts), seed=seed)
+    if repeat:
+        dataset = dataset.repeat()
+    return dataset.batch(batch_size).map(gather, num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
+
+
+def footprint(corpus: TokenCorpus, seq_length: int = 100) -> Dict[str, int]:
+    """Bytes held by the token corpus vs. the float32 windows of the float encoding."""
+    starts = corpus.window_starts(seq_length)
+    windows = len(starts)
+    return {
+        'notes': len(corpus.tokens),
+        'windows': windows,
+        'token_bytes': corpus.tokens.nbytes + corpus.offsets.nbytes + starts.nbytes,  # Stream, offsets, window starts
+        # seq_length input notes plus the target, 3 float32 features each, as create_sequences() builds them
+        'float_window_bytes': windows * (seq_length + 1) * 3 * np.dtype(np.float32).itemsize,
+    }
+
+
+def print_footprint(stats: Dict[str, int]):
+    ratio = stats['float_window_bytes'] / stats['token_bytes'] if stats['token_bytes'] else 0.0
+    print(f"Notes: {stats['notes']:,}  Windows: {stats['windows']:,}")
+    print(f"Token corpus: {stats['token_bytes'] / 1e6:.2f} MB  "
+          f"Float windows: {stats['float_window_bytes'] / 1e6:.2f} MB  ({ratio:.0f}x smaller)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and inspect token corpora")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help='Tokenize a directory of MIDI files')
+    build.add_argument('-d', '--directory', default='training_data')
+    build.add_argument('-o', '--output', default='corpus.npz')
+    build.add_argument('--seq-length', type=int, default=100)
+
+    info = sub.add_parser('info', help='Show corpus size and vocabulary')
+    info.add_argument('corpus')
+    info.add_argument('--seq-length', type=int, default=100)
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        from advanced_neural_network import MIDIDataProcessor
+        files = MIDIDataProcessor.list_midi_files(args.directory)
+        print(f"Tokenizing {len(files)} MIDI files...")
+        corpus = build_corpus(files)
+        corpus.save(args.output)
+        print(f"✓ Corpus written to {args.output} ({os.path.getsize(args.output) / 1e6:.2f} MB on disk), "
+              f"vocabulary to {vocabulary_path(args.output)}")
+    else:
+        corpus = TokenCorpus.load(args.corpus)
+        print(f"Files: {corpus.files}  Vocabulary: {corpus.vocabulary.size} tokens")
+    print_footprint(footprint(corpus, args.seq_length))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
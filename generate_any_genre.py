@@ -4,6 +4,7 @@ Main script to create multitrack MIDI files in any musical genre.
 """
 import sys
 import os
+import io
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 try:
@@ -15,48 +16,72 @@ except ImportError:
 
 import numpy as np
 from universal_composer import GenreComposer, Note, print_genre_info
+from genre_search import search_genres_ranked
+from instrumentation import profiled, span
 from genres.all_genres import (
     get_genre, list_genres, list_genres_by_category,
-    search_genres, get_genre_count, get_categories
+    get_genre_count, get_categories
 )
 
-def generate_midi(genre_id: str, output_file: str = None, bars: int = 32, seed: int = None):
+def choose_programs(genre) -> dict:
+    """Pick General MIDI programs for the melody, chords and bass tracks."""
+    programs = {}
+    
+    # Track 0: Melody
+    if "guitar" in genre.instruments[0] if genre.instruments else False:
+        programs['melody'] = 25  # Acoustic Guitar
+    elif "synth" in str(genre.instruments):
+        programs['melody'] = 81  # Lead Synth
+    elif "saxophone" in str(genre.instruments):
+        programs['melody'] = 66  # Tenor Sax
+    elif "violin" in str(genre.instruments):
+        programs['melody'] = 40  # Violin
+    else:
+        programs['melody'] = 0   # Piano
+    
+    # Track 1: Chords
+    if "organ" in str(genre.instruments):
+        programs['chords'] = 16  # Organ
+    elif "synth" in str(genre.instruments):
+        programs['chords'] = 89  # Pad
+    else:
+        programs['chords'] = 0   # Piano
+    
+    # Track 2: Bass
+    if "808" in genre.bass_style or "trap" in genre.bass_style:
+        programs['bass'] = 38  # Synth Bass
+    elif "synth" in genre.bass_style:
+        programs['bass'] = 38  # Synth Bass
+    else:
+        programs['bass'] = 33  # Electric Bass
+    
+    return programs
+
+def compose_midi(genre_id: str, bars: int = 32, seed: int = None, verbose: bool = False,
+                 neural_model=None, executor='auto', timings: dict = None):
     """
-    Generate a multitrack MIDI file in the specified genre.
+    Compose a multitrack MIDIFile in the specified genre without writing it.
     
     Args:
-        genre_id: Genre identifier (use list_genres() to see options)
-        output_file: Output filename (default: {genre_id}.mid)
-        bars: Number of bars to generate
-        seed: Random seed for reproducibility
-    """
-    if not MIDIUTIL_AVAILABLE:
-        print("Error: midiutil is required. Install with: pip install midiutil")
-        return None
+        neural_model: Loaded AdvancedNeuralComposer for melody enhancement (optional)
+        executor: How compose_all runs the four tracks ('auto', 'thread', 'process' or an Executor)
+        timings: If given, filled with the seconds each track took
     
+    Returns: (midi, tempo, time_sig)
+    """
     genre = get_genre(genre_id)
     if not genre:
-        print(f"Error: Unknown genre '{genre_id}'")
-        print(f"Available genres: {', '.join(list_genres()[:20])}...")
-        return None
-    
-    if output_file is None:
-        output_file = f"{genre_id}.mid"
-    
-    print(f"\n{'='*60}")
-    print(f"Generating: {genre.name}")
-    print(f"Category: {genre.category}")
-    print(f"Description: {genre.description}")
-    print(f"{'='*60}")
+        raise ValueError(f"Unknown genre: {genre_id}")
     
     # Initialize composer
-    composer = GenreComposer(genre_id, seed)
-    tempo = composer._get_tempo()
-    time_sig = composer._get_time_signature()
+    composer = GenreComposer(genre_id, seed, neural_model)
+    tempo = composer.plan.tempo
+    time_sig = composer.plan.time_signature
     
-    print(f"Tempo: {tempo} BPM")
-    print(f"Time Signature: {time_sig[0]}/{time_sig[1]}")
-    print(f"Bars: {bars}")
+    if verbose:
+        print(f"Tempo: {tempo} BPM")
+        print(f"Time Signature: {time_sig[0]}/{time_sig[1]}")
+        print(f"Bars: {bars}")
     
     # Create MIDI file with 4 tracks
     midi = MIDIFile(4, deinterleave=False)
@@ -72,66 +97,108 @@ def generate_midi(genre_id: str, output_file: str = None, bars: int = 32, seed:
     midi.addTrackName(3, 0, "Drums")
     
     # Set instruments based on genre
-    # Track 0: Melody
-    if "guitar" in genre.instruments[0] if genre.instruments else False:
-        midi.addProgramChange(0, 0, 0, 25)  # Acoustic Guitar
-    elif "synth" in str(genre.instruments):
-        midi.addProgramChange(0, 0, 0, 81)  # Lead Synth
-    elif "saxophone" in str(genre.instruments):
-        midi.addProgramChange(0, 0, 0, 66)  # Tenor Sax
-    elif "violin" in str(genre.instruments):
-        midi.addProgramChange(0, 0, 0, 40)  # Violin
-    else:
-        midi.addProgramChange(0, 0, 0, 0)   # Piano
-    
-    # Track 1: Chords
-    if "organ" in str(genre.instruments):
-        midi.addProgramChange(1, 1, 0, 16)  # Organ
-    elif "synth" in str(genre.instruments):
-        midi.addProgramChange(1, 1, 0, 89)  # Pad
-    else:
-        midi.addProgramChange(1, 1, 0, 0)   # Piano
-    
-    # Track 2: Bass
-    if "808" in genre.bass_style or "trap" in genre.bass_style:
-        midi.addProgramChange(2, 2, 0, 38)  # Synth Bass
-    elif "synth" in genre.bass_style:
-        midi.addProgramChange(2, 2, 0, 38)  # Synth Bass
-    else:
-        midi.addProgramChange(2, 2, 0, 33)  # Electric Bass
+    programs = choose_programs(genre)
+    midi.addProgramChange(0, 0, 0, programs['melody'])
+    midi.addProgramChange(1, 1, 0, programs['chords'])
+    midi.addProgramChange(2, 2, 0, programs['bass'])
     
-    # Generate content
-    print("\nGenerating tracks...")
+    # Generate content (the four tracks in parallel)
+    if verbose:
+        print("\nGenerating tracks...")
+    result = composer.compose_all(bars, executor=executor)
+    if timings is not None:
+        timings.update(result.timings)
+    if verbose:
+        for track, seconds in result.timings.items():
+            print(f"  {track.capitalize():<7} {seconds * 1000:8.1f} ms")
+        print(f"  Total   {result.elapsed * 1000:8.1f} ms ({result.executor})")
     
     # Melody
-    print("  [1/4] Melody...")
-    melody = composer.generate_melody(bars)
-    for note in melody:
+    for note in result.melody:
         midi.addNote(0, 0, note.pitch, note.start, note.duration, note.velocity)
     
     # Chords
-    print("  [2/4] Chords...")
-    chords = composer.generate_chords(bars)
-    for bar_chords in chords:
+    for bar_chords in result.chords:
         for note in bar_chords:
             midi.addNote(1, 1, note.pitch, note.start, note.duration, note.velocity)
     
     # Bass
-    print("  [3/4] Bass...")
-    bass = composer.generate_bass_line(bars)
-    for note in bass:
+    for note in result.bass:
         midi.addNote(2, 2, note.pitch, note.start, note.duration, note.velocity)
     
     # Drums
-    print("  [4/4] Drums...")
-    drums = composer.generate_drum_pattern(bars)
-    for part_name, part_notes in drums.items():
+    for part_name, part_notes in result.drums.items():
         for note in part_notes:
             midi.addNote(3, 9, note.pitch, note.start, note.duration, note.velocity)
     
+    return midi, tempo, time_sig
+
+def render_midi_bytes(genre_id: str, bars: int = 32, seed: int = None, neural_model=None,
+                      executor='auto', timings: dict = None) -> bytes:
+    """Compose a genre and return the Standard MIDI File bytes (arguments as for compose_midi)."""
+    midi, _, _ = compose_midi(genre_id, bars, seed, neural_model=neural_model, executor=executor, timings=timings)
+    buffer = io.BytesIO()
+    with span('midi.write'):
+        midi.writeFile(buffer)
+    return buffer.getvalue()
+
+def generate_midi_streaming(genre_id: str, output_file: str = None, bars: int = 32, seed: int = None):
+    """
+    Generate a MIDI file bar by bar with the incremental writer.
+    Memory stays constant regardless of the number of bars (single-track SMF).
+    """
+    from midi_writer import stream_composition
+    
+    genre = get_genre(genre_id)
+    if not genre:
+        print(f"Error: Unknown genre '{genre_id}'")
+        return None
+    
+    if output_file is None:
+        output_file = f"{genre_id}.mid"
+    
+    print(f"\nStreaming {bars} bars of {genre.name} to {output_file}...")
+    composer = GenreComposer(genre_id, seed)
+    with open(output_file, "wb") as f:
+        count = stream_composition(composer, bars, f, choose_programs(genre))
+    
+    print(f"✓ Generated: {output_file} ({count} notes)")
+    return output_file
+
+def generate_midi(genre_id: str, output_file: str = None, bars: int = 32, seed: int = None):
+    """
+    Generate a multitrack MIDI file in the specified genre.
+    
+    Args:
+        genre_id: Genre identifier (use list_genres() to see options)
+        output_file: Output filename (default: {genre_id}.mid)
+        bars: Number of bars to generate
+        seed: Random seed for reproducibility
+    """
+    if not MIDIUTIL_AVAILABLE:
+        print("Error: midiutil is required. Install with: pip install midiutil")
+        return None
+    
+    genre = get_genre(genre_id)
+    if not genre:
+        print(f"Error: Unknown genre '{genre_id}'")
+        print(f"Available genres: {', '.join(list_genres()[:20])}...")
+        return None
+    
+    if output_file is None:
+        output_file = f"{genre_id}.mid"
+    
+    print(f"\n{'='*60}")
+    print(f"Generating: {genre.name}")
+    print(f"Category: {genre.category}")
+    print(f"Description: {genre.description}")
+    print(f"{'='*60}")
+    
+    midi, tempo, time_sig = compose_midi(genre_id, bars, seed, verbose=True)
+    
     # Write file
     print(f"\nWriting: {output_file}")
-    with open(output_file, "wb") as f:
+    with open(output_file, "wb") as f, span('midi.write'):
         midi.writeFile(f)
     
     # Calculate duration
@@ -148,6 +215,36 @@ def generate_midi(genre_id: str, output_file: str = None, bars: int = 32, seed:
     
     return output_file
 
+def run_batch_cli(manifest: str, output: str, workers: int = None, batch_seed: int = None):
+    """Render a JSONL job manifest across a process pool."""
+    from batch_generate import assign_seeds, check_filenames, load_manifest, run_batch, print_progress
+    
+    if not MIDIUTIL_AVAILABLE:
+        print("Error: midiutil is required. Install with: pip install midiutil")
+        return None
+    
+    try:
+        jobs = load_manifest(manifest)
+        # Colliding or unsafe names are reported before anything is rendered
+        check_filenames(assign_seeds(jobs, batch_seed))
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return None
+    print(f"\n{'='*60}")
+    print(f"Batch: {len(jobs)} jobs from {manifest} -> {output}")
+    print(f"{'='*60}")
+    
+    summary = run_batch(jobs, output, workers, batch_seed, progress=print_progress)
+    
+    print(f"\n{'='*60}")
+    print(f"✓ Rendered {summary['succeeded']}/{summary['jobs']} files in {summary['elapsed']:.1f}s "
+          f"({summary['files_per_sec']:.1f} files/sec, {summary['workers']} workers)")
+    if summary['failed']:
+        print(f"✗ {summary['failed']} jobs failed")
+    print(f"{'='*60}")
+    
+    return summary
+
 def list_all_genres():
     """Print all available genres organized by category."""
     print(f"\n{'='*60}")
@@ -172,12 +269,27 @@ def main():
     parser.add_argument("-o", "--output", help="Output filename")
     parser.add_argument("-b", "--bars", type=int, default=32, help="Number of bars (default: 32)")
     parser.add_argument("-s", "--seed", type=int, help="Random seed")
+    parser.add_argument("--stream", action="store_true",
+                        help="Write bar by bar in constant memory (single-track file, for very long pieces)")
     parser.add_argument("-l", "--list", action="store_true", help="List all genres")
     parser.add_argument("-i", "--info", help="Show info about a genre")
     parser.add_argument("--search", help="Search genres by keyword")
+    parser.add_argument("--limit", type=int, help="Maximum number of search results")
+    parser.add_argument("--batch", metavar="MANIFEST", help="Render every job in a JSONL manifest in parallel")
+    parser.add_argument("-w", "--workers", type=int, help="Worker processes for --batch (default: CPU count)")
+    parser.add_argument("--batch-seed", type=int, help="Seed for the RNG streams of unseeded batch jobs")
+    parser.add_argument("--profile", nargs="?", const="generate.prof", metavar="FILE",
+                        help="Profile the run with cProfile and write pstats output (default: generate.prof)")
     
     args = parser.parse_args()
+    if args.limit is not None and args.limit < 0:
+        parser.error("--limit must be >= 0")
     
+    with profiled(args.profile):
+        run_cli(args)
+
+def run_cli(args):
+    """Dispatch the parsed command line."""
     if args.list:
         list_all_genres()
         return
@@ -186,8 +298,12 @@ def main():
         print_genre_info(args.info)
         return
     
+    if args.batch:
+        run_batch_cli(args.batch, args.output or "batch_output", args.workers, args.batch_seed)
+        return
+    
     if args.search:
-        results = search_genres(args.search)
+        results = search_genres_ranked(args.search, args.limit)
         print(f"\nSearch results for '{args.search}':")
         for genre_id in results:
             genre = get_genre(genre_id)
@@ -202,12 +318,17 @@ def main():
         print("  python generate_any_genre.py --list          # List all genres")
         print("  python generate_any_genre.py --info <genre>  # Show genre info")
         print("  python generate_any_genre.py --search <term> # Search genres")
+        print("  python generate_any_genre.py --batch jobs.jsonl -o out.zip -w 8  # Batch render")
         print("\nExamples:")
         print("  python generate_any_genre.py trap")
         print("  python generate_any_genre.py jazz_fusion -b 64")
         print("  python generate_any_genre.py salsa -o my_salsa.mid")
         return
     
+    if args.stream:
+        generate_midi_streaming(args.genre, args.output, args.bars, args.seed)
+        return
+    
     generate_midi(args.genre, args.output, args.bars, args.seed)
 
 if __name__ == "__main__":
@@ -0,0 +1,137 @@
+"""
+Generation Cache
+Content-addressed store for seeded MIDI renders. Identical requests
+(genre, bars, seed, neural flag, model version) from the same composer
+version map to the same key and are served from disk; the least recently used entries are evicted once
+the cache exceeds its disk quota.
+"""
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from universal_composer import COMPOSER_VERSION
+
+DEFAULT_CACHE_DIR = os.path.join('output', 'cache')
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def model_version(model_path: Optional[str]) -> str:
+    """Identify a model file by size and modification time (cheap, changes on retrain)."""
+    if not model_path or not os.path.exists(model_path):
+        return 'none'
+    stat = os.stat(model_path)
+    tag = f"{os.path.basename(model_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.sha1(tag.encode('utf-8')).hexdigest()[:16]
+
+
+def cache_key(genre_id: str, bars: int, seed: int, neural: bool = False,
+              model: str = 'none') -> str:
+    """Hash the request parameters into a content address."""
+    params = {
+        'genre': genre_id,
+        'bars': int(bars),
+        'seed': int(seed),
+        'neural': bool(neural),
+        'model': model if neural else 'none',
+        'composer': COMPOSER_VERSION,
+    }
+    payload = json.dumps(params, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+
+def content_digest(data: bytes) -> str:
+    """Short hash of rendered bytes, used to name unseeded results uniquely."""
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+class GenerationCache:
+    """LRU cache of rendered MIDI files under a disk quota."""
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._scan()
+
+    def _scan(self):
+        """Index files already on disk, oldest access first."""
+        if not os.path.isdir(self.directory):
+            return
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.mid'):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            found.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self.total_bytes += size
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mid")
+
+    def url_for(self, key: str) -> str:
+        return '/' + self.path_for(key).replace(os.sep, '/')
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return cached bytes and mark the entry as recently used."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        path = self.path_for(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            # File removed behind our back
+            with self._lock:
+                size = self._entries.pop(key, 0)
+                self.total_bytes -= size
+            return None
+
+    def put(self, key: str, data: bytes) -> str:
+        """Store bytes under key (atomic rename) and evict to stay within quota."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self.total_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self.total_bytes += len(data)
+            self._evict()
+        return path
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._entries),
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
@@ -0,0 +1,228 @@
+"""
+Genre Search Index
+Inverted index over the genre catalogue with accent folding, prefix and
+n-gram matching and relevance ranking. Built once, queried per keystroke.
+"""
+import bisect
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from genres.all_genres import ALL_GENRES
+
+# Field weights: matches in the id/name count more than in the description
+FIELD_WEIGHTS = {
+    'id': 3.0,
+    'name': 3.0,
+    'alias': 2.0,
+    'category': 1.5,
+    'description': 1.0,
+}
+
+# Match-kind multipliers
+EXACT_BONUS = 1.0
+PREFIX_BONUS = 0.6
+NGRAM_BONUS = 0.25
+
+NGRAM_SIZE = 3
+
+# Spanish terms used in the genre compilation (.ini) mapped to catalogue categories
+CATEGORY_ALIASES = {
+    'Electronic': ['electronica', 'musica electronica'],
+    'R&B': ['ritmo y blues'],
+    'Hip-Hop': ['rap', 'hip hop'],
+    'Latin': ['latina', 'musica latina', 'latinoamericana'],
+    'Classical': ['clasica', 'musica clasica', 'orquestal'],
+    'Cinematic': ['cine', 'banda sonora', 'videojuegos'],
+    'Folk': ['folclore', 'folklorica', 'tradicional'],
+    'Gospel': ['religiosa', 'cristiana'],
+    'Experimental': ['vanguardia'],
+    'African': ['africana', 'musica africana'],
+    'Asian': ['asiatica', 'japonesa', 'china'],
+    'Caribbean': ['caribena', 'caribe'],
+    'European': ['europea', 'balcanica', 'celta', 'gitana'],
+    'Indian': ['india', 'musica india'],
+    'Middle Eastern': ['arabe', 'musica arabe'],
+    'New Age': ['nueva era', 'relajacion'],
+    'Russian': ['rusa', 'ruso', 'sovietica'],
+}
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip accents ("Reggaetón" -> "reggaeton")."""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    """Split folded text into alphanumeric tokens."""
+    folded = fold(text)
+    cleaned = ''.join(c if c.isalnum() else ' ' for c in folded)
+    return cleaned.split()
+
+
+def ngrams(token: str, n: int = NGRAM_SIZE) -> List[str]:
+    """Character n-grams of a token, padded so short tokens still produce one."""
+    padded = f" {token} "
+    if len(padded) <= n:
+        return [padded]
+    return [padded[i:i + n] for i in range(len(padded) - n + 1)]
+
+
+class GenreSearchIndex:
+    """Inverted index over genre ids, names, aliases, categories and descriptions."""
+
+    def __init__(self, genres: Dict = None):
+        if genres is None:
+            genres = ALL_GENRES
+
+        self.genre_ids: List[str] = list(genres.keys())
+        # token -> {genre_id: weight}
+        self.token_index: Dict[str, Dict[str, float]] = defaultdict(dict)
+        # n-gram -> set of tokens containing it
+        self.ngram_index: Dict[str, set] = defaultdict(set)
+        # sorted vocabulary for prefix lookups
+        self.vocabulary: List[str] = []
+        # folded full strings for phrase matching
+        self.phrases: Dict[str, str] = {}
+        self._query_cache: Dict[Tuple[str, Optional[int]], List[str]] = {}
+
+        for genre_id, params in genres.items():
+            aliases = CATEGORY_ALIASES.get(params.category, [])
+            fields = [
+                ('id', genre_id.replace('_', ' ')),
+                ('name', params.name),
+                ('category', params.category),
+                ('description', params.description),
+            ] + [('alias', alias) for alias in aliases]
+
+            for field, text in fields:
+                for token in tokenize(text):
+                    weight = FIELD_WEIGHTS[field]
+                    postings = self.token_index[token]
+                    if postings.get(genre_id, 0.0) < weight:
+                        postings[genre_id] = weight
+
+            self.phrases[genre_id] = ' '.join(fold(text) for _, text in fields)
+
+        for token in self.token_index:
+            for gram in ngrams(token):
+                self.ngram_index[gram].add(token)
+
+        self.vocabulary = sorted(self.token_index)
+
+    def _prefix_tokens(self, prefix: str) -> Iterable[str]:
+        """Vocabulary tokens starting with prefix (binary search over sorted vocabulary)."""
+        position = bisect.bisect_left(self.vocabulary, prefix)
+        while position < len(self.vocabulary) and self.vocabulary[position].startswith(prefix):
+            yield self.vocabulary[position]
+            position += 1
+
+    def _fuzzy_tokens(self, term: str) -> Dict[str, float]:
+        """Tokens sharing enough n-grams with term, with Dice similarity."""
+        grams = ngrams(term)
+        counts: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for token in self.ngram_index.get(gram, ()):
+                counts[token] += 1
+
+        matches = {}
+        for token, shared in counts.items():
+            similarity = 2.0 * shared / (len(grams) + len(ngrams(token)))
+            if similarity >= 0.5:
+                matches[token] = similarity
+        return matches
+
+    def _score_term(self, term: str, scores: Dict[str, float]):
+        """Accumulate scores for a single query term."""
+        term_scores: Dict[str, float] = {}
+
+        def add(token: str, bonus: float):
+            for genre_id, weight in self.token_index[token].items():
+                value = weight * bonus
+                if term_scores.get(genre_id, 0.0) < value:
+                    term_scores[genre_id] = value
+
+        if term in self.token_index:
+            add(term, EXACT_BONUS)
+        for token in self._prefix_tokens(term):
+            if token != term:
+                add(token, PREFIX_BONUS)
+        if len(term) >= NGRAM_SIZE:
+            for token, similarity in self._fuzzy_tokens(term).items():
+                add(token, NGRAM_BONUS * similarity)
+
+        for genre_id, value in term_scores.items():
+            scores[genre_id] = scores.get(genre_id, 0.0) + value
+        return term_scores
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[str]:
+        """Return genre ids ordered by relevance."""
+        key = (query, limit)
+        cached = self._query_cache.get(key)
+        if cached is not None:
+            return cached
+
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        scores: Dict[str, float] = {}
+        matched_all = None
+        for term in terms:
+            term_hits = self._score_term(term, scores)
+            hits = set(term_hits)
+            matched_all = hits if matched_all is None else matched_all & hits
+
+        # Every term must match something; whole-phrase hits get a boost
+        phrase = ' '.join(terms)
+        ranked = []
+        for genre_id in matched_all:
+            score = scores[genre_id]
+            if len(terms) > 1 and phrase in self.phrases[genre_id]:
+                score *= 1.5
+            ranked.append((-score, genre_id))
+        ranked.sort()
+
+        results = [genre_id for _, genre_id in ranked]
+        if limit is not None:
+            results = results[:limit]
+
+        if len(self._query_cache) > 4096:
+            self._query_cache.clear()
+        self._query_cache[key] = results
+        return results
+
+
+_index: Optional[GenreSearchIndex] = None
+
+
+def get_search_index() -> GenreSearchIndex:
+    """Get the shared search index, building it on first use."""
+    global _index
+    if _index is None:
+        _index = GenreSearchIndex()
+    return _index
+
+
+def search_genres_ranked(query: str, limit: Optional[int] = None) -> List[str]:
+    """Search genres by relevance using the shared index."""
+    if limit is not None and limit < 0:
+        raise ValueError(f"limit must be >= 0, got {limit}")
+    return get_search_index().search(query, limit)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    start = time.perf_counter()
+    index = get_search_index()
+    print(f"Index built in {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"({len(index.genre_ids)} genres, {len(index.vocabulary)} tokens)")
+
+    for query in sys.argv[1:] or ["reggaeton", "musica latina", "dark amb", "jaz"]:
+        start = time.perf_counter()
+        results = index.search(query, limit=10)
+        elapsed = (time.perf_counter() - start) * 1e6
+        print(f"{query!r}: {results} ({elapsed:.0f} µs)")
@@ -0,0 +1,241 @@
+"""
+Instrumentation
+Lightweight timing spans for the generation pipeline. Spans feed latency
+histograms per stage that the web server exposes in Prometheus text format
+(/api/metrics). When disabled, span() returns a shared no-op context and
+timed() calls straight through, so instrumented code pays one flag check.
+
+Also provides profiled(), a cProfile wrapper used by the CLIs' --profile flag,
+and thread_profiled(), which folds server handler threads into its profile.
+"""
+import os
+import io
+import sys
+import time
+import bisect
+import pstats
+import cProfile
+import threading
+import functools
+import contextlib
+from typing import Dict, Optional
+
+# Latency buckets in seconds (upper bounds, Prometheus style; +Inf is implicit)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_NAME = 'composer_stage_duration_seconds'
+
+_enabled = os.environ.get('COMPOSER_INSTRUMENTATION', '').lower() in ('1', 'true', 'yes')
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram."""
+
+    __slots__ = ('counts', 'count', 'sum')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+
+class Registry:
+    """Histograms keyed by stage name, thread-safe."""
+
+    def __init__(self):
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Plain-data copy of every histogram (JSON-serialisable, for render_histograms())."""
+        with self._lock:
+            return {stage: {'counts': list(h.counts), 'count': h.count, 'sum': h.sum}
+                    for stage, h in self._histograms.items()}
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count, total and mean seconds per stage."""
+        with self._lock:
+            return {stage: {'count': h.count, 'sum': h.sum, 'mean': h.sum / h.count if h.count else 0.0}
+                    for stage, h in sorted(self._histograms.items())}
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        return render_histograms({None: self.snapshot()})
+
+
+def render_histograms(snapshots: Dict[Optional[str], Dict[str, Dict]]) -> str:
+    """
+    Render Registry.snapshot()s in Prometheus text format, one metric family.
+    Keys are worker labels (None for no label), so several processes' histograms
+    can be exposed side by side.
+    """
+    lines = [
+        f"# HELP {METRIC_NAME} Time spent in each generation stage.",
+        f"# TYPE {METRIC_NAME} histogram",
+    ]
+    for worker, snapshot in snapshots.items():
+        extra = f',worker="{worker}"' if worker is not None else ''
+        for stage, h in sorted(snapshot.items()):
+            labels = f'stage="{stage}"{extra}'
+            cumulative = 0
+            for bound, count in zip(BUCKETS, h['counts']):
+                cumulative += count
+                lines.append(f'{METRIC_NAME}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{METRIC_NAME}_bucket{{{labels},le="+Inf"}} {h["count"]}')
+            lines.append(f'{METRIC_NAME}_sum{{{labels}}} {h["sum"]:.6f}')
+            lines.append(f'{METRIC_NAME}_count{{{labels}}} {h["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class _Span:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        REGISTRY.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+_NOOP = contextlib.nullcontext()
+
+# Before Python 3.12 cProfile only sees the thread that enabled it; from 3.12 it
+# is built on sys.monitoring, covers every thread, and allows one profiler at a time
+_PER_THREAD_PROFILES = sys.version_info < (3, 12)
+
+# While profiled() runs (before 3.12), thread_profiled() merges each block into _thread_stats
+_thread_profiling = False
+_thread_stats: Optional[pstats.Stats] = None
+_thread_stats_lock = threading.Lock()
+
+
+def span(stage: str):
+    """Time a block under the given stage name: `with span('midi.write'): ...`"""
+    return _Span(stage) if _enabled else _NOOP
+
+
+def timed(stage: str):
+    """Decorator form of span()."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                REGISTRY.observe(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+@contextlib.contextmanager
+def profiled(output: Optional[str], top: int = 25):
+    """
+    Run the block under cProfile (no-op if output is None).
+
+    Writes a pstats file (open with snakeviz, or convert for flame graphs with
+    flameprof / gprof2dot) and prints the hottest functions plus the span summary.
+    """
+    global _thread_profiling, _thread_stats
+    if not output:
+        yield
+        return
+
+    enable()
+    _thread_profiling = _PER_THREAD_PROFILES
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+
+        buffer = io.StringIO()
+        stats = pstats.Stats(profiler, stream=buffer)
+        with _thread_stats_lock:
+            if _thread_stats is not None:
+                stats.add(_thread_stats)
+            _thread_profiling, _thread_stats = False, None
+        stats.dump_stats(output)
+        stats.sort_stats('cumulative').print_stats(top)
+        print(buffer.getvalue())
+        print_summary()
+        print(f"✓ Profile written to {output}")
+
+
+@contextlib.contextmanager
+def thread_profiled():
+    """
+    Profile a block running on a worker thread into the enclosing profiled()
+    session, which merges it into its output. Needed before Python 3.12, where
+    the session's profiler does not see other threads; a no-op otherwise.
+    """
+    global _thread_stats
+    if not _thread_profiling:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        with _thread_stats_lock:
+            # Blocks still running when the session ends are dropped
+            if _thread_profiling:
+                if _thread_stats is None:
+                    _thread_stats = pstats.Stats(profiler)
+                else:
+                    _thread_stats.add(profiler)
+
+
+def print_summary():
+    """Print per-stage span totals."""
+    summary = REGISTRY.summary()
+    if not summary:
+        return
+    print("Stage timings:")
+    for stage, stats in summary.items():
+        print(f"  {stage:<28} {stats['count']:6d} calls {stats['sum'] * 1000:10.1f} ms "
+              f"(mean {stats['mean'] * 1000:.2f} ms)")
@@ -0,0 +1,42 @@
+"""
+Lazy Imports
+Deferred loading for heavy optional dependencies (TensorFlow, mido).
+Availability is checked with the import system's finder, which locates a
+package without executing it; the module itself is imported the first time
+one of its attributes is used.
+"""
+import importlib
+import importlib.util
+
+
+def module_available(name: str) -> bool:
+    """True if the module can be imported, without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        # Only reached for attributes not set in __init__, i.e. the module's own
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
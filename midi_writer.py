@@ -0,0 +1,172 @@
+"""
+Incremental Standard MIDI File Writer
+Writes note events as they are generated instead of collecting the whole
+piece first, so long renders run in constant memory and the first bytes
+reach the output immediately.
+"""
+import heapq
+import struct
+from typing import BinaryIO, Dict, Iterable, Optional, Tuple
+
+from instrumentation import timed
+
+# Track name -> MIDI channel, matching the layout of the multitrack writers
+TRACK_CHANNELS = {
+    'melody': 0,
+    'chords': 1,
+    'bass': 2,
+    'drums': 9,
+}
+
+DEFAULT_PROGRAMS = {
+    'melody': 0,   # Piano
+    'chords': 0,   # Piano
+    'bass': 33,    # Electric Bass
+}
+
+
+def _varlen(value: int) -> bytes:
+    """Encode a MIDI variable-length quantity."""
+    buffer = value & 0x7F
+    value >>= 7
+    out = bytearray()
+    while value:
+        out.insert(0, (value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(buffer)
+    return bytes(out)
+
+
+def _clamp(value, low: int, high: int) -> int:
+    return max(low, min(high, int(value)))
+
+
+class StreamingMIDIWriter:
+    """
+    Format-0 SMF writer that accepts notes in (roughly) time order.
+
+    Notes are queued as note-on/note-off events and written out by flush().
+    Events older than the last written tick are clamped to it, so callers
+    only need to flush up to a time no later note will start before.
+    """
+
+    def __init__(self, stream: BinaryIO, tempo: int = 120,
+                 time_signature: Tuple[int, int] = (4, 4),
+                 ticks_per_beat: int = 480,
+                 programs: Optional[Dict[int, int]] = None):
+        self.stream = stream
+        self.ticks_per_beat = ticks_per_beat
+        self.last_tick = 0
+        self.track_bytes = 0
+        self._pending = []  # heap of (tick, order, seq, event bytes)
+        self._seq = 0
+        self._closed = False
+
+        # Non-seekable outputs (pipes, sockets) cannot have the chunk length patched later
+        try:
+            self._seekable = stream.seekable()
+        except AttributeError:
+            self._seekable = False
+        self._body = bytearray() if not self._seekable else None
+
+        # Header chunk: format 0, one track
+        self.stream.write(b'MThd' + struct.pack('>IHHH', 6, 0, 1, ticks_per_beat))
+        if self._seekable:
+            self._length_offset = self.stream.tell() + 4
+            self.stream.write(b'MTrk' + struct.pack('>I', 0))
+
+        # Tempo and time signature meta events
+        mpqn = int(round(60_000_000 / tempo))
+        self._write_event(0, b'\xff\x51\x03' + mpqn.to_bytes(3, 'big'))
+        numerator, denominator = time_signature
+        self._write_event(0, bytes([0xFF, 0x58, 0x04, numerator,
+                                    denominator.bit_length() - 1, 24, 8]))
+
+        for channel, program in (programs or {}).items():
+            self._write_event(0, bytes([0xC0 | channel, program & 0x7F]))
+
+    def _write_event(self, tick: int, data: bytes):
+        tick = max(tick, self.last_tick)
+        chunk = _varlen(tick - self.last_tick) + data
+        self.last_tick = tick
+        self.track_bytes += len(chunk)
+        if self._body is not None:
+            self._body.extend(chunk)
+        else:
+            self.stream.write(chunk)
+
+    def add_note(self, channel: int, pitch: int, start: float, duration: float, velocity: int):
+        """Queue a note. start/duration are in beats."""
+        pitch = _clamp(pitch, 0, 127)
+        velocity = _clamp(velocity, 1, 127)
+        on_tick = max(0, int(round(start * self.ticks_per_beat)))
+        off_tick = max(on_tick + 1, int(round((start + duration) * self.ticks_per_beat)))
+
+        # Note-offs sort before note-ons at the same tick so repeated notes retrigger cleanly
+        heapq.heappush(self._pending, (on_tick, 1, self._seq, bytes([0x90 | channel, pitch, velocity])))
+        heapq.heappush(self._pending, (off_tick, 0, self._seq, bytes([0x80 | channel, pitch, 0])))
+        self._seq += 1
+
+    def flush(self, until_beat: float = None):
+        """Write all queued events up to until_beat (everything if None)."""
+        limit = None if until_beat is None else int(until_beat * self.ticks_per_beat)
+        while self._pending and (limit is None or self._pending[0][0] <= limit):
+            tick, _, _, data = heapq.heappop(self._pending)
+            self._write_event(tick, data)
+        if self._body is None and hasattr(self.stream, 'flush'):
+            self.stream.flush()
+
+    @timed('midi.close')
+    def close(self):
+        """Flush remaining events, end the track and fix up the chunk length."""
+        if self._closed:
+            return
+        self.flush()
+        self._write_event(self.last_tick, b'\xff\x2f\x00')
+
+        if self._body is not None:
+            self.stream.write(b'MTrk' + struct.pack('>I', len(self._body)))
+            self.stream.write(bytes(self._body))
+        else:
+            end = self.stream.tell()
+            self.stream.seek(self._length_offset)
+            self.stream.write(struct.pack('>I', self.track_bytes))
+            self.stream.seek(end)
+        self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def write_bars(writer: StreamingMIDIWriter, bar_events: Iterable, beats_per_bar: int,
+               lookback_beats: float = 1.0) -> int:
+    """
+    Consume (bar_index, [(track_name, note), ...]) from GenreComposer.iter_bars,
+    flushing each bar once later bars can no longer start before it.
+    Returns the number of notes written.
+    """
+    count = 0
+    for bar, events in bar_events:
+        for track_name, note in events:
+            writer.add_note(TRACK_CHANNELS[track_name], note.pitch, note.start,
+                            note.duration, note.velocity)
+            count += 1
+        # Syncopation/swing can pull the next bar's first notes slightly earlier
+        writer.flush(bar * beats_per_bar - lookback_beats)
+    writer.flush()
+    return count
+
+
+@timed('midi.stream')
+def stream_composition(composer, bars: int, stream: BinaryIO, programs: Dict[str, int] = None) -> int:
+    """Compose with GenreComposer.iter_bars and write an SMF incrementally. Returns the note count."""
+    tempo = composer.plan.tempo
+    time_sig = composer.plan.time_signature
+    programs = DEFAULT_PROGRAMS if programs is None else programs
+    channel_programs = {TRACK_CHANNELS[track]: program for track, program in programs.items()}
+
+    with StreamingMIDIWriter(stream, tempo, time_sig, programs=channel_programs) as writer:
+        return write_bars(writer, composer.iter_bars(bars), time_sig[0])
@@ -0,0 +1,369 @@
+"""
+Model Registry
+Index of the trained models in models/ with a JSON manifest per model
+(architecture, sequence length, training corpus hash, size, measured
+inference latency). A background thread polls the directory; when a model
+file changes, the new version is loaded next to the one being served and
+swapped in once it is ready, so retrained models go live without
+restarting the web server and in-flight requests keep the model they started with.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from dataclasses import dataclass, asdict, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from generation_cache import model_version
+from event_tokens import vocabulary_path
+
+DEFAULT_MODELS_DIR = 'models'
+DEFAULT_POLL_SECONDS = 2.0
+MODEL_SUFFIX = '.h5'
+LATENCY_RUNS = 5
+
+
+def model_path_for(name: str, directory: str = DEFAULT_MODELS_DIR) -> str:
+    return os.path.join(directory, f"{name}{MODEL_SUFFIX}")
+
+
+def manifest_path(model_path: str) -> str:
+    """Manifest stored next to a model: models/x.h5 -> models/x.manifest.json"""
+    return os.path.splitext(model_path)[0] + '.manifest.json'
+
+
+def corpus_hash(path: Optional[str]) -> Optional[str]:
+    """
+    sha256 over the MIDI files of a training directory (names relative to it, and
+    contents), or over every file of a sharded dataset directory.
+    """
+    if not path or not os.path.isdir(path):
+        return None
+    root = Path(path)
+    if (root / 'index.json').exists():
+        files = sorted(p for p in root.iterdir() if p.is_file())
+    else:
+        files = sorted(list(root.glob('**/*.mid')) + list(root.glob('**/*.midi')))
+
+    digest = hashlib.sha256()
+    for file in files:
+        digest.update(file.relative_to(root).as_posix().encode('utf-8') + b'\0')
+        with open(file, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+@dataclass
+class ModelManifest:
+    """What is known about one model file; version changes whenever the file does."""
+    name: str
+    file: str
+    architecture: str = 'float'                    # 'float' regression or 'tokens' (see event_tokens)
+    seq_length: Optional[int] = None
+    corpus: Optional[str] = None                   # Directory or dataset the model was trained on
+    corpus_hash: Optional[str] = None
+    size_bytes: int = 0
+    version: str = 'none'                          # generation_cache.model_version of the file
+    trained_at: Optional[str] = None
+    training: Optional[Dict] = None                # TrainingConfig of the run (batch size, seed...)
+    inference_latency_ms: Optional[float] = None   # Median single-window prediction, measured on load
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ModelManifest':
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+    def save(self, path: str):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['ModelManifest']:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls.from_dict(json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+
+def describe(model_path: str) -> ModelManifest:
+    """Manifest derived from the model file alone (for models trained before manifests existed)"""
+    name = os.path.splitext(os.path.basename(model_path))[0]
+    return ModelManifest(
+        name=name,
+        file=os.path.basename(model_path),
+        architecture='tokens' if os.path.exists(vocabulary_path(model_path)) else 'float',
+        size_bytes=os.path.getsize(model_path),
+        version=model_version(model_path),
+    )
+
+
+def write_manifest(model_path: str, architecture: str = 'float', seq_length: Optional[int] = None,
+                   corpus: Optional[str] = None, training: Optional[Dict] = None) -> ModelManifest:
+    """Record a freshly saved model's training details next to it"""
+    manifest = describe(model_path)
+    manifest.architecture = architecture
+    manifest.seq_length = seq_length
+    manifest.corpus = corpus
+    manifest.corpus_hash = corpus_hash(corpus)
+    manifest.trained_at = datetime.now().isoformat(timespec='seconds')
+    manifest.training = training
+    manifest.save(manifest_path(model_path))
+    return manifest
+
+
+def load_composer(model_path: str):
+    """Default loader: an AdvancedNeuralComposer with the model file loaded"""
+    from advanced_neural_network import AdvancedNeuralComposer
+    composer = AdvancedNeuralComposer(model_name=os.path.splitext(os.path.basename(model_path))[0])
+    composer.load_model(model_path)
+    if composer.model is None:
+        raise RuntimeError(f"Could not load {model_path}")
+    return composer
+
+
+def measure_latency(composer, runs: int = LATENCY_RUNS) -> float:
+    """Median milliseconds to predict the note after one window (after a warm-up call)"""
+    shape = (1,) + tuple(composer.model.input_shape[1:])
+    window = np.zeros(shape, dtype=np.int32 if composer.encoding == 'tokens' else np.float32)
+    composer.model.predict(window, verbose=0)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        composer.model.predict(window, verbose=0)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+@dataclass(frozen=True)
+class ServedModel:
+    """A loaded model and the manifest of the file it was loaded from"""
+    manifest: ModelManifest
+    composer: object
+
+    @property
+    def version(self) -> str:
+        return self.manifest.version
+
+
+class ModelRegistry:
+    """Manifests of the models in a directory, and a serving cache of loaded models."""
+
+    def __init__(self, directory: str = DEFAULT_MODELS_DIR, poll_seconds: float = DEFAULT_POLL_SECONDS,
+                 loader: Callable[[str], object] = load_composer):
+        self.directory = directory
+        self.poll_seconds = poll_seconds
+        self.loader = loader
+        self.swaps = 0
+        self._manifests: Dict[str, ModelManifest] = {}
+        self._seen: Dict[str, Tuple] = {}       # name -> stat of model and manifest at the last accepted scan
+        self._pending: Dict[str, Tuple] = {}    # Changed files waiting to hold still for one poll
+        self._served: Dict[str, ServedModel] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._scanned = False
+        self._last_scan = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def path_for(self, name: str) -> str:
+        return model_path_for(name, self.directory)
+
+    def _stat(self, entry: os.DirEntry) -> Tuple:
+        stat = entry.stat()
+        try:
+            manifest_mtime = os.stat(manifest_path(entry.path)).st_mtime_ns
+        except OSError:
+            manifest_mtime = 0
+        return stat.st_size, stat.st_mtime_ns, manifest_mtime
+
+    def scan(self) -> List[str]:
+        """Re-stat the directory; returns the models added or changed since the last scan."""
+        found = {}
+        if os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                # Dot-files are temporaries of an atomic save in progress
+                if entry.name.endswith(MODEL_SUFFIX) and not entry.name.startswith('.'):
+                    found[entry.name[:-len(MODEL_SUFFIX)]] = self._stat(entry)
+
+        changed = []
+        with self._lock:
+            for name in set(self._seen) - set(found):
+                self._seen.pop(name)
+                self._manifests.pop(name, None)
+                self._served.pop(name, None)
+            for name in set(self._pending) - set(found):
+                self._pending.pop(name)
+
+            for name, stat in found.items():
+                if self._seen.get(name) == stat:
+                    continue
+                # After startup, a changed file may still be being copied in: accept it once it holds still
+                if self._scanned and self._pending.get(name) != stat:
+                    self._pending[name] = stat
+                    continue
+                self._pending.pop(name, None)
+                self._seen[name] = stat
+                changed.append(name)
+
+            self._scanned = True
+            self._last_scan = time.monotonic()
+
+        for name in changed:
+            path = self.path_for(name)
+            manifest = ModelManifest.load(manifest_path(path))
+            try:
+                current = describe(path)
+            except OSError:
+                continue
+            if manifest is None or manifest.version != current.version:
+                # No manifest, or one left over from a different file: only the file itself is known
+                manifest = current
+            with self._lock:
+                self._manifests[name] = manifest
+        return changed
+
+    def refresh(self) -> List[str]:
+        """Scan, then load the new version of every changed model that is being served and swap it in."""
+        changed = self.scan()
+        for name in changed:
+            with self._lock:
+                served = self._served.get(name)
+                manifest = self._manifests.get(name)
+            if served is None or manifest is None:
+                continue
+            if served.version == manifest.version:
+                # Only the manifest changed (e.g. the latency was recorded)
+                with self._lock:
+                    self._served[name] = ServedModel(manifest, served.composer)
+            else:
+                self._load(name)
+        return changed
+
+    def _refresh_if_stale(self):
+        if not self._scanned or (self._thread is None and time.monotonic() - self._last_scan > self.poll_seconds):
+            self.refresh()
+
+    def list(self) -> List[ModelManifest]:
+        self._refresh_if_stale()
+        with self._lock:
+            return [self._manifests[name] for name in sorted(self._manifests)]
+
+    def manifest(self, name: str) -> Optional[ModelManifest]:
+        self._refresh_if_stale()
+        with self._lock:
+            return self._manifests.get(name)
+
+    def version(self, name: str) -> str:
+        """Version of the model file on disk, without loading it ('none' if absent)"""
+        manifest = self.manifest(name)
+        return manifest.version if manifest else 'none'
+
+    def is_loaded(self, name: str) -> bool:
+        with self._lock:
+            return name in self._served
+
+    def get(self, name: str, probe_latency: bool = True) -> Optional[ServedModel]:
+        """
+        The loaded model, loading it on first use; None if it does not exist or fails to load.
+        probe_latency=False skips the timed predict() calls on load (e.g. before forking,
+        where inference would start TensorFlow's thread pools in the parent).
+        """
+        self._refresh_if_stale()
+        with self._lock:
+            served = self._served.get(name)
+            manifest = self._manifests.get(name)
+        if manifest is None:
+            return None
+        if served is not None and served.version == manifest.version:
+            return served
+        return self._load(name, probe_latency)
+
+    def _load(self, name: str, probe_latency: bool = True) -> Optional[ServedModel]:
+        with self._lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                served = self._served.get(name)
+                manifest = self._manifests.get(name)
+            if manifest is None:
+                return None
+            if served is not None and served.version == manifest.version:
+                return served  # Loaded by another thread meanwhile
+
+            path = self.path_for(name)
+            try:
+                composer = self.loader(path)
+            except Exception as e:
+                print(f"Warning: Could not load model {name}: {e}")
+                return served
+
+            manifest = self._complete_manifest(path, manifest, composer, probe_latency)
+            fresh = ServedModel(manifest, composer)
+            with self._lock:
+                if self._manifests.get(name) is not None and self._manifests[name].version == manifest.version:
+                    self._manifests[name] = manifest
+                if served is not None:
+                    self.swaps += 1
+                # Requests that already hold the previous ServedModel keep using it
+                self._served[name] = fresh
+            return fresh
+
+    def _complete_manifest(self, path: str, manifest: ModelManifest, composer,
+                           probe_latency: bool = True) -> ModelManifest:
+        """Fill in what only a loaded model can tell (sequence length, latency) and persist it"""
+        updated = ModelManifest.from_dict(manifest.to_dict())
+        updated.architecture = getattr(composer, 'encoding', updated.architecture)
+        if updated.seq_length is None:
+            updated.seq_length = getattr(composer, 'seq_length', None)
+        if (probe_latency and updated.inference_latency_ms is None
+                and getattr(composer, 'model', None) is not None):
+            try:
+                updated.inference_latency_ms = round(measure_latency(composer), 3)
+            except Exception as e:
+                print(f"Warning: Could not measure latency of {manifest.name}: {e}")
+        if updated != manifest and model_version(path) == manifest.version:
+            try:
+                updated.save(manifest_path(path))
+            except OSError:
+                pass
+        return updated
+
+    def start(self):
+        """Poll the directory in a daemon thread every poll_seconds."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self.refresh()
+
+        def watch():
+            while not self._stop.wait(self.poll_seconds):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Warning: Model registry scan failed: {e}")
+
+        self._thread = threading.Thread(target=watch, name='model-registry', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'available': len(self._manifests), 'loaded': len(self._served), 'swaps': self.swaps}
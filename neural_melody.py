@@ -5,14 +5,12 @@ Uses a simple LSTM-based model for MIDI sequence generation.
 import numpy as np
 from typing import List, Tuple, Optional
 
-# Check if TensorFlow is available
-try:
-    import tensorflow as tf
-    from tensorflow.keras.models import Sequential
-    from tensorflow.keras.layers import LSTM, Dense, Dropout
-    TF_AVAILABLE = True
-except ImportError:
-    TF_AVAILABLE = False
+from lazy_imports import LazyModule, module_available
+
+# Check if TensorFlow is available without importing it; it loads on first use
+tf = LazyModule('tensorflow')
+TF_AVAILABLE = module_available('tensorflow')
+if not TF_AVAILABLE:
     print("TensorFlow not available. Using rule-based fallback.")
 
 class MelodyDataset:
@@ -75,13 +73,14 @@ class NeuralMelodyGenerator:
         if not TF_AVAILABLE:
             return
         
-        self.model = Sequential([
-            LSTM(64, input_shape=(self.seq_length, 3), return_sequences=True),
-            Dropout(0.2),
-            LSTM(32),
-            Dropout(0.2),
-            Dense(16, activation='relu'),
-            Dense(3, activation='sigmoid')  # note, velocity, duration
+        layers = tf.keras.layers
+        self.model = tf.keras.models.Sequential([
+            layers.LSTM(64, input_shape=(self.seq_length, 3), return_sequences=True),
+            layers.Dropout(0.2),
+            layers.LSTM(32),
+            layers.Dropout(0.2),
+            layers.Dense(16, activation='relu'),
+            layers.Dense(3, activation='sigmoid')  # note, velocity, duration
         ])
         self.model.compile(optimizer='adam', loss='mse')
     
@@ -96,6 +95,19 @@ class NeuralMelodyGenerator:
         self.model.fit(X, y, epochs=epochs, batch_size=32, verbose=verbose)
         self.is_trained = True
     
+    def get_weights(self) -> Optional[List[np.ndarray]]:
+        """Trained weights as NumPy arrays (picklable), or None without a model."""
+        return self.model.get_weights() if self.model is not None else None
+    
+    def set_weights(self, weights: List[np.ndarray]):
+        """Load weights from get_weights() instead of training."""
+        if not TF_AVAILABLE:
+            self.is_trained = True
+            return
+        self.build_model()
+        self.model.set_weights(weights)
+        self.is_trained = True
+    
     def generate_note(self, seed_sequence: np.ndarray) -> Tuple[int, int, float]:
         """Generate next note based on seed sequence."""
         if not TF_AVAILABLE or not self.is_trained:
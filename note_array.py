@@ -0,0 +1,40 @@
+"""
+Note Arrays
+Structured NumPy representation of note events, used by the vectorized
+engines to build whole tracks at once before converting to Note objects
+or event tuples at the edges.
+"""
+import numpy as np
+from typing import Callable, List, Tuple
+
+NOTE_DTYPE = np.dtype([
+    ('pitch', np.int16),
+    ('velocity', np.int16),
+    ('start', np.float64),     # In beats
+    ('duration', np.float64),  # In beats
+])
+
+
+def make_notes(pitch, velocity, start, duration) -> np.ndarray:
+    """Pack parallel arrays (or scalars broadcast against them) into a note array."""
+    pitch, velocity, start, duration = np.broadcast_arrays(pitch, velocity, start, duration)
+    notes = np.empty(pitch.shape[0] if pitch.ndim else 1, dtype=NOTE_DTYPE)
+    notes['pitch'] = pitch
+    notes['velocity'] = np.clip(velocity, 1, 127)
+    notes['start'] = start
+    notes['duration'] = duration
+    return notes
+
+
+def concat_notes(arrays: List[np.ndarray]) -> np.ndarray:
+    return np.concatenate(arrays) if arrays else np.empty(0, dtype=NOTE_DTYPE)
+
+
+def to_objects(notes: np.ndarray, factory: Callable) -> list:
+    """Convert to factory(pitch, velocity, start, duration) objects, e.g. universal_composer.Note."""
+    return [factory(*fields) for fields in notes.tolist()]
+
+
+def to_events(notes: np.ndarray) -> List[Tuple[float, int, int, float]]:
+    """Convert to (beat, pitch, velocity, duration) tuples as used by the A Dawn generators."""
+    return [(start, pitch, velocity, duration) for pitch, velocity, start, duration in notes.tolist()]
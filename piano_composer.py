@@ -30,11 +30,17 @@ class PianoComposer:
         'ending': ['Am', 'F', 'C', 'C'],
     }
     
-    def __init__(self, seed: int = None):
+    NEURAL_EPOCHS = 30
+    
+    def __init__(self, seed: int = None, neural_weights: Optional[List[np.ndarray]] = None):
+        """neural_weights: Weights from an already trained NeuralMelodyGenerator (skips training)"""
         if seed:
             np.random.seed(seed)
         self.neural_gen = NeuralMelodyGenerator()
-        self.neural_gen.train(epochs=30, verbose=0)
+        if neural_weights is not None:
+            self.neural_gen.set_weights(neural_weights)
+        else:
+            self.neural_gen.train(epochs=self.NEURAL_EPOCHS, verbose=0)
     
     def generate_arpeggio(self, chord_name: str, beats: int = 4, 
                           velocity_range: Tuple[int, int] = (50, 70)) -> List[Tuple[float, int, int, float]]:
@@ -0,0 +1,206 @@
+"""
+Pre-fork Serving
+Runs an HTTP server as several worker processes accepting on one listening
+socket. Read-only state that is plain Python and NumPy (genre catalogue,
+search index, chord tables) is loaded once in the parent, which then forks:
+the workers share those pages copy-on-write instead of each building its own
+copy. State that owns threads, such as a TensorFlow model, cannot cross fork
+safely and is loaded by each worker after it starts.
+Per-process memory is read from /proc/<pid>/smaps_rollup (Linux) and reported
+once every worker has finished its startup.
+
+Requests land on whichever worker accepts them, so per-process counters are
+shared through WorkerSnapshots: each worker publishes a JSON snapshot to a
+common directory, where any worker can read them all.
+"""
+import gc
+import os
+import json
+import time
+import shutil
+import signal
+import tempfile
+import threading
+from typing import Callable, Dict, List, Optional
+
+RESPAWN_DELAY_SECONDS = 1.0
+PUBLISH_INTERVAL_SECONDS = 2.0
+
+
+def memory_usage(pid='self') -> Dict[str, int]:
+    """RSS, PSS, shared and private bytes of a process; empty where smaps_rollup is unavailable."""
+    values = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    values[parts[0].rstrip(':')] = int(parts[1]) * 1024
+    except OSError:
+        return {}
+    return {
+        'rss': values.get('Rss', 0),
+        'pss': values.get('Pss', 0),
+        'shared': values.get('Shared_Clean', 0) + values.get('Shared_Dirty', 0),
+        'private': values.get('Private_Clean', 0) + values.get('Private_Dirty', 0),
+    }
+
+
+def memory_report(parent: int, workers: List[int]) -> Optional[Dict]:
+    """Memory of the parent and each worker, and what the workers would cost without sharing."""
+    parent_usage = memory_usage(parent)
+    if not parent_usage:
+        return None
+    rows = [usage for usage in (memory_usage(pid) for pid in workers) if usage]
+    return {
+        'parent': parent_usage,
+        'workers': rows,
+        'worker_private_avg': sum(r['private'] for r in rows) / len(rows) if rows else 0,
+        'total_pss': parent_usage['pss'] + sum(r['pss'] for r in rows),
+        'unshared_estimate': parent_usage['rss'] * (len(rows) + 1),
+    }
+
+
+def print_memory_report(report: Optional[Dict]):
+    if report is None:
+        print("Memory report unavailable (needs /proc/<pid>/smaps_rollup)")
+        return
+    mb = 1024 * 1024
+    print(f"\n{'Process':<10} {'RSS MB':>9} {'PSS MB':>9} {'Shared MB':>10} {'Private MB':>11}")
+    for label, usage in [('parent', report['parent'])] + [(f'worker {i}', r) for i, r in enumerate(report['workers'])]:
+        print(f"{label:<10} {usage['rss'] / mb:>9.1f} {usage['pss'] / mb:>9.1f} "
+              f"{usage['shared'] / mb:>10.1f} {usage['private'] / mb:>11.1f}")
+    print(f"Per-worker overhead: {report['worker_private_avg'] / mb:.1f} MB private; "
+          f"total PSS {report['total_pss'] / mb:.1f} MB vs ~{report['unshared_estimate'] / mb:.1f} MB "
+          f"if every process loaded its own copy\n")
+
+
+class WorkerSnapshots:
+    """
+    Per-worker JSON snapshots in a shared directory, one file per worker index
+    (a restarted worker replaces its predecessor's). Create it in the parent
+    before forking; close() it there on shutdown.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or tempfile.mkdtemp(prefix='composer-workers-')
+
+    def publish(self, worker: int, snapshot: Dict):
+        path = os.path.join(self.directory, f'{worker}.json')
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+
+    def collect(self) -> Dict[str, Dict]:
+        """Latest snapshot of every worker, keyed by worker index (as a string)."""
+        snapshots = {}
+        try:
+            names = sorted(os.listdir(self.directory))
+        except OSError:
+            return snapshots
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), 'r') as f:
+                    snapshots[name[:-len('.json')]] = json.load(f)
+            except (OSError, ValueError):
+                continue
+        return dict(sorted(snapshots.items(), key=lambda item: int(item[0])))
+
+    def start(self, worker: int, snapshot: Callable[[], Dict],
+              interval: float = PUBLISH_INTERVAL_SECONDS) -> threading.Thread:
+        """Publish snapshot() every interval seconds from a daemon thread (call in the worker)."""
+        def loop():
+            while True:
+                try:
+                    self.publish(worker, snapshot())
+                except OSError:
+                    pass
+                time.sleep(interval)
+
+        thread = threading.Thread(target=loop, name=f'snapshots-{worker}', daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def serve(httpd, workers: int, after_fork: Optional[Callable[[int], None]] = None,
+          after_start: Optional[Callable[[], None]] = None):
+    """
+    Fork `workers` processes that each run httpd.serve_forever() on the shared socket,
+    restart any that die, and stop them all on Ctrl+C. Call after preloading, with no
+    threads running: threads (including native ones such as TensorFlow's pools) do not
+    survive fork. after_fork(index) runs in each worker before it serves and is the
+    place to start them and load per-worker state; the memory report is printed once
+    every first-generation worker has returned from it (or died).
+    after_start() runs in the parent once the workers are forked.
+    """
+    # Keep the garbage collector from touching (and so un-sharing) the preloaded objects
+    gc.collect()
+    gc.freeze()
+
+    parent = os.getpid()
+    children: Dict[int, int] = {}
+    # Each first-generation worker closes its end once started: EOF means all are up
+    ready_read, ready_write = os.pipe()
+
+    def spawn(index: int, ready: Optional[int] = None) -> int:
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                if ready is not None:
+                    os.close(ready_read)
+                signal.signal(signal.SIGTERM, signal.default_int_handler)
+                if after_fork:
+                    after_fork(index)
+                if ready is not None:
+                    os.close(ready)
+                httpd.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            except BaseException as e:
+                print(f"Worker {index} failed: {e}")
+                status = 1
+            finally:
+                os._exit(status)
+        return pid
+
+    for index in range(workers):
+        children[spawn(index, ready_write)] = index
+    os.close(ready_write)
+
+    def report():
+        with os.fdopen(ready_read, 'rb') as ready:
+            ready.read()
+        print_memory_report(memory_report(parent, list(children)))
+
+    threading.Thread(target=report, name='memory-report', daemon=True).start()
+    if after_start:
+        after_start()
+
+    try:
+        while children:
+            pid, status = os.wait()
+            index = children.pop(pid, None)
+            if index is None:
+                continue
+            print(f"Worker {index} (pid {pid}) exited with status {status}, restarting")
+            time.sleep(RESPAWN_DELAY_SECONDS)
+            children[spawn(index)] = index
+    except KeyboardInterrupt:
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+        for pid in list(children):
+            try:
+                os.waitpid(pid, 0)
+            except OSError:
+                pass
+        raise
@@ -0,0 +1,123 @@
+"""
+HTTP Response Cache
+Precomputes serialized and compressed response bodies with ETags so that
+catalogue endpoints and static files are served without re-encoding.
+"""
+import os
+import gzip
+import json
+import hashlib
+import threading
+from typing import Dict, Optional, Tuple
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+
+API_CACHE_CONTROL = 'public, max-age=300'
+STATIC_CACHE_CONTROL = 'no-cache'
+
+
+class CachedResponse:
+    """A response body with its precomputed encodings and validator."""
+
+    def __init__(self, body: bytes, content_type: str, cache_control: str = API_CACHE_CONTROL):
+        self.body = body
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        self.encodings: Dict[str, bytes] = {}
+
+        if len(body) >= MIN_COMPRESS_SIZE:
+            gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(gzipped) < len(body):
+                self.encodings['gzip'] = gzipped
+            if BROTLI_AVAILABLE:
+                compressed = brotli.compress(body, quality=11)
+                if len(compressed) < len(body):
+                    self.encodings['br'] = compressed
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Check an If-None-Match header against this response's ETag."""
+        if not if_none_match:
+            return False
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag == '*':
+                return True
+            if tag.startswith('W/'):
+                tag = tag[2:]
+            if tag == self.etag:
+                return True
+        return False
+
+    def select(self, accept_encoding: Optional[str]) -> Tuple[Optional[str], bytes]:
+        """Pick the best encoding accepted by the client. Returns (encoding, body)."""
+        if not accept_encoding or not self.encodings:
+            return None, self.body
+
+        accepted = {}
+        for part in accept_encoding.split(','):
+            pieces = part.strip().split(';')
+            name = pieces[0].strip().lower()
+            quality = 1.0
+            for param in pieces[1:]:
+                param = param.strip()
+                if param.startswith('q='):
+                    try:
+                        quality = float(param[2:])
+                    except ValueError:
+                        quality = 0.0
+            accepted[name] = quality
+
+        for encoding in ('br', 'gzip'):
+            if encoding in self.encodings and accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+                return encoding, self.encodings[encoding]
+        return None, self.body
+
+
+class ResponseCache:
+    """Keyed store of precomputed responses, with mtime revalidation for files."""
+
+    def __init__(self):
+        self._entries: Dict[str, CachedResponse] = {}
+        self._file_mtimes: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        return self._entries.get(key)
+
+    def put(self, key: str, body: bytes, content_type: str,
+            cache_control: str = API_CACHE_CONTROL) -> CachedResponse:
+        entry = CachedResponse(body, content_type, cache_control)
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def put_json(self, key: str, data, cache_control: str = API_CACHE_CONTROL) -> CachedResponse:
+        body = json.dumps(data).encode('utf-8')
+        return self.put(key, body, 'application/json', cache_control)
+
+    def get_file(self, filename: str, content_type: str,
+                 cache_control: str = STATIC_CACHE_CONTROL) -> Optional[CachedResponse]:
+        """Get a cached file, reloading it if it changed on disk. None if missing."""
+        try:
+            mtime = os.stat(filename).st_mtime
+        except OSError:
+            return None
+
+        key = 'file:' + filename
+        entry = self._entries.get(key)
+        if entry is not None and self._file_mtimes.get(key) == mtime:
+            return entry
+
+        with open(filename, 'rb') as f:
+            body = f.read()
+        entry = self.put(key, body, content_type, cache_control)
+        self._file_mtimes[key] = mtime
+        return entry
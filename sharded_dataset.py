@@ -0,0 +1,311 @@
+"""
+Sharded Dataset
+On-disk training corpus for corpora larger than RAM: fixed-size .npy shards
+of per-note arrays (normalized float32 features or uint16 event tokens),
+a window index and a JSON manifest. Shards are opened memory-mapped, so any
+training window can be fetched by global index without loading the corpus
+and the OS page cache keeps hot shards in memory.
+
+Each shard repeats the first seq_length notes of the next one, so every
+window lies inside a single shard and is read with one slice.
+
+Layout of a dataset directory:
+    index.json          manifest (encoding, seq_length, shard sizes, vocabulary)
+    shard_00000.npy     notes [k * shard_notes, (k + 1) * shard_notes + seq_length)
+    windows.npy         global start note of every window (int64), never crossing files
+
+Usage:
+    python sharded_dataset.py export -d training_data -o dataset/ [--encoding tokens]
+    python sharded_dataset.py info dataset/
+    python sharded_dataset.py bench dataset/        # Random-window throughput
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from event_tokens import TOKEN_DTYPE, Vocabulary, encode_notes
+from lazy_imports import LazyModule
+
+tf = LazyModule('tensorflow')
+
+FORMAT_VERSION = 1
+INDEX_FILE = 'index.json'
+WINDOWS_FILE = 'windows.npy'
+DEFAULT_SHARD_NOTES = 1 << 20  # ~12 MB per float shard, 2 MB per token shard
+
+
+def shard_name(k: int) -> str:
+    return f"shard_{k:05d}.npy"
+
+
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
+class DatasetWriter:
+    """Streams per-file note arrays into shards; nothing beyond one shard is held in memory."""
+
+    def __init__(self, path: str, encoding: str = 'float', seq_length: int = 100,
+                 shard_notes: int = DEFAULT_SHARD_NOTES, vocabulary: Optional[Vocabulary] = None):
+        if encoding not in ('float', 'tokens'):
+            raise ValueError(f"Unknown encoding: {encoding}")
+        if shard_notes < 1:
+            raise ValueError(f"shard_notes must be at least 1, got {shard_notes}")
+        self.path = path
+        self.encoding = encoding
+        self.seq_length = seq_length
+        self.shard_notes = shard_notes
+        self.vocabulary = vocabulary or (Vocabulary() if encoding == 'tokens' else None)
+        self.dtype = TOKEN_DTYPE if encoding == 'tokens' else np.float32
+
+        self._buffer: List[np.ndarray] = []
+        self._buffered = 0
+        self._shards: List[Dict] = []
+        self._file_offsets = [0]
+        self.total = 0
+        os.makedirs(path, exist_ok=True)
+
+    def add(self, notes: np.ndarray):
+        """Append one file's notes: (n, 3) float32 features or (n,) tokens."""
+        notes = np.asarray(notes, dtype=self.dtype)
+        if len(notes) == 0:
+            return
+        self._buffer.append(notes)
+        self._buffered += len(notes)
+        self.total += len(notes)
+        self._file_offsets.append(self.total)
+
+        # Write a shard once its overlap with the next one is buffered too
+        while self._buffered >= self.shard_notes + self.seq_length:
+            self._flush(self.shard_notes + self.seq_length, keep_from=self.shard_notes)
+
+    def _flush(self, count: int, keep_from: int):
+        data = np.concatenate(self._buffer)
+        name = shard_name(len(self._shards))
+        np.save(os.path.join(self.path, name), data[:count])
+        self._shards.append({'file': name, 'notes': int(min(count, len(data)))})
+        rest = data[keep_from:]
+        self._buffer = [rest] if len(rest) else []
+        self._buffered = len(rest)
+
+    def close(self) -> Dict:
+        """Write the last shard, the window index and the manifest. Returns the manifest."""
+        if self._buffered:
+            self._flush(self._buffered, keep_from=self._buffered)
+
+        offsets = np.asarray(self._file_offsets, dtype=np.int64)
+        starts = [np.arange(begin, end - self.seq_length, dtype=np.int64)
+                  for begin, end in zip(offsets[:-1], offsets[1:]) if end - begin > self.seq_length]
+        windows = np.concatenate(starts) if starts else np.empty(0, dtype=np.int64)
+        np.save(os.path.join(self.path, WINDOWS_FILE), windows)
+
+        index = {
+            'format': FORMAT_VERSION,
+            'encoding': self.encoding,
+            'seq_length': self.seq_length,
+            'shard_notes': self.shard_notes,
+            'notes': self.total,
+            'files': len(offsets) - 1,
+            'windows': len(windows),
+            'shards': self._shards,
+            'vocabulary': self.vocabulary.to_dict() if self.vocabulary else None,
+        }
+        with open(os.path.join(self.path, INDEX_FILE), 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2)
+        return index
+
+
+def export_dataset(midi_files: Sequence, path: str, encoding: str = 'float', seq_length: int = 100,
+                   shard_notes: int = DEFAULT_SHARD_NOTES, processor=None, verbose: bool = True) -> Dict:
+    """Parse MIDI files one at a time into a sharded dataset. Returns the manifest."""
+    if processor is None:
+        from advanced_neural_network import MIDIDataProcessor
+        processor = MIDIDataProcessor()
+
+    writer = DatasetWriter(path, encoding, seq_length, shard_notes)
+    for i, midi_file in enumerate(midi_files, 1):
+        if encoding == 'tokens':
+            notes = processor.extract_notes_from_midi(str(midi_file), in_beats=True)
+            writer.add(encode_notes(notes, writer.vocabulary))
+        else:
+            writer.add(processor.normalize_notes(processor.extract_notes_from_midi(str(midi_file))))
+        if verbose and i % 100 == 0:
+            print(f"  {i}/{len(midi_files)} files, {writer.total:,} notes")
+    return writer.close()
+
+
+class ShardedDataset:
+    """Random access to the windows of a sharded dataset (memory-mapped unless in_memory)."""
+
+    def __init__(self, path: str, in_memory: bool = False):
+        with open(os.path.join(path, INDEX_FILE), 'r', encoding='utf-8') as f:
+            self.index = json.load(f)
+        if self.index['format'] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported dataset format {self.index['format']} in {path}")
+
+        mmap_mode = None if in_memory else 'r'
+        self.path = path
+        self.encoding = self.index['encoding']
+        self.seq_length = self.index['seq_length']
+        self.shard_notes = self.index['shard_notes']
+        self.vocabulary = Vocabulary.from_dict(self.index['vocabulary']) if self.index['vocabulary'] else None
+        self.shards = [np.load(os.path.join(path, shard['file']), mmap_mode=mmap_mode)
+                       for shard in self.index['shards']]
+        self.windows = np.load(os.path.join(path, WINDOWS_FILE), mmap_mode=mmap_mode)
+        self._span = np.arange(self.seq_length + 1)
+
+    def __len__(self) -> int:
+        return len(self.windows)
+
+    @property
+    def input_shape(self) -> Tuple[int, ...]:
+        return (self.seq_length,) if self.encoding == 'tokens' else (self.seq_length, 3)
+
+    def gather(self, indices) -> Tuple[np.ndarray, np.ndarray]:
+        """Input windows and targets for window indices, in the order given."""
+        indices = np.asarray(indices, dtype=np.int64)
+        starts = np.asarray(self.windows[indices])
+        shard_ids = starts // self.shard_notes
+        local = starts - shard_ids * self.shard_notes
+
+        first = self.shards[0]
+        out = np.empty((len(starts), self.seq_length + 1) + first.shape[1:], dtype=first.dtype)
+        for k in np.unique(shard_ids):
+            mask = shard_ids == k
+            out[mask] = self.shards[k][local[mask][:, None] + self._span]
+        return out[:, :-1], out[:, -1]
+
+    def window(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        X, y = self.gather([i])
+        return X[0], y[0]
+
+    def split(self, validation_split: float = 0.2) -> Tuple[np.ndarray, np.ndarray]:
+        """Training and validation window indices (the last fraction validates)."""
+        train_count = len(self) - int(len(self) * validation_split)
+        return np.arange(train_count), np.arange(train_count, len(self))
+
+    def iter_batches(self, batch_size: int = 32, indices: Optional[np.ndarray] = None,
+                     shuffle: bool = True, seed: int = 0) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """One pass over the windows (all, or the given indices) in batches."""
+        indices = np.arange(len(self)) if indices is None else np.asarray(indices)
+        if shuffle:
+            indices = np.random.default_rng(seed).permutation(indices)
+        for i in range(0, len(indices), batch_size):
+            yield self.gather(indices[i:i + batch_size])
+
+    def tf_dataset(self, indices: np.ndarray, batch_size: int = 32, shuffle: bool = True,
+                   seed: int = 0, repeat: bool = True):
+        """
+        tf.data pipeline reading batches on demand. Float datasets yield (X, y);
+        token datasets yield (tokens, {'pitch', 'velocity', 'duration'}) like event_tokens.
+        """
+        tokens = self.encoding == 'tokens'
+        x_dtype = tf.int32 if tokens else tf.float32
+        x_shape = (None,) + self.input_shape
+        y_shape = (None,) if tokens else (None, 3)
+
+        def read(batch_indices):
+            X, y = self.gather(batch_indices)
+            if tokens:
+                return X.astype(np.int32), y.astype(np.int32)
+            return X, y
+
+        def load(batch_indices):
+            X, y = tf.numpy_function(read, [batch_indices], [x_dtype, x_dtype])
+            X.set_shape(x_shape)
+            y.set_shape(y_shape)
+            if not tokens:
+                return X, y
+            vocabulary = self.vocabulary
+            rest, duration = y // vocabulary.duration_bins, y % vocabulary.duration_bins
+            pitch, velocity = rest // vocabulary.velocity_bins, rest % vocabulary.velocity_bins
+            return X, {'pitch': pitch, 'velocity': velocity, 'duration': duration}
+
+        dataset = tf.data.Dataset.from_tensor_slices(np.asarray(indices, dtype=np.int64))
+        if shuffle:
+            dataset = dataset.shuffle(len(indices), seed=seed)
+        if repeat:
+            dataset = dataset.repeat()
+        return dataset.batch(batch_size).map(load, num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
+
+    def disk_bytes(self) -> int:
+        return sum(os.path.getsize(os.path.join(self.path, name))
+                   for name in os.listdir(self.path))
+
+
+def benchmark_access(dataset: ShardedDataset, batch_size: int = 64, batches: int = 200,
+                     seed: int = 0) -> Dict[str, float]:
+    """Windows/sec for random (shuffled) and sequential batch access."""
+    rng = np.random.default_rng(seed)
+    count = min(batches * batch_size, len(dataset))
+    results = {}
+    for mode in ('random', 'sequential'):
+        indices = rng.integers(0, len(dataset), count) if mode == 'random' else np.arange(count)
+        start = time.perf_counter()
+        for i in range(0, count, batch_size):
+            dataset.gather(indices[i:i + batch_size])
+        elapsed = time.perf_counter() - start
+        results[f'{mode}_windows_per_sec'] = count / elapsed if elapsed > 0 else float('inf')
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded, memory-mapped training datasets")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    export = sub.add_parser('export', help='Export a directory of MIDI files')
+    export.add_argument('-d', '--directory', default='training_data')
+    export.add_argument('-o', '--output', required=True, help='Dataset directory')
+    export.add_argument('--encoding', choices=['float', 'tokens'], default='float')
+    export.add_argument('--seq-length', type=int, default=100)
+    export.add_argument('--shard-notes', type=positive_int, default=DEFAULT_SHARD_NOTES, help='Notes per shard')
+
+    info = sub.add_parser('info', help='Show a dataset manifest')
+    info.add_argument('dataset')
+
+    bench = sub.add_parser('bench', help='Measure window access throughput')
+    bench.add_argument('dataset')
+    bench.add_argument('-b', '--batch-size', type=int, default=64)
+    bench.add_argument('--batches', type=int, default=200)
+    bench.add_argument('--in-memory', action='store_true', help='Load shards into RAM instead of mapping them')
+
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        from advanced_neural_network import MIDIDataProcessor
+        processor = MIDIDataProcessor()
+        files = processor.list_midi_files(args.directory)
+        print(f"Exporting {len(files)} MIDI files to {args.output}...")
+        index = export_dataset(files, args.output, args.encoding, args.seq_length, args.shard_notes, processor)
+        print(f"✓ {index['notes']:,} notes, {index['windows']:,} windows in {len(index['shards'])} shard(s)")
+        return 0
+
+    dataset = ShardedDataset(args.dataset, in_memory=getattr(args, 'in_memory', False))
+    if args.command == 'info':
+        index = dataset.index
+        print(f"Encoding: {index['encoding']}  Sequence length: {index['seq_length']}")
+        print(f"Files: {index['files']:,}  Notes: {index['notes']:,}  Windows: {index['windows']:,}")
+        print(f"Shards: {len(index['shards'])} x {index['shard_notes']:,} notes, "
+              f"{dataset.disk_bytes() / 1e6:.1f} MB on disk")
+        return 0
+
+    results = benchmark_access(dataset, args.batch_size, args.batches)
+    print(f"Batch size {args.batch_size}, {'in memory' if args.in_memory else 'memory-mapped'}:")
+    for name, value in results.items():
+        print(f"  {name:<28} {value:12,.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Tests for augmentation: per-batch draws are reproducible from (seed, step)
+and transforms keep every feature in range.
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from augmentation import (
+    DURATION, NOTE_RANGE, PITCH, VELOCITY, AugmentConfig, augment_batch, augment_dataset, batch_rng
+)
+from lazy_imports import module_available
+
+SPAN = NOTE_RANGE[1] - NOTE_RANGE[0]
+
+
+def batch(size=64, seq_length=16, seed=0):
+    rng = np.random.default_rng(seed)
+    pitches = rng.integers(0, SPAN + 1, (size, seq_length + 1)) / SPAN
+    X = np.stack([pitches[:, :-1], rng.random((size, seq_length)), rng.random((size, seq_length))], axis=2)
+    y = np.stack([pitches[:, -1], rng.random(size), rng.random(size)], axis=1)
+    return X.astype(np.float32), y.astype(np.float32)
+
+
+def test_same_seed_and_step_give_the_same_batch():
+    X, y = batch()
+    config = AugmentConfig(seed=3)
+    first = augment_batch(X, y, batch_rng(3, 10), config)
+    again = augment_batch(X, y, batch_rng(3, 10), config)
+    other = augment_batch(X, y, batch_rng(3, 11), config)
+    np.testing.assert_array_equal(first[0], again[0])
+    np.testing.assert_array_equal(first[1], again[1])
+    assert not np.array_equal(first[0], other[0])
+
+
+def test_inputs_are_not_modified():
+    X, y = batch()
+    X_copy, y_copy = X.copy(), y.copy()
+    augment_batch(X, y, batch_rng(0, 0), AugmentConfig())
+    np.testing.assert_array_equal(X, X_copy)
+    np.testing.assert_array_equal(y, y_copy)
+
+
+def test_transforms_stay_in_range():
+    X, y = batch(size=256)
+    config = AugmentConfig(pitch_shift=6, velocity_scale=0.15, duration_stretch=0.1)
+    X_aug, y_aug = augment_batch(X, y, batch_rng(1, 0), config)
+
+    # Transposition: whole semitones, at most pitch_shift, the same for a sequence and its target
+    shift = np.round((X_aug[:, :, PITCH] - X[:, :, PITCH]) * SPAN)
+    assert np.all(shift == shift[:, :1])
+    assert np.all(np.abs(shift[:, 0]) <= config.pitch_shift)
+    np.testing.assert_allclose((y_aug[:, PITCH] - y[:, PITCH]) * SPAN, shift[:, 0], atol=1e-3)
+    assert X_aug[:, :, PITCH].min() >= -1e-6 and X_aug[:, :, PITCH].max() <= 1 + 1e-6
+
+    for feature, limit in ((VELOCITY, config.velocity_scale), (DURATION, config.duration_stretch)):
+        assert X_aug[:, :, feature].min() >= 0.0 and X_aug[:, :, feature].max() <= 1.0
+        unclipped = (X[:, :, feature] > 0.01) & (X_aug[:, :, feature] < 1.0)
+        ratio = X_aug[:, :, feature][unclipped] / X[:, :, feature][unclipped]
+        assert ratio.min() >= 1 - limit - 1e-5 and ratio.max() <= 1 + limit + 1e-5
+
+
+def test_zero_disables_every_transform():
+    X, y = batch()
+    X_aug, y_aug = augment_batch(X, y, batch_rng(0, 0), AugmentConfig(0, 0.0, 0.0))
+    np.testing.assert_array_equal(X_aug, X)
+    np.testing.assert_array_equal(y_aug, y)
+
+
+@pytest.mark.skipif(not module_available('tensorflow'), reason="needs TensorFlow")
+def test_dataset_augmentation_is_reproducible():
+    import tensorflow as tf
+    X, y = batch(size=32)
+    config = AugmentConfig(seed=5)
+
+    def run():
+        dataset = augment_dataset(tf.data.Dataset.from_tensor_slices((X, y)).batch(8), config)
+        return [X_aug.numpy() for X_aug, _ in dataset]
+
+    first, second = run(), run()
+    for a, b in zip(first, second):
+        np.testing.assert_array_equal(a, b)
+    np.testing.assert_array_equal(first[2], augment_batch(X[16:24], y[16:24], batch_rng(5, 2), config)[0])
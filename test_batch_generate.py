@@ -0,0 +1,96 @@
+"""
+Tests for batch_generate: manifest validation, seed streams, and failure
+isolation when a job kills its worker process.
+"""
+import os
+import sys
+import zipfile
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import batch_generate
+from batch_generate import BatchJob, assign_seeds, check_filenames, parse_manifest, run_batch
+
+
+def fake_render(index, job):
+    """Stands in for _render_job: 'crash' jobs kill their worker, 'fail' jobs raise."""
+    if job['genre'] == 'crash':
+        os._exit(1)
+    if job['genre'] == 'fail':
+        return {'index': index, 'ok': False, 'error': 'ValueError: bad genre', 'elapsed': 0.0}
+    return {'index': index, 'ok': True, 'data': f"{job['genre']}:{job['seed']}".encode(), 'elapsed': 0.0}
+
+
+@pytest.fixture
+def forked_pool(monkeypatch):
+    """Run the batch with fork workers so they see the patched renderer."""
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        pytest.skip("needs the fork start method")
+    monkeypatch.setattr(batch_generate, '_render_job', fake_render)
+    monkeypatch.setattr(batch_generate, 'ProcessPoolExecutor',
+                        functools.partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context('fork')))
+
+
+def test_parse_manifest_skips_comments_and_validates():
+    jobs = parse_manifest(['# jobs', '', '{"genre": "trap", "bars": 8, "seed": 3, "name": "a.mid"}',
+                           '{"genre": "salsa"}'])
+    assert jobs == [BatchJob('trap', 8, 3, 'a.mid'), BatchJob('salsa')]
+
+
+@pytest.mark.parametrize('line', [
+    '{"genre": "trap", "name": "../escape.mid"}',
+    '{"genre": "trap", "name": "sub/dir.mid"}',
+    '{"genre": "trap", "name": "notes.txt"}',
+    '{"genre": "trap", "seed": -1}',
+    '{"genre": "trap", "seed": "7"}',
+    '{"genre": "trap", "seed": 1.5}',
+    '{"genre": "trap", "seed": true}',
+    '{"bars": 8}',
+    'not json',
+])
+def test_parse_manifest_rejects_bad_lines(line):
+    with pytest.raises(ValueError):
+        parse_manifest([line])
+
+
+def test_duplicate_file_names_are_rejected():
+    with pytest.raises(ValueError):
+        parse_manifest(['{"genre": "trap", "name": "a.mid"}', '{"genre": "salsa", "name": "a.mid"}'])
+    with pytest.raises(ValueError):
+        check_filenames([BatchJob('trap', seed=1), BatchJob('trap', seed=1)])
+
+
+def test_assign_seeds_is_reproducible_and_keeps_explicit_seeds():
+    first = assign_seeds([BatchJob('trap'), BatchJob('trap', seed=5), BatchJob('trap')], batch_seed=42)
+    second = assign_seeds([BatchJob('trap'), BatchJob('trap', seed=5), BatchJob('trap')], batch_seed=42)
+    assert [job.seed for job in first] == [job.seed for job in second]
+    assert first[1].seed == 5
+    assert first[0].seed != first[2].seed
+
+
+def test_only_the_jobs_that_kill_their_worker_fail(tmp_path, forked_pool):
+    jobs = [BatchJob('trap', seed=i) for i in range(10)]
+    for i in (2, 7):
+        jobs[i] = BatchJob('crash', seed=i)
+    jobs[5] = BatchJob('fail', seed=5)
+    output = str(tmp_path / 'batch.zip')
+
+    summary = run_batch(jobs, output, workers=3)
+
+    assert summary['succeeded'] == 7
+    assert sorted(f['index'] for f in summary['failures']) == [2, 5, 7]
+    assert all('worker process died' in f['error'] for f in summary['failures'] if f['index'] != 5)
+    with zipfile.ZipFile(output) as archive:
+        assert len(archive.namelist()) == 7
+        assert archive.read('trap_32bars_seed0.mid') == b'trap:0'
+
+
+def test_directory_output(tmp_path, forked_pool):
+    summary = run_batch([BatchJob('trap', seed=1, name='one.mid')], str(tmp_path / 'out'), workers=1)
+    assert summary['failed'] == 0
+    assert (tmp_path / 'out' / 'one.mid').read_bytes() == b'trap:1'
@@ -0,0 +1,64 @@
+"""
+Tests for distributed_training: the launcher's failure handling, and a
+two-worker training run on localhost (needs TensorFlow).
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import distributed_training
+from lazy_imports import module_available
+
+# Stands in for the worker script: worker 1 fails at once, worker 0 would block
+FAILING_WORKER = """
+import json, os, sys, time
+if json.loads(os.environ['TF_CONFIG'])['task']['index'] == 1:
+    sys.exit(3)
+time.sleep(120)
+"""
+
+
+def write_corpus(directory, files=4, notes=64):
+    from midiutil import MIDIFile
+    os.makedirs(directory, exist_ok=True)
+    for i in range(files):
+        midi = MIDIFile(1)
+        midi.addTempo(0, 0, 120)
+        for n in range(notes):
+            midi.addNote(0, 0, 48 + (n * (i + 3)) % 36, n * 0.5, 0.5, 60 + n % 40)
+        with open(os.path.join(directory, f"piece_{i}.mid"), 'wb') as f:
+            midi.writeFile(f)
+
+
+def test_launch_stops_the_other_workers_when_one_fails(tmp_path, monkeypatch):
+    script = tmp_path / 'worker.py'
+    script.write_text(FAILING_WORKER)
+    monkeypatch.setattr(distributed_training, 'SCRIPT', str(script))
+
+    start = time.monotonic()
+    result = distributed_training.launch(str(tmp_path), epochs=1, workers=2, threads=1)
+
+    assert result is None
+    assert time.monotonic() - start < 60
+
+
+@pytest.mark.skipif(not module_available('tensorflow') or not module_available('midiutil'),
+                    reason="needs TensorFlow and midiutil")
+def test_two_local_workers_train_one_model(tmp_path):
+    corpus = tmp_path / 'corpus'
+    write_corpus(str(corpus))
+    output = tmp_path / 'model.h5'
+
+    result = distributed_training.launch(
+        str(corpus), epochs=1, batch_size=8, output=str(output), workers=2, threads=1,
+        mixed_precision='off', seq_length=16, units=16, validation_split=0.2)
+
+    assert result is not None
+    assert result['workers'] == 2
+    assert result['validated']
+    assert result['samples_per_sec'] > 0
+    assert output.exists()
@@ -0,0 +1,68 @@
+"""
+Tests for event_tokens: packing quantized notes into tokens and back.
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from event_tokens import TOKEN_DTYPE, TokenCorpus, Vocabulary, decode_tokens, encode_notes, footprint
+
+
+def test_pack_and_unpack_are_inverse_over_the_whole_vocabulary():
+    vocabulary = Vocabulary()
+    pitch, velocity, duration = np.meshgrid(np.arange(vocabulary.pitch_bins), np.arange(vocabulary.velocity_bins),
+                                            np.arange(vocabulary.duration_bins), indexing='ij')
+    tokens = vocabulary.pack(pitch.ravel(), velocity.ravel(), duration.ravel())
+
+    assert tokens.dtype == TOKEN_DTYPE
+    np.testing.assert_array_equal(np.sort(tokens), np.arange(vocabulary.size))
+    for original, unpacked in zip((pitch, velocity, duration), vocabulary.unpack(tokens)):
+        np.testing.assert_array_equal(unpacked, original.ravel())
+
+
+def test_notes_survive_a_round_trip_on_bin_values():
+    vocabulary = Vocabulary()
+    notes = [{'pitch': 60, 'velocity': 72, 'duration': 0.5},
+             {'pitch': 21, 'velocity': 8, 'duration': 8.0},
+             {'pitch': 108, 'velocity': 120, 'duration': 0.125}]
+    assert decode_tokens(encode_notes(notes, vocabulary), vocabulary) == notes
+
+
+def test_out_of_range_values_are_clipped_to_the_nearest_bin():
+    vocabulary = Vocabulary()
+    tokens = encode_notes([{'pitch': 5, 'velocity': 200, 'duration': 100.0},
+                           {'pitch': 127, 'velocity': 0, 'duration': 0.01}], vocabulary)
+    low, high = decode_tokens(tokens, vocabulary)
+    assert (low['pitch'], low['duration']) == (21, 8.0)
+    assert (high['pitch'], high['duration']) == (108, 0.125)
+    assert low['velocity'] > 100 and high['velocity'] < 16
+
+
+def test_vocabulary_must_fit_the_token_type():
+    with pytest.raises(ValueError):
+        Vocabulary(pitch_range=(0, 127), velocity_bins=128)
+
+
+def test_vocabulary_round_trips_through_its_dict():
+    vocabulary = Vocabulary(pitch_range=(36, 96), velocity_bins=4)
+    assert Vocabulary.from_dict(vocabulary.to_dict()) == vocabulary
+
+
+def test_windows_never_cross_files():
+    corpus = TokenCorpus(np.arange(20, dtype=TOKEN_DTYPE), np.array([0, 8, 11, 20]))
+    starts = corpus.window_starts(4)
+    np.testing.assert_array_equal(starts, [0, 1, 2, 3, 11, 12, 13, 14, 15])
+    X, y = corpus.windows(starts, 4)
+    np.testing.assert_array_equal(X[4], [11, 12, 13, 14])
+    assert y[4] == 15
+
+
+def test_footprint_counts_float32_windows():
+    corpus = TokenCorpus(np.arange(20, dtype=TOKEN_DTYPE), np.array([0, 8, 11, 20]))
+    stats = footprint(corpus, 4)
+    assert stats['windows'] == 9
+    assert stats['float_window_bytes'] == 9 * 5 * 3 * 4
@@ -0,0 +1,68 @@
+"""
+Tests for generation_cache: content addresses of seeded renders (including
+the composer and model versions) and the LRU disk quota.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+pytest.importorskip('genres')
+
+import generation_cache
+from generation_cache import GenerationCache, cache_key, model_version
+
+
+def test_key_is_stable_and_covers_every_parameter():
+    key = cache_key('trap', 32, 7)
+    assert key == cache_key('trap', '32', 7)
+    assert len({key, cache_key('jazz', 32, 7), cache_key('trap', 16, 7), cache_key('trap', 32, 8),
+                cache_key('trap', 32, 7, neural=True)}) == 5
+
+
+def test_model_version_only_matters_for_neural_renders():
+    assert cache_key('trap', 32, 7, False, 'abc') == cache_key('trap', 32, 7, False, 'def')
+    assert cache_key('trap', 32, 7, True, 'abc') != cache_key('trap', 32, 7, True, 'def')
+
+
+def test_composer_version_changes_the_key(monkeypatch):
+    before = cache_key('trap', 32, 7)
+    monkeypatch.setattr(generation_cache, 'COMPOSER_VERSION', generation_cache.COMPOSER_VERSION + 1)
+    assert cache_key('trap', 32, 7) != before
+
+
+def test_model_version_follows_the_file(tmp_path):
+    path = tmp_path / 'model.h5'
+    assert model_version(str(path)) == 'none'
+    path.write_bytes(b'v1')
+    first = model_version(str(path))
+    assert first == model_version(str(path))
+    path.write_bytes(b'version 2')
+    assert model_version(str(path)) != first
+
+
+def test_put_get_and_persistence(tmp_path):
+    cache = GenerationCache(str(tmp_path))
+    key = cache_key('trap', 32, 7)
+    assert cache.get(key) is None
+    cache.put(key, b'MThd')
+    assert cache.get(key) == b'MThd'
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+    reopened = GenerationCache(str(tmp_path))
+    assert reopened.get(key) == b'MThd'
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = GenerationCache(str(tmp_path), max_bytes=25)
+    cache.put('a', b'x' * 10)
+    cache.put('b', b'x' * 10)
+    cache.get('a')                  # 'b' is now the least recently used
+    cache.put('c', b'x' * 10)
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.stats()['bytes'] == 20
+    assert not os.path.exists(cache.path_for('b'))
@@ -0,0 +1,113 @@
+"""
+Tests for model_registry: discovering models, loading them through the
+serving cache, and swapping in a changed model file (with a stub loader).
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+pytest.importorskip('genres')
+
+from model_registry import ModelRegistry, manifest_path, write_manifest
+
+
+class StubComposer:
+    encoding = 'float'
+    seq_length = 50
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.weights = f.read()
+
+
+class StubLoader:
+    def __init__(self):
+        self.loads = []
+        self.fail = False
+
+    def __call__(self, path):
+        if self.fail:
+            raise RuntimeError("corrupt model")
+        self.loads.append(path)
+        return StubComposer(path)
+
+
+def save_model(directory, name, content):
+    path = os.path.join(directory, f"{name}.h5")
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+
+@pytest.fixture
+def loader():
+    return StubLoader()
+
+
+@pytest.fixture
+def registry(tmp_path, loader):
+    return ModelRegistry(str(tmp_path), poll_seconds=60, loader=loader)
+
+
+def test_models_are_listed_and_loaded_once(tmp_path, registry, loader):
+    save_model(tmp_path, 'melody', b'v1')
+    assert [m.name for m in registry.list()] == ['melody']
+    assert not registry.is_loaded('melody')
+
+    served = registry.get('melody')
+    assert served.composer.weights == b'v1'
+    assert served.manifest.seq_length == 50
+    assert registry.get('melody') is served
+    assert len(loader.loads) == 1
+    assert registry.get('missing') is None
+
+
+def test_manifest_training_details_are_kept(tmp_path, registry):
+    path = save_model(tmp_path, 'melody', b'v1')
+    write_manifest(path, 'float', 64, training={'batch_size': 16})
+    served = registry.get('melody')
+    assert served.manifest.seq_length == 64
+    assert served.manifest.training == {'batch_size': 16}
+    assert os.path.exists(manifest_path(path))
+
+
+def test_changed_model_is_swapped_in_once_it_holds_still(tmp_path, registry):
+    save_model(tmp_path, 'melody', b'v1')
+    old = registry.get('melody')
+
+    save_model(tmp_path, 'melody', b'version 2')
+    assert registry.refresh() == []            # Seen changing: wait one poll
+    assert registry.get('melody') is old
+    assert registry.refresh() == ['melody']    # Unchanged since: load and swap
+
+    new = registry.get('melody')
+    assert new is not old
+    assert new.composer.weights == b'version 2'
+    assert new.version != old.version
+    assert old.composer.weights == b'v1'       # In-flight requests keep their model
+    assert registry.stats() == {'available': 1, 'loaded': 1, 'swaps': 1}
+
+
+def test_failed_reload_keeps_serving_the_previous_model(tmp_path, registry, loader):
+    save_model(tmp_path, 'melody', b'v1')
+    old = registry.get('melody')
+
+    loader.fail = True
+    save_model(tmp_path, 'melody', b'version 2')
+    registry.refresh()
+    registry.refresh()
+    assert registry.get('melody') is old
+    assert registry.stats()['swaps'] == 0
+
+
+def test_removed_model_is_dropped(tmp_path, registry):
+    path = save_model(tmp_path, 'melody', b'v1')
+    registry.get('melody')
+    os.remove(path)
+    registry.refresh()
+    assert registry.list() == []
+    assert registry.get('melody') is None
+    assert not registry.is_loaded('melody')
@@ -0,0 +1,107 @@
+"""
+Tests for sharded_dataset: windows read back from shards match the corpus
+they were written from, including windows that cross shard boundaries.
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from event_tokens import TOKEN_DTYPE
+from lazy_imports import module_available
+from sharded_dataset import DatasetWriter, ShardedDataset
+
+SEQ_LENGTH = 4
+SHARD_NOTES = 10
+FILE_LENGTHS = (7, 23, 3, 15)   # The 3-note file is too short for a window
+
+
+def float_files():
+    files, start = [], 0
+    for length in FILE_LENGTHS:
+        values = np.arange(start, start + length, dtype=np.float32) / 100
+        files.append(np.stack([values, values + 1, values + 2], axis=1))
+        start += length
+    return files
+
+
+def expected_windows(files):
+    X, y = [], []
+    for notes in files:
+        for start in range(len(notes) - SEQ_LENGTH):
+            X.append(notes[start:start + SEQ_LENGTH])
+            y.append(notes[start + SEQ_LENGTH])
+    return np.array(X), np.array(y)
+
+
+def write(path, files, encoding='float'):
+    writer = DatasetWriter(str(path), encoding, SEQ_LENGTH, SHARD_NOTES)
+    for notes in files:
+        writer.add(notes)
+    return writer.close()
+
+
+@pytest.mark.parametrize('in_memory', [False, True])
+def test_every_window_matches_the_corpus(tmp_path, in_memory):
+    files = float_files()
+    index = write(tmp_path, files)
+    dataset = ShardedDataset(str(tmp_path), in_memory=in_memory)
+
+    X, y = expected_windows(files)
+    assert index['notes'] == sum(FILE_LENGTHS)
+    assert len(index['shards']) > 3
+    assert len(dataset) == len(X)
+
+    # Shuffled order, so batches mix windows from several shards
+    order = np.random.default_rng(0).permutation(len(dataset))
+    got_X, got_y = dataset.gather(order)
+    np.testing.assert_array_equal(got_X, X[order])
+    np.testing.assert_array_equal(got_y, y[order])
+
+
+def test_windows_straddling_a_shard_boundary(tmp_path):
+    files = float_files()
+    write(tmp_path, files)
+    dataset = ShardedDataset(str(tmp_path))
+    X, y = expected_windows(files)
+
+    straddling = [i for i, start in enumerate(dataset.windows)
+                  if start // SHARD_NOTES != (start + SEQ_LENGTH) // SHARD_NOTES]
+    assert straddling
+    for i in straddling:
+        window, target = dataset.window(i)
+        np.testing.assert_array_equal(window, X[i])
+        np.testing.assert_array_equal(target, y[i])
+
+
+def test_split_holds_out_the_last_windows(tmp_path):
+    write(tmp_path, float_files())
+    dataset = ShardedDataset(str(tmp_path))
+    train, validation = dataset.split(0.25)
+    assert len(train) + len(validation) == len(dataset)
+    assert validation[0] == train[-1] + 1
+
+
+def test_shard_size_must_be_positive(tmp_path):
+    with pytest.raises(ValueError):
+        DatasetWriter(str(tmp_path), shard_notes=0)
+
+
+@pytest.mark.skipif(not module_available('tensorflow'), reason="needs TensorFlow")
+def test_token_tf_dataset_matches_gather(tmp_path):
+    files = [np.arange(start, start + length, dtype=TOKEN_DTYPE) for start, length in ((0, 17), (100, 26))]
+    write(tmp_path, files, encoding='tokens')
+    dataset = ShardedDataset(str(tmp_path))
+    vocabulary = dataset.vocabulary
+
+    indices = np.arange(len(dataset))
+    X, targets = next(iter(dataset.tf_dataset(indices, batch_size=len(indices), shuffle=False, repeat=False)))
+    expected_X, expected_y = dataset.gather(indices)
+    pitch, velocity, duration = vocabulary.unpack(expected_y)
+    np.testing.assert_array_equal(X.numpy(), expected_X)
+    np.testing.assert_array_equal(targets['pitch'].numpy(), pitch)
+    np.testing.assert_array_equal(targets['velocity'].numpy(), velocity)
+    np.testing.assert_array_equal(targets['duration'].numpy(), duration)
@@ -0,0 +1,85 @@
+"""
+Tests for training_telemetry's summarizer: reading runs from a telemetry
+file and classifying them as input-, host- or compute-bound.
+"""
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from training_telemetry import diagnose, main, percentiles, read_runs
+
+
+def epoch(number, p50=10.0, train_ms=1000.0, wait_ms=50.0):
+    return {'type': 'epoch', 'epoch': number, 'seconds': 1.2, 'loss': 1.0 / number, 'val_loss': None,
+            'lr': 0.001, 'samples_per_sec': 1000.0, 'steps': 100,
+            'step_ms': {'p50': p50, 'p90': p50 * 1.5, 'p99': p50 * 2}, 'train_ms': train_ms,
+            'wait_ms': wait_ms, 'rss_bytes': 100_000_000}
+
+
+def run(*records, probe=None):
+    start = [{'type': 'start', 'time': '2026-01-01T00:00:00', 'samples': 3200, 'batch_size': 32}]
+    if probe is not None:
+        start.append({'type': 'input_probe', 'batches': 20, 'ms_per_batch': probe})
+    return start + list(records)
+
+
+def write(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+
+def test_first_epoch_is_ignored_for_the_verdict():
+    # A slow, wait-heavy first epoch (tracing) must not make the run look host-bound
+    result = diagnose(run(epoch(1, p50=500.0, wait_ms=5000.0), epoch(2), epoch(3)))
+    assert result['verdict'] == 'compute-bound'
+    assert result['step_ms_p50'] == 10.0
+
+
+def test_slow_input_pipeline_is_input_bound():
+    assert diagnose(run(epoch(1), epoch(2), probe=25.0))['verdict'] == 'input-bound'
+
+
+def test_time_between_steps_is_host_bound():
+    result = diagnose(run(epoch(1), epoch(2, train_ms=600.0, wait_ms=400.0), probe=1.0))
+    assert result['verdict'] == 'host-bound'
+    assert result['wait_fraction'] == pytest.approx(0.4)
+
+
+def test_run_without_epochs_is_unknown():
+    assert diagnose(run())['verdict'] == 'unknown'
+
+
+def test_runs_are_split_at_start_records_and_bad_lines_skipped(tmp_path, capsys):
+    path = tmp_path / 'model.telemetry.jsonl'
+    write(path, run(epoch(1)) + run(epoch(1), epoch(2)))
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"type": "epoch", "epoch": 3, "lo')   # Cut short by a killed run
+
+    runs = read_runs(str(path))
+    assert [len(r) for r in runs] == [2, 3]
+    assert 'line 6' in capsys.readouterr().err
+
+
+def test_summarize_reports_an_out_of_range_run(tmp_path, monkeypatch, capsys):
+    path = tmp_path / 'model.telemetry.jsonl'
+    write(path, run(epoch(1), epoch(2)))
+
+    monkeypatch.setattr(sys, 'argv', ['training_telemetry.py', 'summarize', str(path), '--run', '5'])
+    assert main() == 1
+    assert 'No run 5' in capsys.readouterr().out
+
+    monkeypatch.setattr(sys, 'argv', ['training_telemetry.py', 'summarize', str(path), '--json'])
+    assert main() == 0
+    assert json.loads(capsys.readouterr().out)['verdict'] == 'compute-bound'
+
+
+def test_percentiles():
+    assert percentiles([]) == {}
+    stats = percentiles(list(range(1, 101)))
+    assert stats['p50'] == pytest.approx(50.5)
+    assert stats['p90'] < stats['p99'] <= 100
@@ -6,17 +6,158 @@ Train the neural composer on MIDI files from a directory
 import os
 import sys
 import argparse
+from dataclasses import replace
 from pathlib import Path
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from instrumentation import profiled
+
 try:
-    from advanced_neural_network import train_neural_composer, AdvancedNeuralComposer
+    from advanced_neural_network import train_neural_composer, train_from_dataset, AdvancedNeuralComposer, MIDIDataProcessor
+    from training_perf import cpu_profile
+    from augmentation import AugmentConfig
+    from training_checkpoints import checkpoint_dir_for, read_state
+    from sharded_dataset import DEFAULT_SHARD_NOTES, INDEX_FILE, positive_int
+    from model_registry import model_path_for, write_manifest
+    from training_config import TrainingConfig
+    from training_telemetry import DEFAULT_EVERY, TelemetryConfig, telemetry_path_for
 except ImportError:
     print("Error: advanced_neural_network module not found")
     sys.exit(1)
 
 
+def augment_config(args):
+    """AugmentConfig from the command line, or None without --augment"""
+    if not args.augment:
+        return None
+    return AugmentConfig(
+        pitch_shift=args.pitch_shift,
+        velocity_scale=args.velocity_scale,
+        duration_stretch=args.duration_stretch,
+        seed=args.seed
+    )
+
+
+def training_config(args) -> TrainingConfig:
+    """TrainingConfig from the command line"""
+    return TrainingConfig(
+        batch_size=args.batch_size,
+        validation_split=args.validation_split,
+        seq_length=args.seq_length,
+        units=args.units,
+        seed=args.seed,
+        auto_batch=args.auto_batch,
+        ram_budget_mb=args.ram_budget
+    )
+
+
+def telemetry_config(args):
+    """TelemetryConfig from the command line, or None with --no-telemetry"""
+    if args.no_telemetry:
+        return None
+    return TelemetryConfig(telemetry_path_for(args.model), every=args.telemetry_every, append=args.resume)
+
+
+def run_distributed(args) -> int:
+    """Train with worker processes on this host; returns the exit code"""
+    from advanced_neural_network import TF_AVAILABLE
+    from distributed_training import launch, parse_indices
+    
+    if not TF_AVAILABLE:
+        print("❌ Error: TensorFlow not available")
+        return 1
+    
+    if args.resume or args.init_from:
+        print("❌ Error: --resume and --init-from are not supported with distributed training")
+        return 1
+    
+    if args.encoding != 'float':
+        print("❌ Error: distributed training supports only the float encoding")
+        return 1
+    
+    if args.auto_batch:
+        print("❌ Error: --auto-batch is not supported with distributed training (set -b per worker)")
+        return 1
+    
+    cluster = args.cluster.split(',') if args.cluster else None
+    if cluster and args.worker_index is None:
+        print("❌ Error: --cluster needs --worker-index (the workers to run on this host)")
+        return 1
+    indices = parse_indices(args.worker_index) if args.worker_index else None
+    model_path = model_path_for(args.model)
+    config = training_config(args)
+    
+    try:
+        result = launch(
+            args.directory, args.epochs, args.batch_size, args.model, output=model_path,
+            cluster=cluster, indices=indices, workers=args.workers or 2, threads=args.threads,
+            perf=args.perf, no_jit=args.no_jit, mixed_precision=args.mixed_precision, augment=augment_config(args),
+            seq_length=config.seq_length, units=config.units, seed=config.seed,
+            validation_split=config.validation_split
+        )
+    except KeyboardInterrupt:
+        print("\n\n⚠ Training interrupted by user")
+        return 1
+    
+    if result is None:
+        return 1
+    
+    print("\n" + "="*60)
+    print("✓ Distributed Training Complete!")
+    print("="*60)
+    print(f"Workers on this host: {result['workers']}")
+    print(f"Throughput: {result['samples_per_sec']:,.0f} samples/sec ({result['epoch_seconds']:.2f}s per epoch)")
+    if (indices is None or 0 in indices) and os.path.exists(model_path):
+        # Shards too small to hold out validation data train on everything
+        if not result['validated']:
+            config = replace(config, validation_split=0.0)
+        write_manifest(model_path, 'float', config.seq_length, corpus=args.directory, training=config.to_dict())
+        print(f"Model saved to: {model_path}")
+    print("="*60 + "\n")
+    return 0
+
+
+def run_dataset(args) -> int:
+    """Train from a sharded dataset (--dataset); returns the exit code"""
+    if not os.path.exists(os.path.join(args.dataset, INDEX_FILE)):
+        print(f"\n❌ Error: '{args.dataset}' is not a sharded dataset (no {INDEX_FILE})")
+        print(f"Create one with: python train_neural.py -d {args.directory} --export-dataset {args.dataset}")
+        return 1
+    
+    if args.init_from or args.augment or args.workers or args.cluster:
+        print("❌ Error: --init-from, --augment and distributed training are not supported with --dataset")
+        return 1
+    
+    perf = None
+    if args.perf:
+        perf = cpu_profile(args.threads, jit_compile=not args.no_jit, mixed_precision=args.mixed_precision)
+    
+    checkpoint_dir = checkpoint_dir_for(args.model)
+    try:
+        composer = train_from_dataset(args.dataset, epochs=args.epochs, perf=perf, model_name=args.model,
+                                      checkpoint_every=args.checkpoint_every, resume=args.resume,
+                                      in_memory=args.in_memory, telemetry=telemetry_config(args),
+                                      config=training_config(args))
+    except KeyboardInterrupt:
+        print("\n\n⚠ Training interrupted by user")
+        saved = read_state(checkpoint_dir)
+        if saved:
+            print(f"Last checkpoint: epoch {saved['epoch']} in {checkpoint_dir}")
+            print(f"Continue with: python train_neural.py --dataset {args.dataset} -m {args.model} -e {args.epochs} --resume")
+        return 1
+    
+    if not composer:
+        print("\n❌ Training failed")
+        return 1
+    
+    print(f"\n✓ Training complete, model saved to: {model_path_for(args.model)}")
+    if not args.no_telemetry:
+        print(f"Telemetry: python training_telemetry.py summarize {telemetry_path_for(args.model)}")
+    print()
+    return 0
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Train neural composer on MIDI files',
@@ -26,6 +167,14 @@ Examples:
   python train_neural.py                          # Train on training_data/ with 50 epochs
   python train_neural.py -d my_midi_files -e 100 # Train on my_midi_files/ with 100 epochs
   python train_neural.py -d jazz_files -m jazz_model -e 200  # Train jazz-specific model
+  python train_neural.py --perf --threads 8      # CPU profile: tuned threads, XLA, bf16 if supported
+  python train_neural.py -m jazz_model --resume  # Continue an interrupted run from its last checkpoint
+  python train_neural.py -d jazz_files -m jazz_model --init-from models/composer_model.h5 -e 20  # Fine-tune
+  python train_neural.py --workers 4             # Data-parallel training with 4 local processes
+  python train_neural.py --augment --pitch-shift 5 --seed 1  # Random transposition per batch
+  python train_neural.py --auto-batch --ram-budget 4096  # Probe batch sizes, train with the fastest
+  python train_neural.py -d big_corpus --export-dataset datasets/big  # Sharded, memory-mapped dataset
+  python train_neural.py --dataset datasets/big -e 20  # Train from it without loading the corpus
         """
     )
     
@@ -62,14 +211,194 @@ Examples:
         help='Validation split ratio (default: 0.2)'
     )
     
+    parser.add_argument(
+        '--perf',
+        action='store_true',
+        help='CPU performance profile: tuned thread pools, XLA JIT, bfloat16 where supported'
+    )
+    
+    parser.add_argument(
+        '--threads',
+        type=int,
+        help='Intra-op threads for --perf (default: available CPUs)'
+    )
+    
+    parser.add_argument(
+        '--no-jit',
+        action='store_true',
+        help='Disable XLA compilation in --perf'
+    )
+    
+    parser.add_argument(
+        '--mixed-precision',
+        choices=['auto', 'on', 'off'],
+        default='auto',
+        help='bfloat16 mixed precision for --perf (default: auto, on if the CPU has bf16 instructions)'
+    )
+    
+    parser.add_argument(
+        '--checkpoint-every',
+        type=int,
+        default=1,
+        help='Save weights and optimizer state every N epochs to checkpoints/<model> (0 disables, default: 1)'
+    )
+    
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Continue from the last checkpoint of this model'
+    )
+    
+    parser.add_argument(
+        '--init-from',
+        metavar='MODEL',
+        help='Fine-tune an existing model (e.g. models/composer_model.h5) on this corpus'
+    )
+    
+    parser.add_argument(
+        '--encoding',
+        choices=['float', 'tokens'],
+        default='float',
+        help='Note encoding: float regression (default) or compact event tokens with categorical outputs'
+    )
+    
+    parser.add_argument(
+        '--augment',
+        action='store_true',
+        help='Augment training batches on the fly: random transposition, velocity and duration scaling'
+    )
+    
+    parser.add_argument(
+        '--pitch-shift',
+        type=int,
+        default=6,
+        help='Max transposition in semitones for --augment (default: 6)'
+    )
+    
+    parser.add_argument(
+        '--velocity-scale',
+        type=float,
+        default=0.15,
+        help='Velocity scaling range for --augment, as a fraction (default: 0.15)'
+    )
+    
+    parser.add_argument(
+        '--duration-stretch',
+        type=float,
+        default=0.1,
+        help='Duration stretch range for --augment, as a fraction (default: 0.1)'
+    )
+    
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Seed for weight initialization, shuffling and augmentation (default: 0)'
+    )
+    
+    parser.add_argument(
+        '--seq-length',
+        type=int,
+        default=100,
+        help='Notes per input window (default: 100)'
+    )
+    
+    parser.add_argument(
+        '--units',
+        type=int,
+        default=256,
+        help='Model width: units of the first LSTM layer, later layers use half (default: 256)'
+    )
+    
+    parser.add_argument(
+        '--auto-batch',
+        action='store_true',
+        help='Probe batch sizes for a few steps each and train with the one with the best samples/sec'
+    )
+    
+    parser.add_argument(
+        '--ram-budget',
+        type=int,
+        metavar='MB',
+        help='Memory limit for --auto-batch probes (default: 75%% of available memory)'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='Data-parallel training with N local worker processes (MultiWorkerMirroredStrategy)'
+    )
+    
+    parser.add_argument(
+        '--cluster',
+        help='Multi-host training: comma-separated host:port of every worker, same list on every host'
+    )
+    
+    parser.add_argument(
+        '--worker-index',
+        help='With --cluster: comma-separated indices of the workers to run on this host'
+    )
+    
+    parser.add_argument(
+        '--export-dataset',
+        metavar='DIR',
+        help='Write the MIDI directory as a sharded, memory-mapped dataset in DIR and exit (uses --encoding)'
+    )
+    
+    parser.add_argument(
+        '--shard-notes',
+        type=positive_int,
+        default=DEFAULT_SHARD_NOTES,
+        help=f'Notes per shard for --export-dataset (default: {DEFAULT_SHARD_NOTES})'
+    )
+    
+    parser.add_argument(
+        '--dataset',
+        metavar='DIR',
+        help='Train from a dataset written by --export-dataset, streaming shuffled windows from disk'
+    )
+    
+    parser.add_argument(
+        '--in-memory',
+        action='store_true',
+        help='With --dataset: load the shards into RAM instead of memory-mapping them'
+    )
+    
+    parser.add_argument(
+        '--telemetry-every',
+        type=int,
+        default=DEFAULT_EVERY,
+        help=f'Record telemetry every N batches besides every epoch, 0 for epochs only (default: {DEFAULT_EVERY})'
+    )
+    
+    parser.add_argument(
+        '--no-telemetry',
+        action='store_true',
+        help='Do not write models/<model>.telemetry.jsonl'
+    )
+    
     parser.add_argument(
         '--list-models',
         action='store_true',
         help='List available trained models'
     )
     
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const='train.prof',
+        metavar='FILE',
+        help='Profile the run with cProfile and write pstats output (default: train.prof)'
+    )
+    
     args = parser.parse_args()
     
+    with profiled(args.profile):
+        run_cli(args)
+
+
+def run_cli(args):
+    """Run the parsed command line"""
     # List models
     if args.list_models:
         print("\n" + "="*60)
@@ -92,6 +421,9 @@ Examples:
         print("="*60 + "\n")
         return
     
+    if args.dataset:
+        sys.exit(run_dataset(args))
+    
     # Validate directory
     if not os.path.exists(args.directory):
         print(f"\n❌ Error: Directory '{args.directory}' not found")
@@ -106,30 +438,65 @@ Examples:
         print(f"Please add .mid or .midi files to the directory")
         sys.exit(1)
     
+    if args.export_dataset:
+        index = MIDIDataProcessor(max_sequence_length=args.seq_length).export_dataset(args.directory, args.export_dataset, args.encoding, args.shard_notes)
+        print(f"\n✓ Dataset written to {args.export_dataset}: {index['notes']:,} notes, "
+              f"{index['windows']:,} windows in {len(index['shards'])} shard(s)")
+        print(f"Train with: python train_neural.py --dataset {args.export_dataset} -m {args.model}\n")
+        return
+    
+    if args.init_from and not os.path.exists(args.init_from):
+        print(f"\n❌ Error: Model '{args.init_from}' not found")
+        sys.exit(1)
+    
+    checkpoint_dir = checkpoint_dir_for(args.model)
+    state = read_state(checkpoint_dir) if args.resume else None
+    
     print("\n" + "="*60)
     print("Neural Composer Training")
     print("="*60)
     print(f"Directory: {args.directory}")
     print(f"MIDI Files: {len(midi_files)}")
     print(f"Epochs: {args.epochs}")
-    print(f"Batch Size: {args.batch_size}")
+    print(f"Batch Size: {'auto' if args.auto_batch else args.batch_size}")
     print(f"Validation Split: {args.validation_split}")
+    print(f"Sequence Length: {args.seq_length}  Units: {args.units}  Seed: {args.seed}")
     print(f"Model Name: {args.model}")
+    print(f"Encoding: {args.encoding}")
+    print(f"Performance Profile: {'cpu' if args.perf else 'default'}")
+    print(f"Augmentation: {'on (seed ' + str(args.seed) + ')' if args.augment else 'off'}")
+    if args.init_from:
+        print(f"Fine-tuning: {args.init_from}")
+    if state:
+        print(f"Resuming: epoch {state['epoch']} ({checkpoint_dir})")
     print("="*60 + "\n")
     
+    if args.workers or args.cluster:
+        sys.exit(run_distributed(args))
+    
+    perf = None
+    if args.perf:
+        perf = cpu_profile(args.threads, jit_compile=not args.no_jit, mixed_precision=args.mixed_precision)
+    
     # Train
     try:
         print("Starting training...\n")
         composer = train_neural_composer(
             args.directory,
-            epochs=args.epochs
+            epochs=args.epochs,
+            perf=perf,
+            model_name=args.model,
+            checkpoint_every=args.checkpoint_every,
+            resume=args.resume,
+            init_from=args.init_from,
+            augment=augment_config(args),
+            encoding=args.encoding,
+            telemetry=telemetry_config(args),
+            config=training_config(args)
         )
         
         if composer:
-            # Save model
-            os.makedirs('models', exist_ok=True)
-            model_path = f'models/{args.model}.h5'
-            composer.save_model(model_path)
+            model_path = model_path_for(args.model)
             
             print("\n" + "="*60)
             print("✓ Training Complete!")
@@ -138,6 +505,8 @@ Examples:
             print(f"\nYou can now use this model to generate music:")
             print(f"  - Via web interface: Check 'Usar Red Neuronal' checkbox")
             print(f"  - Via Python: neural_model.load_model('{model_path}')")
+            if not args.no_telemetry:
+                print(f"Training telemetry: python training_telemetry.py summarize {telemetry_path_for(args.model)}")
             print("="*60 + "\n")
         else:
             print("\n❌ Training failed")
@@ -145,6 +514,10 @@ Examples:
     
     except KeyboardInterrupt:
         print("\n\n⚠ Training interrupted by user")
+        saved = read_state(checkpoint_dir)
+        if saved:
+            print(f"Last checkpoint: epoch {saved['epoch']} in {checkpoint_dir}")
+            print(f"Continue with: python train_neural.py -d {args.directory} -m {args.model} -e {args.epochs} --resume")
         sys.exit(1)
     except Exception as e:
         print(f"\n❌ Error during training: {e}")
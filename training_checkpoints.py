@@ -0,0 +1,99 @@
+"""
+Training Checkpoints
+Periodic checkpoints of model weights, optimizer state and the epoch counter,
+so interrupted trainings can resume where they stopped, plus warm-starting
+from a saved model to fine-tune it on a new corpus.
+
+Layout: checkpoints/<model_name>/ holds the TensorFlow checkpoint files and
+training_state.json (last epoch, input shape, target epochs).
+"""
+import os
+import json
+from typing import Dict, Optional, Tuple
+
+from lazy_imports import LazyModule
+
+tf = LazyModule('tensorflow')
+
+CHECKPOINT_ROOT = 'checkpoints'
+STATE_FILE = 'training_state.json'
+MAX_TO_KEEP = 3
+FINE_TUNE_LEARNING_RATE = 1e-4  # Lower than from-scratch training so warm-started weights are refined, not overwritten
+
+
+def checkpoint_dir_for(model_name: str) -> str:
+    return os.path.join(CHECKPOINT_ROOT, model_name)
+
+
+def read_state(directory: str) -> Optional[Dict]:
+    """Saved training state, or None if the directory has no checkpoint. Does not import TensorFlow."""
+    try:
+        with open(os.path.join(directory, STATE_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class TrainingCheckpoint:
+    """Saves and restores a compiled Keras model together with its optimizer state."""
+
+    def __init__(self, model, directory: str, max_to_keep: int = MAX_TO_KEEP):
+        self.directory = directory
+        self.model = model
+        self.epoch = tf.Variable(0, dtype=tf.int64, trainable=False)
+        self.checkpoint = tf.train.Checkpoint(model=model, optimizer=model.optimizer, epoch=self.epoch)
+        self.manager = tf.train.CheckpointManager(self.checkpoint, directory, max_to_keep=max_to_keep)
+
+    def restore(self) -> int:
+        """Restore the latest checkpoint, if any. Returns the number of completed epochs."""
+        if not self.manager.latest_checkpoint:
+            return 0
+        # Optimizer slot variables are created lazily on the first step; expect_partial()
+        # lets them be restored then instead of failing now
+        self.checkpoint.restore(self.manager.latest_checkpoint).expect_partial()
+        return int(self.epoch.numpy())
+
+    def save(self, epoch: int, input_shape: Tuple[int, ...], target_epochs: int):
+        self.epoch.assign(epoch)
+        path = self.manager.save(checkpoint_number=epoch)
+        state = {
+            'epoch': epoch,
+            'target_epochs': target_epochs,
+            'input_shape': list(input_shape),
+            'checkpoint': os.path.basename(path),
+        }
+        tmp_path = os.path.join(self.directory, STATE_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.directory, STATE_FILE))
+
+    def callback(self, every: int, input_shape: Tuple[int, ...], target_epochs: int):
+        """Keras callback saving every `every` epochs and after the final one."""
+        checkpoint = self
+
+        class CheckpointCallback(tf.keras.callbacks.Callback):
+            def on_epoch_end(self, epoch, logs=None):
+                completed = epoch + 1
+                if completed % every == 0 or completed == target_epochs:
+                    checkpoint.save(completed, input_shape, target_epochs)
+
+        return CheckpointCallback()
+
+
+def load_for_fine_tuning(path: str, input_shape: Tuple[int, ...],
+                         learning_rate: float = FINE_TUNE_LEARNING_RATE, jit_compile: bool = False):
+    """
+    Load a saved model and recompile it with a fresh optimizer at a fine-tuning
+    learning rate. Raises ValueError if its input shape does not match the corpus.
+    """
+    model = tf.keras.models.load_model(path, compile=False)
+    expected = tuple(model.input_shape[1:])
+    if expected != tuple(input_shape):
+        raise ValueError(f"{path} expects sequences of shape {expected}, corpus has {tuple(input_shape)}")
+    model.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate=learning_rate),
+        loss='mse',
+        metrics=['mae'],
+        jit_compile=jit_compile
+    )
+    return model
@@ -0,0 +1,27 @@
+"""
+Training Configuration
+Settings for one training run, passed from train_neural.py through the
+train_* functions to the model and recorded in the model's manifest.
+"""
+from dataclasses import dataclass, asdict, fields
+from typing import Dict, Optional
+
+
+@dataclass
+class TrainingConfig:
+    """Everything that shapes a run besides the corpus and the epoch count."""
+    batch_size: int = 32
+    validation_split: float = 0.2
+    seq_length: int = 100                # Notes per input window
+    units: int = 256                     # Model width: first LSTM layer; later layers use units / 2
+    seed: int = 0                        # Weights, shuffling and augmentation
+    auto_batch: bool = False             # Probe batch sizes first and train with the fastest
+    ram_budget_mb: Optional[int] = None  # Limit for auto_batch (default: a share of available memory)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'TrainingConfig':
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
@@ -0,0 +1,225 @@
+"""
+Training Performance Profiles
+CPU settings for TensorFlow training: thread pool sizes, XLA JIT compilation
+and bfloat16 mixed precision (only on CPUs with native bf16 instructions).
+Also provides a Keras callback that reports training throughput per epoch,
+for comparing settings, and a batch size tuner that probes a few steps at
+each candidate size.
+
+Thread pools and the precision policy are process-wide and must be applied
+before the first TensorFlow op runs, i.e. before building the model.
+"""
+import os
+import sys
+import time
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from lazy_imports import LazyModule
+
+tf = LazyModule('tensorflow')
+
+# CPU flags that indicate native bfloat16 arithmetic (AVX512-BF16, AMX)
+BF16_CPU_FLAGS = ('avx512_bf16', 'amx_bf16')
+
+
+@dataclass
+class PerfProfile:
+    """Process-wide training settings. 0 threads = TensorFlow's default."""
+    intra_op_threads: int = 0
+    inter_op_threads: int = 0
+    jit_compile: bool = False
+    mixed_precision: str = 'off'  # 'off', 'on' or 'auto' (on if the CPU supports bf16)
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (respects affinity masks and container cpusets)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def cpu_profile(threads: Optional[int] = None, jit_compile: bool = True,
+                mixed_precision: str = 'auto') -> PerfProfile:
+    """
+    Profile for CPU-only training: one intra-op thread per available CPU and a
+    small inter-op pool (the LSTM graph has little op-level parallelism).
+    """
+    threads = threads or available_cpus()
+    return PerfProfile(
+        intra_op_threads=threads,
+        inter_op_threads=min(2, threads),
+        jit_compile=jit_compile,
+        mixed_precision=mixed_precision,
+    )
+
+
+def cpu_supports_bf16() -> bool:
+    """True if the CPU advertises native bfloat16 instructions (Linux only; False elsewhere)."""
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        with open('/proc/cpuinfo', 'r') as f:
+            for line in f:
+                if line.startswith('flags'):
+                    flags = set(line.split(':', 1)[1].split())
+                    return any(flag in flags for flag in BF16_CPU_FLAGS)
+    except OSError:
+        pass
+    return False
+
+
+def apply_profile(profile: PerfProfile) -> Dict:
+    """
+    Configure TensorFlow for the profile. Returns the settings actually applied.
+    Must run before any model is built.
+    """
+    applied = asdict(profile)
+
+    if profile.intra_op_threads:
+        tf.config.threading.set_intra_op_parallelism_threads(profile.intra_op_threads)
+    if profile.inter_op_threads:
+        tf.config.threading.set_inter_op_parallelism_threads(profile.inter_op_threads)
+
+    use_bf16 = profile.mixed_precision == 'on' or (profile.mixed_precision == 'auto' and cpu_supports_bf16())
+    if use_bf16:
+        tf.keras.mixed_precision.set_global_policy('mixed_bfloat16')
+    applied['mixed_precision'] = 'bfloat16' if use_bf16 else 'off'
+
+    return applied
+
+
+def print_profile(applied: Dict):
+    print("Performance profile:")
+    print(f"  Intra-op threads: {applied['intra_op_threads'] or 'default'}")
+    print(f"  Inter-op threads: {applied['inter_op_threads'] or 'default'}")
+    print(f"  XLA JIT: {'on' if applied['jit_compile'] else 'off'}")
+    print(f"  Mixed precision: {applied['mixed_precision']}")
+
+
+def throughput_callback(samples: int):
+    """
+    Keras callback printing samples/sec for each epoch; history kept in .epochs.
+    Times the training steps only, from the first batch to the end of the last,
+    so end-of-epoch validation does not count against throughput.
+    """
+
+    class ThroughputCallback(tf.keras.callbacks.Callback):
+        def __init__(self):
+            super().__init__()
+            self.epochs = []
+
+        def on_epoch_begin(self, epoch, logs=None):
+            self._start = self._end = None
+
+        def on_train_batch_begin(self, batch, logs=None):
+            if self._start is None:
+                self._start = time.perf_counter()
+
+        def on_train_batch_end(self, batch, logs=None):
+            self._end = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            elapsed = self._end - self._start if self._start is not None and self._end is not None else 0.0
+            rate = samples / elapsed if elapsed > 0 else 0.0
+            self.epochs.append({'epoch': epoch + 1, 'seconds': elapsed, 'samples_per_sec': rate})
+            print(f"  Epoch {epoch + 1}: {elapsed:.2f}s, {rate:,.0f} samples/sec")
+
+    return ThroughputCallback()
+
+
+# ---------------------------------------------------------------------------
+# Batch size tuning
+# ---------------------------------------------------------------------------
+
+BATCH_CANDIDATES = (16, 32, 64, 128, 256, 512)
+PROBE_WARMUP_STEPS = 2   # Tracing / XLA compilation, not timed
+PROBE_STEPS = 10
+RAM_BUDGET_SHARE = 0.75  # Default budget: this share of the memory available when tuning starts
+
+
+def available_memory() -> Optional[int]:
+    """Bytes of MemAvailable (Linux), or None if unknown."""
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def tune_batch_size(build_model: Callable[[], object], dataset_for: Callable[[int], object],
+                    candidates: Sequence[int] = BATCH_CANDIDATES, ram_budget: Optional[int] = None,
+                    steps: int = PROBE_STEPS) -> Tuple[Optional[int], List[Dict]]:
+    """
+    Train a fresh model for a few steps at each candidate batch size and pick the
+    one with the most samples/sec that fits ram_budget bytes of process memory.
+    Candidates are tried in increasing order; tuning stops at the first one over budget.
+
+    A probe is charged the RSS growth it caused on top of the memory in use before
+    tuning began. Memory freed by clear_session() is not returned to the OS, so
+    the process RSS after earlier probes would overcharge later ones. A probe that
+    reuses memory retained from the previous one grows RSS by less than it uses,
+    so a charge never drops below the previous probe's; it can still be an
+    underestimate.
+
+    The budget only catches probes that finish: on CPU, a probe that exhausts
+    physical memory is usually killed by the OS rather than raising
+    ResourceExhaustedError. Keep the budget below the memory actually available.
+
+    Args:
+        build_model: Returns a newly built, compiled model
+        dataset_for: Returns a repeating tf.data pipeline batched at the given size
+
+    Returns: (best batch size or None if none fit, one result dict per probe)
+    """
+    from training_telemetry import current_rss
+
+    baseline = current_rss()
+    if ram_budget is None:
+        available = available_memory()
+        ram_budget = int(baseline + available * RAM_BUDGET_SHARE) if available else None
+
+    results = []
+    charged = 0
+    for batch_size in sorted(candidates):
+        tf.keras.backend.clear_session()
+        before = current_rss()
+        model = build_model()
+        data = dataset_for(batch_size)
+        try:
+            model.fit(data, epochs=1, steps_per_epoch=PROBE_WARMUP_STEPS, verbose=0)
+            start = time.perf_counter()
+            model.fit(data, epochs=1, steps_per_epoch=steps, verbose=0)
+            elapsed = time.perf_counter() - start
+        except tf.errors.ResourceExhaustedError:
+            results.append({'batch_size': batch_size, 'samples_per_sec': 0.0, 'rss_bytes': None,
+                            'rss_delta_bytes': None, 'fits': False})
+            break
+        # A probe can reuse memory retained from the previous one, so its own growth may
+        # understate it; a larger batch never needs less than a smaller one
+        charged = max(charged, current_rss() - before)
+        delta = charged
+        rss = baseline + delta  # What this probe would need on its own
+        fits = ram_budget is None or rss <= ram_budget
+        results.append({'batch_size': batch_size, 'samples_per_sec': steps * batch_size / elapsed if elapsed > 0 else 0.0,
+                        'rss_bytes': rss, 'rss_delta_bytes': delta, 'fits': fits})
+        if not fits:
+            break
+
+    tf.keras.backend.clear_session()
+    fitting = [r for r in results if r['fits']]
+    best = max(fitting, key=lambda r: r['samples_per_sec'])['batch_size'] if fitting else None
+    return best, results
+
+
+def print_batch_probes(results: List[Dict], best: Optional[int], ram_budget_mb: Optional[int] = None):
+    budget = f" (RAM budget {ram_budget_mb} MB)" if ram_budget_mb else ""
+    print(f"Batch size probes{budget}:")
+    for r in results:
+        rss = (f"{r['rss_bytes'] / 1e6:,.0f} MB (+{r['rss_delta_bytes'] / 1e6:,.0f} MB)"
+               if r['rss_bytes'] else 'out of memory')
+        mark = '  <- best' if r['batch_size'] == best else ('  over budget' if not r['fits'] else '')
+        print(f"  {r['batch_size']:>5}: {r['samples_per_sec']:>10,.0f} samples/sec, RSS {rss}{mark}")
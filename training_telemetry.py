@@ -0,0 +1,315 @@
+"""
+Training Telemetry
+Keras callback that appends training measurements to a JSONL file next to the
+model (models/<model>.telemetry.jsonl): every N batches and at the end of each
+epoch it records loss, val_loss, learning rate, samples/sec, step time
+percentiles, RSS and the time spent between steps. Before training, the input
+pipeline is timed on its own, so a run can be classified as input-bound (the
+pipeline cannot produce batches as fast as the model consumes them),
+host-bound (time lost between steps) or compute-bound.
+
+Usage:
+    python training_telemetry.py summarize models/composer_model.telemetry.jsonl
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from lazy_imports import LazyModule
+
+tf = LazyModule('tensorflow')
+
+DEFAULT_EVERY = 50
+PROBE_BATCHES = 20
+INPUT_BOUND_RATIO = 0.8     # Input pipeline alone takes this fraction of a step or more
+HOST_BOUND_FRACTION = 0.2   # This fraction of wall time or more spent between steps
+
+
+@dataclass
+class TelemetryConfig:
+    """Where and how often to record. every=0 records epochs only."""
+    path: str
+    every: int = DEFAULT_EVERY
+    probe_batches: int = PROBE_BATCHES
+    append: bool = False    # Continue an existing file (resumed runs)
+
+
+def telemetry_path_for(model_name: str, directory: str = 'models') -> str:
+    return os.path.join(directory, f"{model_name}.telemetry.jsonl")
+
+
+def current_rss() -> int:
+    """Resident set size in bytes (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {'p50': round(float(p50), 3), 'p90': round(float(p90), 3), 'p99': round(float(p99), 3)}
+
+
+def probe_input(dataset, batches: int = PROBE_BATCHES) -> Optional[float]:
+    """Milliseconds per batch for the input pipeline alone (after one warm-up batch)."""
+    iterator = iter(dataset)
+    count = 0
+    try:
+        next(iterator)
+        start = time.perf_counter()
+        for _ in range(batches):
+            next(iterator)
+            count += 1
+    except StopIteration:
+        pass
+    if not count:
+        return None
+    return (time.perf_counter() - start) * 1000 / count
+
+
+def learning_rate(model) -> Optional[float]:
+    optimizer = getattr(model, 'optimizer', None)
+    if optimizer is None:
+        return None
+    rate = optimizer.learning_rate
+    if callable(rate):
+        rate = rate(optimizer.iterations)
+    try:
+        return float(np.asarray(rate))
+    except (TypeError, ValueError):
+        return None
+
+
+def _number(value) -> Optional[float]:
+    return None if value is None else round(float(value), 6)
+
+
+def telemetry_callback(config: TelemetryConfig, samples: int, batch_size: int,
+                       probe_dataset=None, run: Optional[Dict] = None):
+    """
+    Keras callback writing telemetry records to config.path.
+
+    Args:
+        samples: Training samples per epoch
+        probe_dataset: Batched input pipeline to time on its own before training (tf.data)
+        run: Extra fields for the run's start record (model name, encoding...)
+    """
+
+    class TelemetryCallback(tf.keras.callbacks.Callback):
+        def __init__(self):
+            super().__init__()
+            self._file = None
+
+        def _write(self, record: Dict):
+            self._file.write(json.dumps(record) + '\n')
+            self._file.flush()
+
+        def on_train_begin(self, logs=None):
+            os.makedirs(os.path.dirname(config.path) or '.', exist_ok=True)
+            self._file = open(config.path, 'a' if config.append else 'w', encoding='utf-8')
+            self._write({
+                'type': 'start', 'time': datetime.now().isoformat(timespec='seconds'), 'pid': os.getpid(),
+                'samples': samples, 'batch_size': batch_size, 'every': config.every,
+                'rss_bytes': current_rss(), **(run or {}),
+            })
+            if probe_dataset is not None and config.probe_batches:
+                ms = probe_input(probe_dataset, config.probe_batches)
+                self._write({'type': 'input_probe', 'batches': config.probe_batches,
+                             'ms_per_batch': _number(ms)})
+
+        def on_epoch_begin(self, epoch, logs=None):
+            self._epoch = epoch
+            self._epoch_start = time.perf_counter()
+            self._step_ms: List[float] = []
+            self._wait_ms = 0.0
+            self._window_start = self._epoch_start
+            self._window_steps = 0
+            self._first_start = None
+            self._last_end = None
+
+        def on_train_batch_begin(self, batch, logs=None):
+            now = time.perf_counter()
+            if self._last_end is not None:
+                self._wait_ms += (now - self._last_end) * 1000
+            if self._first_start is None:
+                self._first_start = now
+            self._batch_start = now
+
+        def on_train_batch_end(self, batch, logs=None):
+            now = time.perf_counter()
+            self._step_ms.append((now - self._batch_start) * 1000)
+            self._last_end = now
+            self._window_steps += 1
+            if config.every and (batch + 1) % config.every == 0:
+                elapsed = now - self._window_start
+                logs = logs or {}
+                self._write({
+                    'type': 'batch', 'epoch': self._epoch + 1, 'step': batch + 1,
+                    'loss': _number(logs.get('loss')),
+                    'lr': _number(learning_rate(self.model)),
+                    'samples_per_sec': round(self._window_steps * batch_size / elapsed, 1) if elapsed > 0 else None,
+                    'step_ms': percentiles(self._step_ms[-self._window_steps:]),
+                    'rss_bytes': current_rss(),
+                })
+                self._window_start = now
+                self._window_steps = 0
+
+        def on_epoch_end(self, epoch, logs=None):
+            elapsed = time.perf_counter() - self._epoch_start
+            # Throughput over the training steps only, not end-of-epoch validation
+            training = self._last_end - self._first_start if self._last_end is not None else 0.0
+            train_ms = sum(self._step_ms)
+            logs = logs or {}
+            self._write({
+                'type': 'epoch', 'epoch': epoch + 1, 'seconds': round(elapsed, 3),
+                'loss': _number(logs.get('loss')),
+                'val_loss': _number(logs.get('val_loss')),
+                'lr': _number(learning_rate(self.model)),
+                'samples_per_sec': round(samples / training, 1) if training > 0 else None,
+                'steps': len(self._step_ms),
+                'step_ms': percentiles(self._step_ms),
+                'train_ms': round(train_ms, 1),
+                'wait_ms': round(self._wait_ms, 1),
+                'rss_bytes': current_rss(),
+            })
+
+        def on_train_end(self, logs=None):
+            if self._file:
+                self._write({'type': 'end', 'time': datetime.now().isoformat(timespec='seconds'),
+                             'rss_bytes': current_rss()})
+                self._file.close()
+                self._file = None
+
+    return TelemetryCallback()
+
+
+# ---------------------------------------------------------------------------
+# Summary
+# ---------------------------------------------------------------------------
+
+def read_runs(path: str) -> List[List[Dict]]:
+    """
+    Records of each run in a telemetry file (a run starts at a 'start' record).
+    Lines that are not JSON records, such as a last line cut short when training
+    was killed, are skipped with a warning on stderr.
+    """
+    runs: List[List[Dict]] = []
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if not isinstance(record, dict):
+                print(f"Warning: skipping undecodable line {line_no} of {path}", file=sys.stderr)
+                continue
+            if record.get('type') == 'start' or not runs:
+                runs.append([])
+            runs[-1].append(record)
+    return runs
+
+
+def diagnose(records: List[Dict]) -> Dict:
+    """Classify a run as input-, host- or compute-bound from its epoch records and input probe."""
+    epochs = [r for r in records if r.get('type') == 'epoch']
+    # The first epoch includes graph tracing / XLA compilation
+    steady = epochs[1:] if len(epochs) > 1 else epochs
+    probe = next((r['ms_per_batch'] for r in records if r.get('type') == 'input_probe'), None)
+
+    step_p50 = float(np.median([e['step_ms']['p50'] for e in steady if e.get('step_ms')])) if steady else None
+    train_ms = sum(e.get('train_ms', 0.0) for e in steady)
+    wait_ms = sum(e.get('wait_ms', 0.0) for e in steady)
+    wait_fraction = wait_ms / (train_ms + wait_ms) if train_ms + wait_ms > 0 else 0.0
+
+    if step_p50 is None:
+        verdict, reason = 'unknown', 'no completed epochs'
+    elif probe is not None and probe >= INPUT_BOUND_RATIO * step_p50:
+        verdict = 'input-bound'
+        reason = (f"the input pipeline alone needs {probe:.1f} ms/batch against a {step_p50:.1f} ms "
+                  f"median training step: speed up or parallelize data loading (prefetch, num_parallel_calls, --in-memory)")
+    elif wait_fraction >= HOST_BOUND_FRACTION:
+        verdict = 'host-bound'
+        reason = (f"{wait_fraction:.0%} of the time is spent between steps (callbacks, Python overhead): "
+                  f"fewer per-batch callbacks or a larger batch size")
+    else:
+        verdict = 'compute-bound'
+        reason = (f"steps take {step_p50:.1f} ms (median) and the input pipeline keeps up"
+                  + (f" ({probe:.1f} ms/batch)" if probe is not None else "")
+                  + ": try --perf, a larger batch or more threads")
+    return {'verdict': verdict, 'reason': reason, 'step_ms_p50': step_p50,
+            'input_ms_per_batch': probe, 'wait_fraction': wait_fraction}
+
+
+def print_summary(records: List[Dict]):
+    start = records[0] if records and records[0].get('type') == 'start' else {}
+    if start:
+        details = ', '.join(f"{k}={start[k]}" for k in ('model', 'encoding', 'samples', 'batch_size') if k in start)
+        print(f"Run started {start.get('time', '?')}: {details}")
+
+    epochs = [r for r in records if r.get('type') == 'epoch']
+    print(f"\n{'Epoch':>5} {'Loss':>10} {'Val loss':>10} {'LR':>9} {'Samples/s':>10} "
+          f"{'Step p50':>9} {'p90':>7} {'p99':>7} {'Wait %':>7} {'RSS MB':>8}")
+    for e in epochs:
+        steps = e.get('step_ms') or {}
+        total = e.get('train_ms', 0.0) + e.get('wait_ms', 0.0)
+        wait = e.get('wait_ms', 0.0) / total if total else 0.0
+
+        def fmt(value, spec):
+            return format(value, spec) if value is not None else '-'
+
+        print(f"{e['epoch']:>5} {fmt(e.get('loss'), '10.4f')} {fmt(e.get('val_loss'), '10.4f')} "
+              f"{fmt(e.get('lr'), '9.2e')} {fmt(e.get('samples_per_sec'), '10,.0f')} "
+              f"{fmt(steps.get('p50'), '9.1f')} {fmt(steps.get('p90'), '7.1f')} {fmt(steps.get('p99'), '7.1f')} "
+              f"{wait:>7.1%} {e.get('rss_bytes', 0) / 1e6:>8.0f}")
+
+    diagnosis = diagnose(records)
+    print(f"\nVerdict: {diagnosis['verdict']}: {diagnosis['reason']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize training telemetry")
+    sub = parser.add_subparsers(dest='command', required=True)
+    summarize = sub.add_parser('summarize', help='Per-epoch table and input/compute-bound verdict')
+    summarize.add_argument('path', help='Telemetry file (models/<model>.telemetry.jsonl)')
+    summarize.add_argument('--run', type=int, default=-1, help='Which run in the file (default: the last)')
+    summarize.add_argument('--json', action='store_true', help='Print the verdict as JSON')
+    args = parser.parse_args()
+
+    try:
+        runs = read_runs(args.path)
+    except OSError as e:
+        print(f"Cannot read {args.path}: {e}")
+        return 1
+    if not runs:
+        print(f"No telemetry in {args.path}")
+        return 1
+    if not -len(runs) <= args.run < len(runs):
+        print(f"No run {args.run} in {args.path}: it holds {len(runs)} run(s), "
+              f"0 to {len(runs) - 1} (or -1 for the last)")
+        return 1
+    records = runs[args.run]
+    if args.json:
+        print(json.dumps(diagnose(records), indent=2))
+    else:
+        print_summary(records)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
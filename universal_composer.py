@@ -6,9 +6,11 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+import time
 import numpy as np
-from typing import List, Tuple, Optional
-from dataclasses import dataclass
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Tuple, Optional, Union
+from dataclasses import dataclass, field
 
 from genres.all_genres import (
     ALL_GENRES, get_genre, list_genres, list_genres_by_category,
@@ -17,6 +19,10 @@ from genres.all_genres import (
 from genres.genre_database import (
     GenreParams, ScaleType, TimeSignature, SCALE_INTERVALS, get_scale_notes
 )
+from bass_engine import style_for, render_style, root_timeline
+from chord_engine import complexity_tier, progression_for, voicings_for, render_chords
+from note_array import concat_notes, to_objects
+from instrumentation import span, timed
 
 try:
     from advanced_neural_network import AdvancedNeuralComposer, EnhancedComposer, MIDIDataProcessor
@@ -27,6 +33,10 @@ except ImportError:
     EnhancedComposer = None
     MIDIDataProcessor = None
 
+# Bump whenever seeded output changes (generators, arrangement, rendering):
+# the generation cache keys on it, so stale renders stop being served.
+COMPOSER_VERSION = 3
+
 @dataclass
 class Note:
     """Represents a MIDI note event."""
@@ -35,34 +45,174 @@ class Note:
     start: float  # In beats
     duration: float
 
+SECTION_BARS = 8  # Default section length in bars
+CHUNK_BARS = 64  # Bars rendered per vectorized engine call
+
+# Velocity scale per section role: the piece builds from the intro to the choruses
+SECTION_DYNAMICS = {'intro': 0.75, 'verse': 0.9, 'chorus': 1.0, 'outro': 0.8}
+SPARSE_SECTIONS = ('intro', 'outro')  # Melody plays at lower density here
+
+# Named random streams spawned from the composer seed
+TRACKS = ('melody', 'chords', 'bass', 'drums')
+RNG_STREAMS = ('plan',) + TRACKS
+
+@dataclass(frozen=True)
+class Section:
+    """A span of bars [start, end) with a structural role."""
+    name: str
+    start: int
+    end: int
+
+@dataclass(frozen=True)
+class CompositionPlan:
+    """
+    Global decisions shared by every track of one composition: tempo, meter,
+    key, chord timeline and section layout. Computed once per GenreComposer and
+    never modified, so track generators can read it concurrently.
+    """
+    tempo: int
+    time_signature: Tuple[int, int]
+    root_note: int
+    scale_type: ScaleType
+    scale: Tuple[int, ...]
+    progression: Tuple[Tuple[int, ...], ...]      # Root-position chords, intervals above the root
+    voicings: Tuple[Tuple[int, ...], ...] = ()    # Voice-led absolute pitches per chord
+    section_bars: int = SECTION_BARS
+    
+    @property
+    def beats_per_bar(self) -> int:
+        return self.time_signature[0]
+    
+    def chord_for_bar(self, bar: int) -> Tuple[int, ...]:
+        """Chord intervals (above the root) sounding in the given bar."""
+        return self.progression[bar % len(self.progression)]
+    
+    def bass_root_for_bar(self, bar: int) -> int:
+        """Bass root for the given bar, an octave below the key root."""
+        return self.root_note - 12 + self.chord_for_bar(bar)[0] % 12
+    
+    def chord_timeline(self, bars: int) -> List[Tuple[int, ...]]:
+        """One chord per bar for a piece of the given length."""
+        return [self.chord_for_bar(bar) for bar in range(bars)]
+    
+    def _section(self, index: int, count: int, bars: int) -> Section:
+        if count >= 3 and index == 0:
+            name = 'intro'
+        elif count >= 3 and index == count - 1:
+            name = 'outro'
+        else:
+            name = 'verse' if (index - (count >= 3)) % 2 == 0 else 'chorus'
+        return Section(name, index * self.section_bars, min((index + 1) * self.section_bars, bars))
+    
+    def sections(self, bars: int) -> List[Section]:
+        """Split a piece into sections: intro, alternating verse/chorus, outro."""
+        count = -(-bars // self.section_bars)
+        return [self._section(i, count, bars) for i in range(count)]
+    
+    def section_for_bar(self, bar: int, bars: int) -> Section:
+        """Section containing the given bar of a piece of the given length."""
+        count = -(-bars // self.section_bars)
+        return self._section(min(bar // self.section_bars, count - 1), count, bars)
+    
+    def dynamics(self, first_bar: int, count: int, bars: int) -> np.ndarray:
+        """Velocity scale of each bar in [first_bar, first_bar + count), from its section."""
+        return np.array([SECTION_DYNAMICS[self.section_for_bar(bar, bars).name]
+                         for bar in range(first_bar, first_bar + count)])
+
+@dataclass
+class CompositionResult:
+    """All four tracks of a composition plus how long each took to generate."""
+    plan: CompositionPlan
+    melody: List[Note]
+    chords: List[List[Note]]
+    bass: List[Note]
+    drums: dict
+    timings: Dict[str, float] = field(default_factory=dict)  # Seconds per track
+    elapsed: float = 0.0
+    executor: str = 'serial'
+
+# Neural models loaded by worker processes, keyed by path (one load per process)
+_WORKER_MODELS: Dict[str, 'AdvancedNeuralComposer'] = {}
+
+def _load_worker_model(model_path: str) -> Optional['AdvancedNeuralComposer']:
+    if model_path not in _WORKER_MODELS:
+        model = None
+        if NEURAL_AVAILABLE and os.path.exists(model_path):
+            model = AdvancedNeuralComposer()
+            model.load_model(model_path)
+        _WORKER_MODELS[model_path] = model
+    return _WORKER_MODELS[model_path]
+
+def preload_tables():
+    """Fill the chord progression and voicing caches for every genre's scales (e.g. before forking server workers)."""
+    for genre_id in list_genres():
+        genre = get_genre(genre_id)
+        tier = complexity_tier(genre.chord_complexity)
+        for scale_type in genre.scales:
+            voicings_for(60, tuple(SCALE_INTERVALS[scale_type]), tier)  # GenreComposer.root_note
+
+def _compose_track_worker(genre_id: str, plan: CompositionPlan, track: str, bars: int,
+                          rng: np.random.Generator, model_path: Optional[str]):
+    """Process pool entry point: rebuild a composer around the shared plan and render one track."""
+    neural_model = _load_worker_model(model_path) if model_path else None
+    composer = GenreComposer(genre_id, neural_model=neural_model, plan=plan)
+    composer.rngs[track] = rng
+    start = time.perf_counter()
+    notes = composer.generate_track(track, bars)
+    # Hand the advanced stream back so the parent composer stays in sync
+    return notes, rng, time.perf_counter() - start
+
 class GenreComposer:
     """Composes music based on genre parameters."""
     
-    def __init__(self, genre_id: str, seed: int = None, neural_model: Optional['AdvancedNeuralComposer'] = None):
+    def __init__(self, genre_id: str, seed: int = None, neural_model: Optional['AdvancedNeuralComposer'] = None,
+                 plan: Optional[CompositionPlan] = None):
         self.genre = get_genre(genre_id)
         if not self.genre:
             raise ValueError(f"Unknown genre: {genre_id}. Use list_genres() to see available genres.")
         
-        if seed:
-            np.random.seed(seed)
+        self.genre_id = genre_id
+        self.seed = seed
+        
+        # Independent random streams for the plan and each track, so tracks can be
+        # generated in any order (or concurrently) with identical results per seed
+        streams = np.random.SeedSequence(seed).spawn(len(RNG_STREAMS))
+        self.rngs = {name: np.random.default_rng(stream) for name, stream in zip(RNG_STREAMS, streams)}
         
         self.root_note = 60  # Middle C
-        self.current_scale = self._get_scale()
+        self.plan = plan if plan is not None else self._make_plan()
+        self.current_scale = list(self.plan.scale)
         self.neural_model = neural_model
         self.enhanced_composer = EnhancedComposer(neural_model) if NEURAL_AVAILABLE and neural_model else None
     
-    def _get_scale(self) -> List[int]:
-        """Get scale notes based on genre's preferred scales."""
-        scale_type = np.random.choice(self.genre.scales)
-        return get_scale_notes(self.root_note, scale_type)
+    @timed('compose.plan')
+    def _make_plan(self) -> CompositionPlan:
+        """Draw the global musical decisions once for all tracks."""
+        scale_type = self.rngs['plan'].choice(self.genre.scales)
+        tempo = self._get_tempo()
+        time_sig = self._get_time_signature()
+        
+        # Cached per (root, scale, complexity)
+        scale_intervals = tuple(SCALE_INTERVALS[scale_type])
+        tier = complexity_tier(self.genre.chord_complexity)
+        
+        return CompositionPlan(
+            tempo=int(tempo),
+            time_signature=tuple(time_sig),
+            root_note=self.root_note,
+            scale_type=scale_type,
+            scale=tuple(get_scale_notes(self.root_note, scale_type)),
+            progression=progression_for(scale_intervals, tier),
+            voicings=voicings_for(self.root_note, scale_intervals, tier),
+        )
     
     def _get_tempo(self) -> int:
-        """Get random tempo within genre's range."""
-        return np.random.randint(self.genre.tempo_range[0], self.genre.tempo_range[1] + 1)
+        """Draw a random tempo within genre's range (use plan.tempo once composed)."""
+        return self.rngs['plan'].integers(self.genre.tempo_range[0], self.genre.tempo_range[1] + 1)
     
     def _get_time_signature(self) -> Tuple[int, int]:
-        """Get random time signature from genre's options."""
-        ts = np.random.choice(self.genre.time_signatures)
+        """Draw a random time signature from genre's options (use plan.time_signature once composed)."""
+        ts = self.rngs['plan'].choice(self.genre.time_signatures)
         return ts.value
     
     def _apply_swing(self, beat: float) -> float:
@@ -77,9 +227,28 @@ class GenreComposer:
             return beat + delay
         return beat
     
-    def _get_velocity(self) -> int:
+    def _get_velocity(self, rng: np.random.Generator) -> int:
         """Get random velocity within genre's range."""
-        return np.random.randint(self.genre.velocity_range[0], self.genre.velocity_range[1] + 1)
+        return rng.integers(self.genre.velocity_range[0], self.genre.velocity_range[1] + 1)
+    
+    @staticmethod
+    def _scale_velocity(velocity: int, scale: float) -> int:
+        velocity = int(int(velocity) * scale + 0.5)
+        return 127 if velocity > 127 else (1 if velocity < 1 else velocity)
+    
+    def _apply_dynamics(self, notes: np.ndarray, first_bar: int, count: int, bars: int) -> np.ndarray:
+        """Scale a chunk's velocities by the section each note's bar falls in."""
+        if len(notes):
+            scales = self.plan.dynamics(first_bar, count, bars)
+            bar = (notes['start'] // self.plan.beats_per_bar).astype(int) - first_bar
+            notes['velocity'] = np.clip(np.rint(notes['velocity'] * scales[np.clip(bar, 0, count - 1)]), 1, 127)
+        return notes
+    
+    def _nearest_chord_tone(self, pitch: int, chord: Tuple[int, ...]) -> int:
+        """Closest scale pitch to `pitch` that belongs to the chord, or pitch if none does."""
+        chord_pcs = {(self.plan.root_note + interval) % 12 for interval in chord}
+        tones = [p for p in self.current_scale if p % 12 in chord_pcs]
+        return min(tones, key=lambda p: abs(p - pitch)) if tones else pitch
     
     def _snap_to_scale(self, note: int) -> int:
         """Snap note to nearest scale degree."""
@@ -89,51 +258,94 @@ class GenreComposer:
         closest = min(scale_pcs, key=lambda x: min(abs(x - pitch_class), 12 - abs(x - pitch_class)))
         return octave + closest
     
-    def generate_melody(self, bars: int = 4) -> List[Note]:
-        """Generate a melodic line."""
-        notes = []
-        time_sig = self._get_time_signature()
-        beats_per_bar = time_sig[0]
+    def iter_melody(self, bars: int = 4) -> Iterator[List[Note]]:
+        """Generate a melodic line bar by bar (one list of notes per bar)."""
+        context: List[Note] = []
+        for bar_notes in self._iter_melody_raw(bars):
+            if self.enhanced_composer and NEURAL_AVAILABLE and bar_notes:
+                try:
+                    enhanced = self.enhanced_composer.enhance_melody(context + bar_notes)
+                    bar_notes = enhanced[len(context):]
+                except Exception as e:
+                    # If neural enhancement fails, use original notes
+                    pass
+            context = (context + bar_notes)[-5:]
+            yield bar_notes
+    
+    def _iter_melody_raw(self, bars: int) -> Iterator[List[Note]]:
+        """
+        Melody notes grouped by the bar their onset falls in, before neural enhancement.
+        Each bar opens on a tone of the plan's chord for that bar; density and
+        velocity follow the bar's section.
+        """
+        rng = self.rngs['melody']
+        beats_per_bar = self.plan.beats_per_bar
         total_beats = bars * beats_per_bar
+        timeline = self.plan.chord_timeline(bars)
         
         current_beat = 0.0
-        prev_note = np.random.choice(self.current_scale)
+        prev_note = rng.choice(self.current_scale)
+        bar_notes = []
+        bar = 0
+        bar_end = beats_per_bar
+        section = self.plan.section_for_bar(0, bars)
         
         while current_beat < total_beats:
-            # Determine note duration based on density
-            if self.genre.note_density > 0.7:
+            while current_beat >= bar_end:
+                yield bar_notes
+                bar_notes = []
+                bar += 1
+                bar_end += beats_per_bar
+                section = self.plan.section_for_bar(bar, bars)
+            
+            # Determine note duration based on density, thinned out in the intro and outro
+            density = self.genre.note_density - (0.3 if section.name in SPARSE_SECTIONS else 0.0)
+            if density > 0.7:
                 durations = [0.25, 0.5]
-            elif self.genre.note_density > 0.4:
+            elif density > 0.4:
                 durations = [0.5, 1.0, 0.25]
             else:
                 durations = [1.0, 2.0, 0.5]
             
-            duration = np.random.choice(durations)
+            duration = rng.choice(durations)
             
             # Generate note with melodic contour
-            if np.random.random() < 0.7:
+            if rng.random() < 0.7:
                 # Step motion
-                step = np.random.choice([-2, -1, 0, 1, 2])
+                step = rng.choice([-2, -1, 0, 1, 2])
                 scale_idx = self.current_scale.index(self._snap_to_scale(prev_note))
                 new_idx = max(0, min(len(self.current_scale) - 1, scale_idx + step))
                 pitch = self.current_scale[new_idx]
             else:
                 # Leap
-                pitch = np.random.choice(self.current_scale)
+                pitch = rng.choice(self.current_scale)
+            if not bar_notes:
+                pitch = self._nearest_chord_tone(pitch, timeline[bar])
             
             # Apply syncopation
             beat = current_beat
-            if np.random.random() < self.genre.syncopation:
-                beat += np.random.choice([0.25, -0.25, 0.5])
+            if rng.random() < self.genre.syncopation:
+                beat += rng.choice([0.25, -0.25, 0.5])
                 beat = max(0, beat)
             
             beat = self._apply_swing(beat)
-            velocity = self._get_velocity()
+            velocity = self._scale_velocity(self._get_velocity(rng), SECTION_DYNAMICS[section.name])
             
-            notes.append(Note(pitch, velocity, beat, duration))
+            bar_notes.append(Note(pitch, velocity, beat, duration))
             prev_note = pitch
             current_beat += duration
         
+        yield bar_notes
+        # Pad with empty bars if the last notes were long
+        while bar_end < total_beats:
+            bar_end += beats_per_bar
+            yield []
+    
+    @timed('compose.melody')
+    def generate_melody(self, bars: int = 4) -> List[Note]:
+        """Generate a melodic line."""
+        notes = [note for bar_notes in self._iter_melody_raw(bars) for note in bar_notes]
+        
         # Enhance with neural network if available
         if self.enhanced_composer and NEURAL_AVAILABLE:
             try:
@@ -144,55 +356,37 @@ class GenreComposer:
         
         return notes
     
-    def generate_bass_line(self, bars: int = 4, chord_roots: List[int] = None) -> List[Note]:
-        """Generate a bass line."""
-        notes = []
-        time_sig = self._get_time_signature()
-        beats_per_bar = time_sig[0]
+    def _iter_bass_chunks(self, bars: int, chord_roots: List[int] = None) -> Iterator[np.ndarray]:
+        """Bass note arrays for consecutive chunks of bars, sampled with the vectorized engine."""
+        rng = self.rngs['bass']
+        beats_per_bar = self.plan.beats_per_bar
+        style = style_for(self.genre.bass_style)
         
         if chord_roots is None:
-            # Default chord progression
-            chord_roots = [self.root_note - 12, self.root_note - 7, 
-                          self.root_note - 5, self.root_note - 12]
+            # Follow the plan's chord timeline
+            chord_roots = [self.plan.bass_root_for_bar(bar) for bar in range(len(self.plan.progression))]
         
-        for bar in range(bars):
-            root = chord_roots[bar % len(chord_roots)]
-            
-            # Bass pattern based on genre style
-            if self.genre.bass_style in ["walking", "walking_swing", "blues_walking"]:
-                # Walking bass
-                for beat in range(beats_per_bar):
-                    if beat == 0:
-                        pitch = root
-                    elif beat == beats_per_bar - 1:
-                        # Approach note
-                        next_root = chord_roots[(bar + 1) % len(chord_roots)]
-                        pitch = next_root + np.random.choice([-1, 1])
-                    else:
-                        pitch = root + np.random.choice([0, 5, 7, 12])
-                    
-                    notes.append(Note(pitch, self._get_velocity(), bar * beats_per_bar + beat, 1.0))
-            
-            elif self.genre.bass_style in ["root_fifth", "root_power"]:
-                # Root-fifth pattern
-                notes.append(Note(root, self._get_velocity(), bar * beats_per_bar, 2.0))
-                notes.append(Note(root + 7, self._get_velocity(), bar * beats_per_bar + 2, 2.0))
-            
-            elif self.genre.bass_style in ["808_bass", "trap", "drill_bass"]:
-                # 808 style - long sustained notes with slides
-                notes.append(Note(root, self._get_velocity(), bar * beats_per_bar, beats_per_bar))
-            
-            elif self.genre.bass_style in ["tumbao", "salsa_bass"]:
-                # Latin tumbao pattern
-                pattern = [0, 0.5, 2.5, 3]
-                for beat in pattern:
-                    pitch = root if beat in [0, 2.5] else root + 7
-                    notes.append(Note(pitch, self._get_velocity(), bar * beats_per_bar + beat, 0.5))
-            
-            else:
-                # Default: root on downbeats
-                for beat in range(0, beats_per_bar, 2):
-                    notes.append(Note(root, self._get_velocity(), bar * beats_per_bar + beat, 2.0))
+        for first_bar in range(0, bars, CHUNK_BARS):
+            count = min(CHUNK_BARS, bars - first_bar)
+            roots = root_timeline(chord_roots, first_bar, count)
+            notes = render_style(style, rng, roots, beats_per_bar, self.genre.velocity_range, first_bar)
+            yield self._apply_dynamics(notes, first_bar, count, bars)
+    
+    def iter_bass_line(self, bars: int = 4, chord_roots: List[int] = None) -> Iterator[List[Note]]:
+        """Generate a bass line bar by bar."""
+        bar = 0
+        for chunk in self._iter_bass_chunks(bars, chord_roots):
+            # Templates emit the same number of notes for every bar, in bar order
+            chunk_bars = min(CHUNK_BARS, bars - bar)
+            per_bar = len(chunk) // chunk_bars
+            for i in range(chunk_bars):
+                yield to_objects(chunk[i * per_bar:(i + 1) * per_bar], Note)
+            bar += chunk_bars
+    
+    @timed('compose.bass')
+    def generate_bass_line(self, bars: int = 4, chord_roots: List[int] = None) -> List[Note]:
+        """Generate a bass line."""
+        notes = [note for chunk in self._iter_bass_chunks(bars, chord_roots) for note in to_objects(chunk, Note)]
         
         # Enhance with neural network if available
         if self.enhanced_composer and NEURAL_AVAILABLE:
@@ -204,40 +398,39 @@ class GenreComposer:
         
         return notes
     
+    def iter_chords(self, bars: int = 4) -> Iterator[List[Note]]:
+        """Generate the chord progression bar by bar (one chord per bar)."""
+        sizes = np.array([len(v) for v in self.plan.voicings])
+        for first_bar, chunk in self._iter_chord_chunks(bars):
+            count = min(CHUNK_BARS, bars - first_bar)
+            notes = to_objects(chunk, Note)
+            bounds = np.concatenate(([0], np.cumsum(sizes[np.arange(first_bar, first_bar + count) % len(sizes)])))
+            for i in range(count):
+                yield notes[bounds[i]:bounds[i + 1]]
+    
+    def _iter_chord_chunks(self, bars: int) -> Iterator[Tuple[int, np.ndarray]]:
+        """(first_bar, note array) for consecutive chunks of bars, tiled from the plan's voicings."""
+        rng = self.rngs['chords']
+        for first_bar in range(0, bars, CHUNK_BARS):
+            count = min(CHUNK_BARS, bars - first_bar)
+            # Velocities slightly softer than melody
+            notes = render_chords(self.plan.voicings, rng, first_bar, count,
+                                  self.plan.beats_per_bar, self.genre.velocity_range)
+            yield first_bar, self._apply_dynamics(notes, first_bar, count, bars)
+    
+    def generate_chord_array(self, bars: int = 4) -> np.ndarray:
+        """Chord notes for all bars as a flat note array (same notes as generate_chords)."""
+        return concat_notes([chunk for _, chunk in self._iter_chord_chunks(bars)])
+    
+    @timed('compose.chords')
     def generate_chords(self, bars: int = 4) -> List[List[Note]]:
         """Generate chord progression."""
-        chords = []
-        time_sig = self._get_time_signature()
-        beats_per_bar = time_sig[0]
-        
-        # Common chord progressions based on complexity
-        if self.genre.chord_complexity < 0.3:
-            # Simple: I-IV-V-I
-            progression = [[0, 4, 7], [5, 9, 12], [7, 11, 14], [0, 4, 7]]
-        elif self.genre.chord_complexity < 0.6:
-            # Medium: I-vi-IV-V
-            progression = [[0, 4, 7], [9, 12, 16], [5, 9, 12], [7, 11, 14]]
-        else:
-            # Complex: jazz-style with extensions
-            progression = [[0, 4, 7, 11], [5, 9, 12, 16], [7, 11, 14, 17], [0, 4, 7, 10]]
-        
-        for bar in range(bars):
-            chord_intervals = progression[bar % len(progression)]
-            bar_chords = []
-            
-            for interval in chord_intervals:
-                pitch = self.root_note + interval
-                velocity = self._get_velocity() - 10  # Slightly softer than melody
-                bar_chords.append(Note(pitch, velocity, bar * beats_per_bar, beats_per_bar))
-            
-            chords.append(bar_chords)
-        
-        return chords
+        return list(self.iter_chords(bars))
     
-    def generate_drum_pattern(self, bars: int = 4) -> dict:
-        """Generate drum pattern based on genre."""
-        time_sig = self._get_time_signature()
-        beats_per_bar = time_sig[0]
+    def iter_drum_pattern(self, bars: int = 4) -> Iterator[dict]:
+        """Generate the drum pattern bar by bar (one dict of parts per bar)."""
+        rng = self.rngs['drums']
+        beats_per_bar = self.plan.beats_per_bar
         
         # GM Drum map
         KICK = 36
@@ -249,74 +442,74 @@ class GenreComposer:
         TOM_HIGH = 50
         TOM_LOW = 45
         
-        drums = {"kick": [], "snare": [], "hihat": [], "other": []}
-        
         for bar in range(bars):
+            drums = {"kick": [], "snare": [], "hihat": [], "other": []}
             bar_start = bar * beats_per_bar
+            section = self.plan.section_for_bar(bar, bars)
             
             # Pattern varies by genre
             if self.genre.drum_pattern in ["four_on_floor", "house", "techno"]:
                 # Four on the floor
                 for beat in range(beats_per_bar):
-                    drums["kick"].append(Note(KICK, self._get_velocity(), bar_start + beat, 0.5))
+                    drums["kick"].append(Note(KICK, self._get_velocity(rng), bar_start + beat, 0.5))
                     if beat % 2 == 1:
-                        drums["snare"].append(Note(SNARE, self._get_velocity(), bar_start + beat, 0.5))
-                    drums["hihat"].append(Note(HIHAT_CLOSED, self._get_velocity() - 20, bar_start + beat, 0.25))
-                    drums["hihat"].append(Note(HIHAT_CLOSED, self._get_velocity() - 30, bar_start + beat + 0.5, 0.25))
+                        drums["snare"].append(Note(SNARE, self._get_velocity(rng), bar_start + beat, 0.5))
+                    drums["hihat"].append(Note(HIHAT_CLOSED, self._get_velocity(rng) - 20, bar_start + beat, 0.25))
+                    drums["hihat"].append(Note(HIHAT_CLOSED, self._get_velocity(rng) - 30, bar_start + beat + 0.5, 0.25))
             
             elif self.genre.drum_pattern in ["rock_basic", "rock_heavy"]:
                 # Rock beat
-                drums["kick"].append(Note(KICK, self._get_velocity(), bar_start, 0.5))
-                drums["kick"].append(Note(KICK, self._get_velocity(), bar_start + 2.5, 0.5))
-                drums["snare"].append(Note(SNARE, self._get_velocity(), bar_start + 1, 0.5))
-                drums["snare"].append(Note(SNARE, self._get_velocity(), bar_start + 3, 0.5))
+                drums["kick"].append(Note(KICK, self._get_velocity(rng), bar_start, 0.5))
+                drums["kick"].append(Note(KICK, self._get_velocity(rng), bar_start + 2.5, 0.5))
+                drums["snare"].append(Note(SNARE, self._get_velocity(rng), bar_start + 1, 0.5))
+                drums["snare"].append(Note(SNARE, self._get_velocity(rng), bar_start + 3, 0.5))
                 for i in range(8):
-                    drums["hihat"].append(Note(HIHAT_CLOSED, self._get_velocity() - 20, bar_start + i * 0.5, 0.25))
+                    drums["hihat"].append(Note(HIHAT_CLOSED, self._get_velocity(rng) - 20, bar_start + i * 0.5, 0.25))
             
             elif self.genre.drum_pattern in ["trap", "drill"]:
                 # Trap pattern with hi-hat rolls
-                drums["kick"].append(Note(KICK, self._get_velocity(), bar_start, 1.0))
-                drums["kick"].append(Note(KICK, self._get_velocity(), bar_start + 2.25, 0.5))
-                drums["snare"].append(Note(SNARE, self._get_velocity(), bar_start + 1, 0.5))
-                drums["snare"].append(Note(SNARE, self._get_velocity(), bar_start + 3, 0.5))
+                drums["kick"].append(Note(KICK, self._get_velocity(rng), bar_start, 1.0))
+                drums["kick"].append(Note(KICK, self._get_velocity(rng), bar_start + 2.25, 0.5))
+                drums["snare"].append(Note(SNARE, self._get_velocity(rng), bar_start + 1, 0.5))
+                drums["snare"].append(Note(SNARE, self._get_velocity(rng), bar_start + 3, 0.5))
                 # Hi-hat rolls
                 for i in range(16):
-                    vel = self._get_velocity() - 30 + np.random.randint(-10, 10)
+                    vel = self._get_velocity(rng) - 30 + rng.integers(-10, 10)
                     drums["hihat"].append(Note(HIHAT_CLOSED, vel, bar_start + i * 0.25, 0.125))
             
             elif self.genre.drum_pattern in ["boom_bap", "hip_hop"]:
                 # Boom bap
-                drums["kick"].append(Note(KICK, self._get_velocity(), bar_start, 0.5))
-                drums["kick"].append(Note(KICK, self._get_velocity(), bar_start + 2.5, 0.5))
-                drums["snare"].append(Note(SNARE, self._get_velocity(), bar_start + 1, 0.5))
-                drums["snare"].append(Note(SNARE, self._get_velocity(), bar_start + 3.25, 0.5))
+                drums["kick"].append(Note(KICK, self._get_velocity(rng), bar_start, 0.5))
+                drums["kick"].append(Note(KICK, self._get_velocity(rng), bar_start + 2.5, 0.5))
+                drums["snare"].append(Note(SNARE, self._get_velocity(rng), bar_start + 1, 0.5))
+                drums["snare"].append(Note(SNARE, self._get_velocity(rng), bar_start + 3.25, 0.5))
                 for i in range(4):
-                    drums["hihat"].append(Note(HIHAT_CLOSED, self._get_velocity() - 20, bar_start + i, 0.5))
+                    drums["hihat"].append(Note(HIHAT_CLOSED, self._get_velocity(rng) - 20, bar_start + i, 0.5))
             
             elif self.genre.drum_pattern in ["jazz", "bebop", "swing"]:
                 # Jazz ride pattern
                 for beat in range(beats_per_bar):
-                    drums["other"].append(Note(RIDE, self._get_velocity() - 10, bar_start + beat, 0.5))
-                    if np.random.random() < 0.5:
-                        drums["other"].append(Note(RIDE, self._get_velocity() - 20, bar_start + beat + 0.66, 0.25))
+                    drums["other"].append(Note(RIDE, self._get_velocity(rng) - 10, bar_start + beat, 0.5))
+                    if rng.random() < 0.5:
+                        drums["other"].append(Note(RIDE, self._get_velocity(rng) - 20, bar_start + beat + 0.66, 0.25))
                 # Kick and snare comping
-                if np.random.random() < 0.3:
-                    drums["kick"].append(Note(KICK, self._get_velocity() - 20, bar_start + np.random.choice([0, 2]), 0.5))
+                if rng.random() < 0.3:
+                    drums["kick"].append(Note(KICK, self._get_velocity(rng) - 20, bar_start + rng.choice([0, 2]), 0.5))
             
             elif self.genre.drum_pattern in ["salsa_clave", "latin_clave"]:
                 # Son clave 3-2
                 clave_pattern = [0, 1.5, 2.5] if bar % 2 == 0 else [1, 2]
                 for beat in clave_pattern:
-                    drums["other"].append(Note(76, self._get_velocity(), bar_start + beat, 0.25))  # Woodblock
+                    drums["other"].append(Note(76, self._get_velocity(rng), bar_start + beat, 0.25))  # Woodblock
                 # Tumbao kick
-                drums["kick"].append(Note(KICK, self._get_velocity(), bar_start + 2.5, 0.5))
+                drums["kick"].append(Note(KICK, self._get_velocity(rng), bar_start + 2.5, 0.5))
             
             elif self.genre.drum_pattern in ["reggae", "one_drop"]:
                 # One drop
-                drums["snare"].append(Note(SNARE, self._get_velocity(), bar_start + 2, 0.5))
-                drums["kick"].append(Note(KICK, self._get_velocity(), bar_start + 2, 0.5))
+                drums["snare"].append(Note(SNARE, self._get_velocity(rng), bar_start + 2, 0.5))
+                drums["kick"].append(Note(KICK, self._get_velocity(rng), bar_start + 2, 0.5))
                 for i in range(8):
-                    drums["hihat"].append(Note(HIHAT_CLOSED, self._get_velocity() - 20, bar_start + i * 0.5, 0.25))
+                    drums["hihat"].append(Note(HIHAT_CLOSED, self._get_velocity(rng) - 20, bar_start + i * 0.5, 0.25))
             
             elif self.genre.drum_pattern == "none":
                 # No drums
@@ -324,15 +517,143 @@ class GenreComposer:
             
             else:
                 # Default pattern
-                drums["kick"].append(Note(KICK, self._get_velocity(), bar_start, 0.5))
-                drums["kick"].append(Note(KICK, self._get_velocity(), bar_start + 2, 0.5))
-                drums["snare"].append(Note(SNARE, self._get_velocity(), bar_start + 1, 0.5))
-                drums["snare"].append(Note(SNARE, self._get_velocity(), bar_start + 3, 0.5))
+                drums["kick"].append(Note(KICK, self._get_velocity(rng), bar_start, 0.5))
+                drums["kick"].append(Note(KICK, self._get_velocity(rng), bar_start + 2, 0.5))
+                drums["snare"].append(Note(SNARE, self._get_velocity(rng), bar_start + 1, 0.5))
+                drums["snare"].append(Note(SNARE, self._get_velocity(rng), bar_start + 3, 0.5))
                 for i in range(8):
-                    drums["hihat"].append(Note(HIHAT_CLOSED, self._get_velocity() - 20, bar_start + i * 0.5, 0.25))
+                    drums["hihat"].append(Note(HIHAT_CLOSED, self._get_velocity(rng) - 20, bar_start + i * 0.5, 0.25))
+            
+            # Mark the start of each chorus and of the outro with a crash
+            if (self.genre.drum_pattern != "none" and bar == section.start
+                    and section.name in ('chorus', 'outro')):
+                drums["other"].append(Note(CRASH, self.genre.velocity_range[1], bar_start, 1.0))
+            
+            scale = SECTION_DYNAMICS[section.name]
+            for part_notes in drums.values():
+                for note in part_notes:
+                    note.velocity = self._scale_velocity(note.velocity, scale)
         
+            yield drums
+    
+    @timed('compose.drums')
+    def generate_drum_pattern(self, bars: int = 4) -> dict:
+        """Generate drum pattern based on genre."""
+        drums = {"kick": [], "snare": [], "hihat": [], "other": []}
+        for bar_drums in self.iter_drum_pattern(bars):
+            for part_name, part_notes in bar_drums.items():
+                drums[part_name].extend(part_notes)
         return drums
-
+    
+    def generate_track(self, track: str, bars: int = 4):
+        """Generate one track by name ('melody', 'chords', 'bass' or 'drums')."""
+        if track == 'melody':
+            return self.generate_melody(bars)
+        elif track == 'chords':
+            return self.generate_chords(bars)
+        elif track == 'bass':
+            return self.generate_bass_line(bars)
+        elif track == 'drums':
+            return self.generate_drum_pattern(bars)
+        raise ValueError(f"Unknown track: {track}")
+    
+    def _timed_track(self, track: str, bars: int):
+        start = time.perf_counter()
+        notes = self.generate_track(track, bars)
+        return notes, self.rngs[track], time.perf_counter() - start
+    
+    @timed('compose.all')
+    def compose_all(self, bars: int = 4, workers: int = None,
+                    executor: Union[str, Executor] = 'auto',
+                    model_path: Optional[str] = None) -> CompositionResult:
+        """
+        Generate all four tracks concurrently against the shared plan.
+        
+        Every track draws from its own random stream, so the result for a given
+        seed is the same whichever executor runs it.
+        
+        Args:
+            bars: Number of bars
+            workers: Pool size (default: one per track; 1 runs serially)
+            executor: 'thread', 'process', 'auto' (processes when a neural model is
+                      attached, threads otherwise) or an existing Executor to reuse
+            model_path: Neural model file that worker processes load for enhancement
+        
+        Returns: CompositionResult with the tracks and per-track timings
+        """
+        workers = workers or len(TRACKS)
+        if executor == 'auto':
+            executor = 'process' if self.enhanced_composer and model_path else 'thread'
+        if executor == 'process' and self.enhanced_composer and not model_path:
+            raise ValueError("model_path is required to run neural enhancement in worker processes")
+        
+        if isinstance(executor, Executor):
+            pool, owned = executor, False
+            kind = 'process' if isinstance(executor, ProcessPoolExecutor) else 'thread'
+        elif workers == 1:
+            pool, owned, kind = None, False, 'serial'
+        elif executor == 'thread':
+            pool, owned, kind = ThreadPoolExecutor(max_workers=workers), True, 'thread'
+        elif executor == 'process':
+            pool, owned, kind = ProcessPoolExecutor(max_workers=workers), True, 'process'
+        else:
+            raise ValueError(f"Unknown executor: {executor}")
+        
+        start = time.perf_counter()
+        try:
+            if pool is None:
+                outputs = {track: self._timed_track(track, bars) for track in TRACKS}
+            elif kind == 'process':
+                worker_model = model_path if self.enhanced_composer else None
+                futures = {track: pool.submit(_compose_track_worker, self.genre_id, self.plan, track,
+                                              bars, self.rngs[track], worker_model)
+                           for track in TRACKS}
+                outputs = {track: future.result() for track, future in futures.items()}
+            else:
+                futures = {track: pool.submit(self._timed_track, track, bars) for track in TRACKS}
+                outputs = {track: future.result() for track, future in futures.items()}
+        finally:
+            if owned:
+                pool.shutdown()
+        
+        for track, (_, rng, _) in outputs.items():
+            self.rngs[track] = rng
+        
+        return CompositionResult(
+            plan=self.plan,
+            melody=outputs['melody'][0],
+            chords=outputs['chords'][0],
+            bass=outputs['bass'][0],
+            drums=outputs['drums'][0],
+            timings={track: outputs[track][2] for track in TRACKS},
+            elapsed=time.perf_counter() - start,
+            executor=kind,
+        )
+    
+    def iter_bars(self, bars: int = 4) -> Iterator[Tuple[int, List[Tuple[str, Note]]]]:
+        """
+        Generate all four tracks together, bar by bar.
+        Yields (bar_index, [(track_name, note), ...]) with the bar's notes in time order,
+        so arbitrarily long pieces can be written without holding them in memory.
+        """
+        tracks = [
+            ('melody', self.iter_melody(bars)),
+            ('chords', self.iter_chords(bars)),
+            ('bass', self.iter_bass_line(bars)),
+            ('drums', (
+                [note for part_notes in bar_drums.values() for note in part_notes]
+                for bar_drums in self.iter_drum_pattern(bars)
+            )),
+        ]
+        
+        for bar in range(bars):
+            events = []
+            for track_name, bar_iter in tracks:
+                for note in next(bar_iter, []):
+                    events.append((track_name, note))
+            events.sort(key=lambda event: event[1].start)
+            yield bar, events
+    
 def print_genre_info(genre_id: str):
     """Print detailed information about a genre."""
     genre = get_genre(genre_id)
@@ -5,37 +5,99 @@ Provides a web interface for generating MIDI files
 import os
 import sys
 import json
-from http.server import HTTPServer, SimpleHTTPRequestHandler
-from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, quote, unquote
 import threading
 import webbrowser
+import time
 from pathlib import Path
 import shutil
+import argparse
+import uuid
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-try:
-    from midiutil import MIDIFile
-    MIDIUTIL_AVAILABLE = True
-except ImportError:
-    MIDIUTIL_AVAILABLE = False
-
 try:
     from advanced_neural_network import AdvancedNeuralComposer, train_neural_composer
     NEURAL_AVAILABLE = True
 except ImportError:
     NEURAL_AVAILABLE = False
 
-import numpy as np
-from universal_composer import GenreComposer
+from universal_composer import GenreComposer, preload_tables
+from generate_any_genre import MIDIUTIL_AVAILABLE, render_midi_bytes
 from genres.all_genres import (
     get_genre, list_genres, list_genres_by_category,
-    search_genres, get_genre_count, get_categories
+    get_genre_count, get_categories
+)
+from genre_search import get_search_index, search_genres_ranked
+from response_cache import ResponseCache, CachedResponse
+from generation_cache import GenerationCache, cache_key, content_digest
+from instrumentation import (
+    REGISTRY, enable as enable_instrumentation, profiled, render_histograms, span, thread_profiled, timed
 )
+from model_registry import ModelRegistry, model_path_for
+from prefork import WorkerSnapshots, memory_usage, serve as serve_prefork
+
+NEURAL_MODEL_NAME = 'composer_model'
+MODEL_REGISTRY = ModelRegistry('models')
+GENERATION_CACHE = GenerationCache()
+
+# How far live-preview streams may run ahead of playback
+STREAM_LOOKAHEAD_SECONDS = 8.0
+
+# Batch renders (zip archives or directories of .mid files) and the URL they are served under
+BATCH_DIR = os.path.join('output', 'batches')
+BATCH_URL_PREFIX = '/output/batches/'
+
+# With --workers, where each worker publishes its metrics (see send_metrics)
+WORKER_SNAPSHOTS = None
+WORKER_INDEX = 0
+
+RESPONSE_CACHE = ResponseCache()
+_catalogue_built = False
+
+def genre_info(genre_id):
+    """Serializable description of a genre"""
+    genre = get_genre(genre_id)
+    return {
+        'id': genre_id,
+        'name': genre.name,
+        'category': genre.category,
+        'description': genre.description,
+        'tempo_range': genre.tempo_range,
+        'scales': [s.value for s in genre.scales],
+        'swing': genre.swing,
+        'velocity_range': genre.velocity_range,
+        'note_density': genre.note_density,
+        'syncopation': genre.syncopation,
+        'instruments': genre.instruments,
+        'drum_pattern': genre.drum_pattern,
+        'bass_style': genre.bass_style,
+        'chord_complexity': genre.chord_complexity,
+    }
+
+def build_catalogue_cache():
+    """Precompute the catalogue responses (the genre data is immutable at runtime)"""
+    global _catalogue_built
+    if _catalogue_built:
+        return RESPONSE_CACHE
+    
+    RESPONSE_CACHE.put_json('/api/genres', list_genres())
+    RESPONSE_CACHE.put_json('/api/categories', list_genres_by_category())
+    for genre_id in list_genres():
+        RESPONSE_CACHE.put_json(f'/api/genre-info?id={genre_id}', genre_info(genre_id))
+    
+    _catalogue_built = True
+    return RESPONSE_CACHE
 
 class ComposerHandler(SimpleHTTPRequestHandler):
     """HTTP request handler for the composer"""
     
+    def handle(self):
+        """Serve the connection; under --profile its thread is profiled too"""
+        with thread_profiled():
+            super().handle()
+    
     def do_GET(self):
         """Handle GET requests"""
         parsed_path = urlparse(self.path)
@@ -44,33 +106,17 @@ class ComposerHandler(SimpleHTTPRequestHandler):
         
         # API endpoints
         if path == '/api/genres':
-            self.send_json(list_genres())
+            self.send_cached(build_catalogue_cache().get('/api/genres'))
         
         elif path == '/api/categories':
-            self.send_json(list_genres_by_category())
+            self.send_cached(build_catalogue_cache().get('/api/categories'))
         
         elif path == '/api/genre-info':
             genre_id = query.get('id', [None])[0]
             if genre_id:
-                genre = get_genre(genre_id)
-                if genre:
-                    info = {
-                        'id': genre_id,
-                        'name': genre.name,
-                        'category': genre.category,
-                        'description': genre.description,
-                        'tempo_range': genre.tempo_range,
-                        'scales': [s.value for s in genre.scales],
-                        'swing': genre.swing,
-                        'velocity_range': genre.velocity_range,
-                        'note_density': genre.note_density,
-                        'syncopation': genre.syncopation,
-                        'instruments': genre.instruments,
-                        'drum_pattern': genre.drum_pattern,
-                        'bass_style': genre.bass_style,
-                        'chord_complexity': genre.chord_complexity,
-                    }
-                    self.send_json(info)
+                entry = build_catalogue_cache().get(f'/api/genre-info?id={genre_id}')
+                if entry:
+                    self.send_cached(entry)
                 else:
                     self.send_error(404, "Genre not found")
             else:
@@ -78,7 +124,16 @@ class ComposerHandler(SimpleHTTPRequestHandler):
         
         elif path == '/api/search':
             query_str = query.get('q', [''])[0]
-            results = search_genres(query_str)
+            limit = query.get('limit', [None])[0]
+            try:
+                limit = int(limit) if limit else None
+            except ValueError:
+                self.send_error(400, "Invalid limit")
+                return
+            if limit is not None and limit < 0:
+                self.send_error(400, "Invalid limit")
+                return
+            results = search_genres_ranked(query_str, limit)
             self.send_json(results)
         
         elif path == '/api/generate':
@@ -86,6 +141,8 @@ class ComposerHandler(SimpleHTTPRequestHandler):
             bars = int(query.get('bars', [32])[0])
             seed = query.get('seed', [None])[0]
             use_neural = query.get('neural', ['false'])[0].lower() == 'true'
+            stream = query.get('stream', ['false'])[0].lower() == 'true'
+            archive = query.get('archive', ['false'])[0].lower() == 'true'
             
             if not genre_id:
                 self.send_error(400, "Missing genre parameter")
@@ -97,37 +154,53 @@ class ComposerHandler(SimpleHTTPRequestHandler):
             
             try:
                 seed = int(seed) if seed else None
-                filename = self.generate_midi(genre_id, bars, seed, use_neural)
-                self.send_json({'success': True, 'filename': filename})
+                if stream:
+                    self.stream_midi(genre_id, bars, seed, use_neural, archive)
+                else:
+                    result = self.generate_midi(genre_id, bars, seed, use_neural)
+                    self.send_json({'success': True, **result})
             except Exception as e:
                 self.send_error(500, str(e))
         
+        elif path == '/api/stream':
+            self.stream_events(query)
+        
+        elif path == '/api/metrics':
+            self.send_metrics()
+        
         elif path == '/api/models':
-            # List available neural models
-            models_dir = 'models'
-            models = []
-            if os.path.exists(models_dir):
-                models = [f for f in os.listdir(models_dir) if f.endswith('.h5')]
-            self.send_json({'models': models})
+            # List available neural models (kept current by the registry's watcher)
+            manifests = MODEL_REGISTRY.list()
+            self.send_json({
+                'models': [m.file for m in manifests],
+                'details': [m.to_dict() for m in manifests]
+            })
         
         elif path == '/api/model-status':
             # Check if a model is trained
-            model_name = query.get('model', ['composer_model'])[0]
-            model_path = f'models/{model_name}.h5'
-            exists = os.path.exists(model_path)
-            self.send_json({'exists': exists, 'model': model_name})
+            model_name = query.get('model', [NEURAL_MODEL_NAME])[0]
+            manifest = MODEL_REGISTRY.manifest(model_name)
+            self.send_json({
+                'exists': manifest is not None,
+                'model': model_name,
+                'loaded': MODEL_REGISTRY.is_loaded(model_name),
+                'manifest': manifest.to_dict() if manifest else None
+            })
         
         elif path == '/':
-            self.send_file('index.html', 'text/html')
+            self.send_static('index.html', 'text/html')
         
         elif path.endswith('.html'):
-            self.send_file(path[1:], 'text/html')
+            self.send_static(path[1:], 'text/html')
         
         elif path.endswith('.css'):
-            self.send_file(path[1:], 'text/css')
+            self.send_static(path[1:], 'text/css')
         
         elif path.endswith('.js'):
-            self.send_file(path[1:], 'application/javascript')
+            self.send_static(path[1:], 'application/javascript')
+        
+        elif path.startswith(BATCH_URL_PREFIX) and path.endswith(('.zip', '.mid')):
+            self.send_batch_file(unquote(path[len(BATCH_URL_PREFIX):]))
         
         elif path.endswith('.mid'):
             self.send_file(path[1:], 'audio/midi')
@@ -150,6 +223,8 @@ class ComposerHandler(SimpleHTTPRequestHandler):
                 bars = data.get('bars', 32)
                 seed = data.get('seed')
                 use_neural = data.get('neural', False)
+                stream = data.get('stream', False)
+                archive = data.get('archive', False)
                 
                 if not genre_id:
                     self.send_error(400, "Missing genre")
@@ -159,11 +234,17 @@ class ComposerHandler(SimpleHTTPRequestHandler):
                     self.send_error(500, "midiutil not installed")
                     return
                 
-                filename = self.generate_midi(genre_id, bars, seed, use_neural)
-                self.send_json({'success': True, 'filename': filename})
+                if stream:
+                    self.stream_midi(genre_id, bars, seed, use_neural, archive)
+                else:
+                    result = self.generate_midi(genre_id, bars, seed, use_neural)
+                    self.send_json({'success': True, **result})
             except Exception as e:
                 self.send_error(500, str(e))
         
+        elif path == '/api/generate-batch':
+            self.generate_batch(body, parse_qs(parsed_path.query))
+        
         elif path == '/api/train-neural':
             if not NEURAL_AVAILABLE:
                 self.send_json({'success': False, 'error': 'Neural network not available. Install TensorFlow: pip install tensorflow'})
@@ -183,14 +264,11 @@ class ComposerHandler(SimpleHTTPRequestHandler):
                     })
                     return
                 
-                # Train model
-                composer = train_neural_composer(midi_directory, epochs)
+                # Train model (saved to models/<model_name>.h5 with its manifest)
+                composer = train_neural_composer(midi_directory, epochs, model_name=model_name)
                 
                 if composer:
-                    # Save to models directory
-                    os.makedirs('models', exist_ok=True)
-                    model_path = f'models/{model_name}.h5'
-                    composer.save_model(model_path)
+                    model_path = model_path_for(model_name)
                     
                     self.send_json({
                         'success': True,
@@ -212,17 +290,23 @@ class ComposerHandler(SimpleHTTPRequestHandler):
             
             try:
                 data = json.loads(body)
-                model_name = data.get('model', 'composer_model')
-                model_path = f'models/{model_name}.h5'
+                model_name = data.get('model', NEURAL_MODEL_NAME)
+                
+                if MODEL_REGISTRY.manifest(model_name) is None:
+                    self.send_error(404, f"Model not found: models/{model_name}.h5")
+                    return
                 
-                if not os.path.exists(model_path):
-                    self.send_error(404, f"Model not found: {model_path}")
+                # Warm the serving cache so the first generation doesn't pay for the load
+                served = MODEL_REGISTRY.get(model_name)
+                if served is None:
+                    self.send_error(500, f"Could not load model: {model_name}")
                     return
                 
                 self.send_json({
                     'success': True,
                     'message': f'Model loaded: {model_name}',
-                    'model': model_name
+                    'model': model_name,
+                    'manifest': served.manifest.to_dict()
                 })
             except Exception as e:
                 self.send_error(500, str(e))
@@ -230,70 +314,223 @@ class ComposerHandler(SimpleHTTPRequestHandler):
         else:
             self.send_error(404, "Not found")
     
+    @timed('request.generate')
     def generate_midi(self, genre_id, bars, seed, use_neural=False):
-        """Generate MIDI file"""
+        """Generate MIDI file and return where to download it"""
+        filename, data, url, cached = self.render_midi(genre_id, bars, seed, use_neural)
+        if url is None:
+            url = self.archive_midi(filename, data)
+        return {'filename': filename, 'url': url, 'cached': cached}
+    
+    @timed('request.stream')
+    def stream_midi(self, genre_id, bars, seed, use_neural=False, archive=False):
+        """Render in memory and send the SMF bytes in this response"""
+        filename, data, url, cached = self.render_midi(genre_id, bars, seed, use_neural)
+        if archive:
+            url = self.archive_midi(filename, data)
+        
+        self.send_response(200)
+        self.send_header('Content-type', 'audio/midi')
+        self.send_header('Content-Length', len(data))
+        self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Expose-Headers', 'Content-Disposition, X-Cache, X-Archive-URL')
+        self.send_header('X-Cache', 'hit' if cached else 'miss')
+        if not cached and getattr(self, 'track_timings', None):
+            self.send_header('Server-Timing', ', '.join(
+                f"{track};dur={seconds * 1000:.1f}" for track, seconds in self.track_timings.items()))
+        if archive:
+            self.send_header('X-Archive-URL', url)
+        self.end_headers()
+        self.wfile.write(data)
+    
+    @timed('archive.write')
+    def archive_midi(self, filename, data):
+        """Persist a render under output/ and return its URL"""
+        filepath = os.path.join('output', filename)
+        os.makedirs('output', exist_ok=True)
+        
+        tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, filepath)
+        
+        return f'/output/{filename}'
+    
+    def render_midi(self, genre_id, bars, seed, use_neural=False):
+        """
+        Render a composition into an in-memory SMF, reusing the cached render
+        for seeded requests.
+        Returns: (filename, data, url, cached) - url is None if nothing was written to disk
+        """
         genre = get_genre(genre_id)
         if not genre:
             raise ValueError(f"Unknown genre: {genre_id}")
         
-        # Load neural model if requested
-        neural_model = None
-        if use_neural and NEURAL_AVAILABLE:
-            try:
-                model_path = 'models/composer_model.h5'
-                if os.path.exists(model_path):
-                    neural_model = AdvancedNeuralComposer()
-                    neural_model.load_model(model_path)
-            except Exception as e:
-                print(f"Warning: Could not load neural model: {e}")
+        bars = int(bars)
+        suffix = "_neural" if use_neural else ""
+        
+        # Seeded requests are deterministic: look them up by content address
+        key = None
+        if seed is not None:
+            seed = int(seed)
+            version = MODEL_REGISTRY.version(NEURAL_MODEL_NAME) if use_neural else 'none'
+            key = cache_key(genre_id, bars, seed, use_neural, version)
+            filename = f"{genre_id}_{bars}bars_seed{seed}{suffix}.mid"
+            with span('cache.lookup'):
+                data = GENERATION_CACHE.get(key)
+            if data is not None:
+                return filename, data, GENERATION_CACHE.url_for(key), True
+        
+        served = self.load_neural_model() if use_neural else None
+        if key is not None and served is not None and served.version != version:
+            # A retrained model was swapped in since the lookup: file the render under its version
+            key = cache_key(genre_id, bars, seed, use_neural, served.version)
+        
+        data = self.compose_midi_bytes(genre_id, bars, seed, served.composer if served else None)
+        
+        if key is not None:
+            with span('cache.store'):
+                GENERATION_CACHE.put(key, data)
+            return filename, data, GENERATION_CACHE.url_for(key), False
+        
+        # Unseeded results get a content-derived name so concurrent requests never clobber each other
+        filename = f"{genre_id}_{bars}bars{suffix}_{content_digest(data)}.mid"
+        return filename, data, None, False
+    
+    @timed('model.load')
+    def load_neural_model(self):
+        """The default neural model from the registry's serving cache (ServedModel), or None if unavailable"""
+        if not NEURAL_AVAILABLE:
+            return None
+        return MODEL_REGISTRY.get(NEURAL_MODEL_NAME)
+    
+    def stream_events(self, query):
+        """
+        Server-Sent Events stream of note events, one event per bar, emitted while
+        composing. Writes block when the client falls behind (TCP backpressure), and
+        the server never runs more than `ahead` seconds ahead of real-time playback.
+        """
+        genre_id = query.get('genre', [None])[0]
+        if not genre_id or not get_genre(genre_id):
+            self.send_error(400, "Missing or unknown genre")
+            return
+        
+        try:
+            bars = int(query.get('bars', [32])[0])
+            seed = query.get('seed', [None])[0]
+            seed = int(seed) if seed else None
+            ahead = float(query.get('ahead', [STREAM_LOOKAHEAD_SECONDS])[0])
+        except ValueError:
+            self.send_error(400, "Invalid parameters")
+            return
+        use_neural = query.get('neural', ['false'])[0].lower() == 'true'
+        served = self.load_neural_model() if use_neural else None
+        neural_model = served.composer if served else None
         
         composer = GenreComposer(genre_id, seed, neural_model)
-        tempo = composer._get_tempo()
-        time_sig = composer._get_time_signature()
-        
-        midi = MIDIFile(4, deinterleave=False)
-        midi.addTempo(0, 0, tempo)
-        midi.addTimeSignature(0, 0, time_sig[0], int(np.log2(time_sig[1])), 24, 8)
-        
-        midi.addTrackName(0, 0, "Melody")
-        midi.addTrackName(1, 0, "Chords")
-        midi.addTrackName(2, 0, "Bass")
-        midi.addTrackName(3, 0, "Drums")
-        
-        # Set instruments
-        midi.addProgramChange(0, 0, 0, 0)   # Piano
-        midi.addProgramChange(1, 1, 0, 0)   # Piano
-        midi.addProgramChange(2, 2, 0, 33)  # Electric Bass
-        
-        # Generate tracks
-        melody = composer.generate_melody(bars)
-        for note in melody:
-            midi.addNote(0, 0, note.pitch, note.start, note.duration, note.velocity)
-        
-        chords = composer.generate_chords(bars)
-        for bar_chords in chords:
-            for note in bar_chords:
-                midi.addNote(1, 1, note.pitch, note.start, note.duration, note.velocity)
-        
-        bass = composer.generate_bass_line(bars)
-        for note in bass:
-            midi.addNote(2, 2, note.pitch, note.start, note.duration, note.velocity)
-        
-        drums = composer.generate_drum_pattern(bars)
-        for part_name, part_notes in drums.items():
-            for note in part_notes:
-                midi.addNote(3, 9, note.pitch, note.start, note.duration, note.velocity)
-        
-        # Save file
-        suffix = "_neural" if use_neural else ""
-        filename = f"{genre_id}_{bars}bars{suffix}.mid"
-        filepath = os.path.join('output', filename)
-        os.makedirs('output', exist_ok=True)
+        tempo = composer.plan.tempo
+        time_sig = composer.plan.time_signature
+        bar_iter = composer.iter_bars(bars)
         
-        with open(filepath, 'wb') as f:
-            midi.writeFile(f)
+        seconds_per_beat = 60.0 / tempo
         
-        return filename
+        self.send_response(200)
+        self.send_header('Content-type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        
+        def emit(event, data):
+            self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+        
+        started = time.monotonic()
+        try:
+            emit('meta', {
+                'genre': genre_id,
+                'bars': bars,
+                'tempo': tempo,
+                'time_signature': list(time_sig),
+                'seconds_per_beat': seconds_per_beat,
+            })
+            
+            for bar, events in bar_iter:
+                notes = [
+                    [track, int(note.pitch), int(note.velocity),
+                     round(float(note.start) * seconds_per_beat, 4),
+                     round(float(note.duration) * seconds_per_beat, 4)]
+                    for track, note in events
+                ]
+                emit('bar', {'bar': bar, 'notes': notes})
+                
+                # Pace generation against the playback clock
+                bar_end = (bar + 1) * time_sig[0] * seconds_per_beat
+                wait = bar_end - ahead - (time.monotonic() - started)
+                if wait > 0:
+                    time.sleep(wait)
+            
+            emit('end', {'bars': bars})
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away; stop composing
+            pass
+    
+    def compose_midi_bytes(self, genre_id, bars, seed, neural_model=None):
+        """Compose all four tracks and render them to SMF bytes, exactly as the CLI does"""
+        timings = {}
+        # The neural model is already loaded in-process, so the tracks run on threads
+        data = render_midi_bytes(genre_id, bars, seed, neural_model, executor='thread', timings=timings)
+        self.track_timings = timings
+        return data
+    
+    def generate_batch(self, body, query):
+        """Render a JSONL job manifest, streaming one JSON progress line per finished job"""
+        from batch_generate import assign_seeds, check_filenames, parse_manifest, run_batch
+        
+        if not MIDIUTIL_AVAILABLE:
+            self.send_error(500, "midiutil not installed")
+            return
+        
+        try:
+            jobs = parse_manifest(body.splitlines())
+            # The pool runs inside this request: never more processes than CPUs
+            cpus = os.cpu_count() or 1
+            workers = min(max(int(query.get('workers', [0])[0]), 0), cpus) or cpus
+            batch_seed = query.get('seed', [None])[0]
+            batch_seed = int(batch_seed) if batch_seed else None
+            as_zip = query.get('format', ['zip'])[0] != 'dir'
+            # Reject colliding file names before the streamed 200 response starts
+            check_filenames(assign_seeds(jobs, batch_seed))
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        
+        if not jobs:
+            self.send_error(400, "Empty manifest")
+            return
+        
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        output = os.path.join(BATCH_DIR, batch_id + ('.zip' if as_zip else ''))
+        
+        self.send_response(200)
+        self.send_header('Content-type', 'application/x-ndjson')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        
+        def emit(record):
+            self.wfile.write((json.dumps(record) + '\n').encode('utf-8'))
+            self.wfile.flush()
+        
+        summary = run_batch(jobs, output, workers, batch_seed, progress=emit)
+        summary['done'] = True
+        if as_zip:
+            summary['url'] = BATCH_URL_PREFIX + quote(batch_id + '.zip')
+        else:
+            failed = {failure['index'] for failure in summary['failures']}
+            summary['urls'] = [BATCH_URL_PREFIX + quote(f"{batch_id}/{job.filename()}")
+                               for index, job in enumerate(jobs) if index not in failed]
+        emit(summary)
     
     def send_json(self, data):
         """Send JSON response"""
@@ -303,6 +540,37 @@ class ComposerHandler(SimpleHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(json.dumps(data).encode('utf-8'))
     
+    def send_cached(self, entry: CachedResponse):
+        """Send a precomputed response, honouring If-None-Match and Accept-Encoding"""
+        if entry.matches(self.headers.get('If-None-Match')):
+            self.send_response(304)
+            self.send_header('ETag', entry.etag)
+            self.send_header('Cache-Control', entry.cache_control)
+            self.end_headers()
+            return
+        
+        encoding, body = entry.select(self.headers.get('Accept-Encoding'))
+        self.send_response(200)
+        self.send_header('Content-type', entry.content_type)
+        self.send_header('Content-Length', len(body))
+        self.send_header('ETag', entry.etag)
+        self.send_header('Cache-Control', entry.cache_control)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        if entry.encodings:
+            self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_static(self, filename, content_type):
+        """Send a static file from the response cache"""
+        entry = RESPONSE_CACHE.get_file(filename, content_type)
+        if entry is None:
+            self.send_error(404, "File not found")
+            return
+        self.send_cached(entry)
+    
     def send_file(self, filename, content_type):
         """Send file response"""
         try:
@@ -316,37 +584,155 @@ class ComposerHandler(SimpleHTTPRequestHandler):
         except FileNotFoundError:
             self.send_error(404, "File not found")
     
+    def send_batch_file(self, relative):
+        """Send a batch archive or one of its rendered files as a download, confined to output/batches/"""
+        root = os.path.realpath(BATCH_DIR)
+        filepath = os.path.realpath(os.path.join(root, relative))
+        if os.path.commonpath([root, filepath]) != root or not os.path.isfile(filepath):
+            self.send_error(404, "File not found")
+            return
+        
+        content_type = 'application/zip' if filepath.endswith('.zip') else 'audio/midi'
+        filename = os.path.basename(filepath).replace('"', '')
+        with open(filepath, 'rb') as f:
+            content = f.read()
+        self.send_response(200)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', len(content))
+        self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(content)
+    
+    def send_metrics(self):
+        """
+        Stage latency histograms, generation cache, model and memory gauges in
+        Prometheus text format. Every series carries a worker label: with --workers
+        this worker answers for all of them from their published snapshots (at most
+        PUBLISH_INTERVAL_SECONDS old), so sum over worker for server-wide totals.
+        """
+        snapshots = WORKER_SNAPSHOTS.collect() if WORKER_SNAPSHOTS else {}
+        snapshots[str(WORKER_INDEX)] = metrics_snapshot()
+        snapshots = dict(sorted(snapshots.items(), key=lambda item: int(item[0])))
+        
+        lines = [render_histograms({worker: s['stages'] for worker, s in snapshots.items()})]
+        
+        def family(metric, kind, samples):
+            lines.append(f"# TYPE {metric} {kind}\n")
+            lines.extend(f"{metric}{{{labels}}} {value}\n" for labels, value in samples)
+        
+        for section, prefix, counters in (('cache', 'composer_generation_cache', ('hits', 'misses')),
+                                          ('models', 'composer_models', ('swaps',))):
+            for name in snapshots[str(WORKER_INDEX)][section]:
+                kind = 'counter' if name in counters else 'gauge'
+                metric = f"{prefix}_{name}{'_total' if kind == 'counter' else ''}"
+                family(metric, kind, [(f'worker="{worker}"', s[section].get(name, 0))
+                                      for worker, s in snapshots.items()])
+        memory = [(f'kind="{kind}",pid="{s["pid"]}",worker="{worker}"', value)
+                  for worker, s in snapshots.items() for kind, value in s['memory'].items()]
+        if memory:
+            family('composer_process_memory_bytes', 'gauge', memory)
+        content = ''.join(lines).encode('utf-8')
+        
+        self.send_response(200)
+        self.send_header('Content-type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', len(content))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(content)
+    
     def log_message(self, format, *args):
         """Suppress default logging"""
         pass
 
-def start_server(port=8000):
-    """Start the web server"""
+def metrics_snapshot():
+    """This process's metrics as plain data (what each worker publishes)"""
+    return {
+        'pid': os.getpid(),
+        'stages': REGISTRY.snapshot(),
+        'cache': GENERATION_CACHE.stats(),
+        'models': MODEL_REGISTRY.stats(),
+        'memory': memory_usage(),
+    }
+
+def preload(load_model=False):
+    """Build the read-only state up front so the first requests are fast (and, before forking, shared)"""
+    get_search_index()
+    build_catalogue_cache()
+    preload_tables()
+    if load_model and NEURAL_AVAILABLE:
+        # No latency probe: running inference here would start TensorFlow's thread pools
+        MODEL_REGISTRY.get(NEURAL_MODEL_NAME, probe_latency=False)
+
+def start_server(port=8000, workers=1, preload_model=False):
+    """
+    Start the web server.
+    
+    workers > 1 preloads the catalogue and lookup tables once, then forks that many
+    worker processes sharing the socket; those are shared copy-on-write. The neural
+    model is not: TensorFlow's threads do not survive fork, so each worker loads its
+    own copy as it starts (and the memory report shows what that costs per worker).
+    preload_model opts in to loading it in the parent before forking instead.
+    """
     server_address = ('', port)
-    httpd = HTTPServer(server_address, ComposerHandler)
+    httpd = ThreadingHTTPServer(server_address, ComposerHandler)
+    enable_instrumentation()
+    preload(load_model=workers > 1 and preload_model)
     
     print(f"\n{'='*60}")
     print(f"Universal Genre MIDI Composer - Web Interface")
     print(f"{'='*60}")
     print(f"\n✓ Server running at: http://localhost:{port}")
+    if workers > 1:
+        print(f"✓ {workers} worker processes (model {'preloaded in the parent' if preload_model else 'loaded per worker'})")
     print(f"✓ Open your browser and navigate to the URL above")
     print(f"\nPress Ctrl+C to stop the server\n")
     
-    # Open browser automatically
-    threading.Timer(1.0, lambda: webbrowser.open(f'http://localhost:{port}')).start()
+    # Open the browser shortly after serving starts (in the parent only: no threads may cross the fork)
+    def open_browser():
+        threading.Timer(1.0, lambda: webbrowser.open(f'http://localhost:{port}')).start()
+    
+    def start_worker(index):
+        global WORKER_INDEX
+        WORKER_INDEX = index
+        # The registry's watcher thread would not survive the fork: each worker starts its own
+        MODEL_REGISTRY.start()
+        WORKER_SNAPSHOTS.start(index, metrics_snapshot)
+        # Load before serving, so neither the first request nor the memory report misses it
+        if NEURAL_AVAILABLE:
+            MODEL_REGISTRY.get(NEURAL_MODEL_NAME)
     
+    global WORKER_SNAPSHOTS
     try:
-        httpd.serve_forever()
+        if workers > 1:
+            WORKER_SNAPSHOTS = WorkerSnapshots()
+            serve_prefork(httpd, workers, after_fork=start_worker, after_start=open_browser)
+        else:
+            MODEL_REGISTRY.start()
+            open_browser()
+            httpd.serve_forever()
     except KeyboardInterrupt:
         print("\n\n✓ Server stopped")
         httpd.server_close()
+    finally:
+        if WORKER_SNAPSHOTS is not None:
+            WORKER_SNAPSHOTS.close()
 
 if __name__ == '__main__':
-    port = 8000
-    if len(sys.argv) > 1:
-        try:
-            port = int(sys.argv[1])
-        except ValueError:
-            pass
+    parser = argparse.ArgumentParser(description='Universal Genre MIDI Composer web server')
+    parser.add_argument('port', nargs='?', type=int, default=8000, help='Port (default: 8000)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes forked after preloading shared state (default: 1)')
+    parser.add_argument('--preload-model', action='store_true',
+                        help='With --workers: load the neural model once in the parent before forking instead of '
+                             'in each worker. Not fork-safe with every TensorFlow build (its threads do not '
+                             'survive fork), so inference may hang in the workers')
+    parser.add_argument('--profile', nargs='?', const='server.prof', metavar='FILE',
+                        help='Profile the server, request handler threads included, with cProfile until '
+                             'Ctrl+C and write pstats output (default: server.prof). Single process only')
+    args = parser.parse_args()
+    if args.profile and args.workers > 1:
+        parser.error("--profile needs a single process: drop --workers")
     
-    start_server(port)
+    with profiled(args.profile):
+        start_server(args.port, args.workers, preload_model=args.preload_model)